@@ -0,0 +1,233 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from valuation import ledger_symbols
+
+TRADING_DAYS = 252  # Sessions per year used to annualize daily figures
+
+
+def daily_returns(values: np.ndarray, flows: np.ndarray = None) -> np.ndarray:
+    """
+    Return the daily returns of a value series, net of external cash flows.
+
+    A flow is assumed to arrive at the end of its day, so it does not count as a gain:
+    r[t] = (values[t] - flows[t]) / values[t - 1] - 1.
+
+    :param values: Daily portfolio values
+    :param flows: External cash flows of each day (deposits positive), zero if omitted
+    :return: Array of len(values) - 1 returns (0 where the previous value is 0)
+    """
+    values = np.asarray(values, dtype=float)
+    flows = np.zeros(len(values)) if flows is None else np.asarray(flows, dtype=float)
+    previous = values[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = (values[1:] - flows[1:]) / previous - 1
+    return np.where(previous > 0, returns, 0.0)
+
+
+def time_weighted_return(values: np.ndarray, flows: np.ndarray = None) -> float:
+    """
+    Return the time-weighted return of a value series, which ignores the size and timing of flows.
+    """
+    return float(np.prod(1 + daily_returns(values, flows)) - 1)
+
+
+def xirr(amounts: np.ndarray, dates, guess: float = 0.1, tolerance: float = 1e-10, max_iterations: int = 100) -> float:
+    """
+    Return the money-weighted return: the annual rate at which the cash flows have a zero net present value.
+
+    :param amounts: Cash flows from the investor's point of view (deposits negative, the
+                    final value positive)
+    :param dates: Dates of the cash flows
+    :param guess: Starting rate of the Newton iterations
+    :param tolerance: Convergence threshold on the net present value
+    :param max_iterations: Maximum number of Newton iterations before falling back to bisection
+    :return: Annual rate, or NaN if the flows do not change sign
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    days = np.asarray(dates, dtype='datetime64[D]')
+    if len(amounts) < 2 or not (amounts.min() < 0 < amounts.max()):
+        return float('nan')
+    years = (days - days.min()).astype(float) / 365.0
+
+    def npv(rate):
+        return np.sum(amounts / (1 + rate) ** years)
+
+    rate = guess
+    for _ in range(max_iterations):
+        discount = (1 + rate) ** years
+        value = np.sum(amounts / discount)
+        derivative = np.sum(-years * amounts / (discount * (1 + rate)))
+        if abs(value) < tolerance:
+            return float(rate)
+        if derivative == 0 or not np.isfinite(derivative):
+            break
+        next_rate = rate - value / derivative
+        if not np.isfinite(next_rate) or next_rate <= -1:
+            break
+        rate = next_rate
+
+    # Newton did not converge: bisect on a bracket of the root
+    low, high = -0.9999, 10.0
+    if npv(low) * npv(high) > 0:
+        return float('nan')
+    for _ in range(200):
+        middle = (low + high) / 2
+        if npv(low) * npv(middle) <= 0:
+            high = middle
+        else:
+            low = middle
+    return float((low + high) / 2)
+
+
+def rolling_volatility(returns: np.ndarray, window: int = 21, periods: int = TRADING_DAYS) -> np.ndarray:
+    """
+    Return the annualized volatility of daily returns over a rolling window.
+
+    :param returns: Daily returns
+    :param window: Number of returns in each window
+    :param periods: Number of periods per year
+    :return: Array of len(returns) - window + 1 volatilities (empty if there are fewer returns)
+    """
+    returns = np.asarray(returns, dtype=float)
+    if len(returns) < window or window < 2:
+        return np.array([])
+    sums = np.concatenate(([0.0], np.cumsum(returns)))
+    squares = np.concatenate(([0.0], np.cumsum(returns ** 2)))
+    window_sum = sums[window:] - sums[:-window]
+    window_squares = squares[window:] - squares[:-window]
+    variance = (window_squares - window_sum ** 2 / window) / (window - 1)
+    return np.sqrt(np.clip(variance, 0, None) * periods)
+
+
+def max_drawdown(values: np.ndarray) -> tuple:
+    """
+    Return the largest peak-to-trough decline of a value series.
+
+    :param values: Daily values (or a cumulative return index)
+    :return: Tuple (drawdown as a negative fraction, peak position, trough position)
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return 0.0, 0, 0
+    peaks = np.maximum.accumulate(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns = np.where(peaks > 0, values / peaks - 1, 0.0)
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(values[:trough + 1]))
+    return float(drawdowns[trough]), peak, trough
+
+
+def sharpe_ratio(returns: np.ndarray, risk_free: float = 0.0, periods: int = TRADING_DAYS) -> float:
+    """
+    Return the annualized Sharpe ratio of daily returns.
+
+    :param returns: Daily returns
+    :param risk_free: Annual risk-free rate
+    :param periods: Number of periods per year
+    """
+    excess = np.asarray(returns, dtype=float) - risk_free / periods
+    deviation = excess.std(ddof=1) if len(excess) > 1 else 0.0
+    return float(excess.mean() / deviation * np.sqrt(periods)) if deviation > 0 else float('nan')
+
+
+def sortino_ratio(returns: np.ndarray, risk_free: float = 0.0, periods: int = TRADING_DAYS) -> float:
+    """
+    Return the annualized Sortino ratio of daily returns, which only penalizes downside deviation.
+    """
+    excess = np.asarray(returns, dtype=float) - risk_free / periods
+    downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2)) if len(excess) else 0.0
+    return float(excess.mean() / downside * np.sqrt(periods)) if downside > 0 else float('nan')
+
+
+def beta(returns: np.ndarray, benchmark_returns: np.ndarray) -> float:
+    """
+    Return the beta of daily returns against the returns of a benchmark over the same days.
+    """
+    returns = np.asarray(returns, dtype=float)
+    benchmark_returns = np.asarray(benchmark_returns, dtype=float)
+    if len(returns) < 2:
+        return float('nan')
+    variance = benchmark_returns.var(ddof=1)
+    if variance == 0:
+        return float('nan')
+    return float(np.cov(returns, benchmark_returns, ddof=1)[0, 1] / variance)
+
+
+def portfolio_sessions(portfolio, start_date: str, end_date: str) -> np.ndarray:
+    """
+    Return the trading sessions of a portfolio: the days on which at least one of the
+    symbols it holds or has sold has a close.
+
+    :param portfolio: The Portfolio
+    :param start_date: First date in 'YYYY-MM-DD' format
+    :param end_date: Last date in 'YYYY-MM-DD' format (inclusive)
+    :return: datetime64[D] array of sessions, empty if the portfolio never held a symbol
+    """
+    symbols = ledger_symbols(portfolio.assets, portfolio.lot_engine.realized)
+    if not symbols:
+        return np.array([], dtype='datetime64[D]')
+    fetch_end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    closes = portfolio.data_fetcher.fetch_many(symbols, start_date, fetch_end)
+    return closes.index[closes.notna().any(axis=1).to_numpy()].to_numpy().astype('datetime64[D]')
+
+
+def performance_summary(portfolio, start_date: str, end_date: str, benchmark: str = None,
+                        risk_free: float = 0.0, volatility_window: int = 21) -> dict:
+    """
+    Compute the risk and performance figures of a portfolio over a period.
+
+    The daily values and cumulative inflows come from the portfolio's ProfitSeries and
+    are sampled on the sessions of its own symbols only, so weekends do not dilute
+    volatility; inflows made on non-trading days count on the next session.
+
+    :param portfolio: The Portfolio to analyze
+    :param start_date: First date in 'YYYY-MM-DD' format
+    :param end_date: Last date in 'YYYY-MM-DD' format (inclusive)
+    :param benchmark: Symbol to compute the beta against, e.g. 'SPY'
+    :param risk_free: Annual risk-free rate of the Sharpe and Sortino ratios
+    :param volatility_window: Number of sessions of the rolling volatility
+    :return: Dictionary of figures, including the 'rolling_volatility' Series
+    """
+    series = portfolio.profit_series.window(portfolio, start_date, end_date)
+    sessions = portfolio_sessions(portfolio, start_date, end_date)
+    if len(sessions):
+        series = series[np.isin(series.index.to_numpy().astype('datetime64[D]'), sessions)]
+    values = series['Value'].to_numpy()
+    inflows = series['Inflows'].to_numpy()
+    flows = np.concatenate(([0.0], np.diff(inflows)))
+    returns = daily_returns(values, flows)
+
+    # Money-weighted return: the starting value and every later inflow go in, the final value comes out
+    if len(values):
+        amounts = -flows
+        amounts[0] = -values[0]
+        amounts[-1] += values[-1]
+        nonzero = amounts != 0
+        money_weighted = xirr(amounts[nonzero], series.index.to_numpy()[nonzero])
+    else:
+        money_weighted = float('nan')
+
+    drawdown, peak, trough = max_drawdown(values)
+    summary = {
+        'time_weighted_return': time_weighted_return(values, flows),
+        'money_weighted_return': money_weighted,
+        'volatility': float(returns.std(ddof=1) * np.sqrt(TRADING_DAYS)) if len(returns) > 1 else float('nan'),
+        'max_drawdown': drawdown,
+        'max_drawdown_peak': series.index[peak] if len(values) else None,
+        'max_drawdown_trough': series.index[trough] if len(values) else None,
+        'sharpe_ratio': sharpe_ratio(returns, risk_free),
+        'sortino_ratio': sortino_ratio(returns, risk_free),
+        'beta': float('nan'),
+        'rolling_volatility': pd.Series(rolling_volatility(returns, volatility_window),
+                                        index=series.index[volatility_window:], dtype=float)
+    }
+
+    if benchmark and len(values) > 1:
+        fetch_end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        closes = portfolio.data_fetcher.fetch_many([benchmark], start_date, fetch_end)[benchmark]
+        closes = closes.reindex(closes.index.union(series.index)).ffill().reindex(series.index).to_numpy()
+        benchmark_returns = daily_returns(closes)
+        valid = np.isfinite(closes[1:]) & np.isfinite(closes[:-1])
+        summary['beta'] = beta(returns[valid], benchmark_returns[valid])
+    return summary
@@ -1,8 +1,16 @@
+import os
+import threading
+import uuid
 import dash
 from dash import dcc, html
 from dash.dependencies import Input, Output, State
 import dash_bootstrap_components as dbc
-from portfolio_manager import Portfolio
+from portfolio_registry import PortfolioRegistry
+from market_data_providers import create_provider
+from price_refresher import PriceRefresher
+from instrumentation import registry, timed
+from figure_cache import figure_cache
+from flask import Response, jsonify, request
 import plotly.graph_objs as go
 from visualization import (
     plot_diversification_pie,
@@ -18,10 +26,65 @@ from color_palette import GENERAL_COLORS, GRAPH_COLORS, PIE_CHART_COLORS, TABLE_
 # Initialize the Dash app
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.DARKLY], suppress_callback_exceptions=True)
 
-# Initialize portfolio object
+# Every browser session works on its own portfolio, loaded on demand from PORTFOLIO_DIR, which
+# worker processes share; the market data provider is selected by MARKET_DATA_PROVIDER
 initial_date = "2023-02-01"
-portfolio = Portfolio(initial_date)
-portfolio.load_portfolio()
+portfolios = None  # PortfolioRegistry of this process, created on first use by get_portfolios()
+price_refresher = None  # Polls the live prices of the held symbols once the server handles requests
+_services_lock = threading.Lock()
+
+registry.register_gauges('figure_cache', figure_cache.stats)
+
+
+def get_portfolios(portfolio_registry: PortfolioRegistry = None) -> PortfolioRegistry:
+    """
+    Return the portfolio registry of this process, creating it and its price refresher on first use.
+
+    Nothing is created when the module is imported, since the registry opens the portfolio
+    directory and the market data stores in the working directory.
+
+    :param portfolio_registry: Registry to use instead of the one configured by the environment,
+                               only taken into account on first use
+    :return: The PortfolioRegistry
+    """
+    global portfolios, price_refresher
+    with _services_lock:
+        if portfolios is None:
+            portfolios = portfolio_registry or PortfolioRegistry(
+                os.environ.get("PORTFOLIO_DIR", "portfolios"),
+                maxsize=int(os.environ.get("PORTFOLIO_CACHE_SIZE", "32")),
+                simulation_date=initial_date, provider=create_provider())
+            price_refresher = PriceRefresher(portfolios.data_fetcher, portfolios.held_symbols,
+                                             interval=float(os.environ.get("PRICE_REFRESH_INTERVAL", "60")))
+            portfolios.price_refresher = price_refresher
+
+            # Export the cache statistics of the shared data fetcher, the refresher and the registry
+            registry.register_gauges('data_fetcher', portfolios.data_fetcher.get_cache_stats)
+            registry.register_gauges('price_refresher', price_refresher.stats)
+            registry.register_gauges('portfolios', portfolios.stats)
+    return portfolios
+
+
+@app.server.before_request
+def start_price_refresher():
+    """
+    Start polling live prices in the background once the app serves requests, so callbacks
+    never wait on the market data provider.
+    """
+    get_portfolios()
+    with _services_lock:
+        price_refresher.start()
+
+
+@app.server.route('/metrics')
+def metrics():
+    """
+    Expose the timing spans, counters and cache statistics of this process, in the
+    Prometheus text format or as JSON with ?format=json.
+    """
+    if request.args.get('format') == 'json':
+        return jsonify(registry.snapshot())
+    return Response(registry.render_prometheus(), mimetype='text/plain')
 
 # Define the Portfolio Panel layout
 portfolio_panel_layout = dbc.Container(
@@ -143,30 +206,36 @@ investment_screen_layout = dbc.Container(
     style={"background-color": GENERAL_COLORS['background']}
 )
 
-# App layout with navigation
-app.layout = html.Div([
-    dcc.Tabs(id="tabs", value='portfolio-panel', children=[
-        dcc.Tab(
-            label='Portfolio Panel', 
-            value='portfolio-panel', 
-            style={'background-color': GENERAL_COLORS['background'], 'color': GENERAL_COLORS['text_primary']},
-            selected_style={'background-color': GENERAL_COLORS['black'], 'color': GENERAL_COLORS['text_primary']}
-        ),
-        dcc.Tab(
-            label='Investment Screen', 
-            value='investment-screen', 
-            style={'background-color': GENERAL_COLORS['background'], 'color': GENERAL_COLORS['text_primary']},
-            selected_style={'background-color': GENERAL_COLORS['black'], 'color': GENERAL_COLORS['text_primary']}
-        ),
-    ]),
-    html.Div(id='tabs-content')
-])
+# App layout with navigation; built per page load so that a new browser gets a new session ID,
+# which its local storage then keeps across visits
+def serve_layout():
+    return html.Div([
+        dcc.Store(id='session-id', storage_type='local', data=uuid.uuid4().hex),
+        dcc.Tabs(id="tabs", value='portfolio-panel', children=[
+            dcc.Tab(
+                label='Portfolio Panel', 
+                value='portfolio-panel', 
+                style={'background-color': GENERAL_COLORS['background'], 'color': GENERAL_COLORS['text_primary']},
+                selected_style={'background-color': GENERAL_COLORS['black'], 'color': GENERAL_COLORS['text_primary']}
+            ),
+            dcc.Tab(
+                label='Investment Screen', 
+                value='investment-screen', 
+                style={'background-color': GENERAL_COLORS['background'], 'color': GENERAL_COLORS['text_primary']},
+                selected_style={'background-color': GENERAL_COLORS['black'], 'color': GENERAL_COLORS['text_primary']}
+            ),
+        ]),
+        html.Div(id='tabs-content')
+    ])
+
+app.layout = serve_layout
 
 # Callbacks to update the content based on selected tab
 @app.callback(
     Output('tabs-content', 'children'),
     [Input('tabs', 'value')]
 )
+@timed("callback.render_content")
 def render_content(tab):
     if tab == 'portfolio-panel':
         return portfolio_panel_layout
@@ -176,10 +245,16 @@ def render_content(tab):
 # Callbacks for updating the portfolio and dashboard
 @app.callback(
     Output('current-portfolio-info', 'children'),
-    [Input('date-picker', 'date')]
+    [Input('date-picker', 'date')],
+    [State('session-id', 'data')]
 )
-def update_portfolio_info(selected_date):
-    portfolio_value = portfolio.get_portfolio_value(selected_date)
+@timed("callback.update_portfolio_info")
+def update_portfolio_info(selected_date, session_id):
+    with get_portfolios().session(session_id) as portfolio:
+        portfolio_value = portfolio.get_portfolio_value(selected_date)
+        prices_as_of = portfolio.get_live_prices_as_of() if not portfolio.simulation_date else None
+    if prices_as_of:
+        return f"Total Portfolio Value: ${portfolio_value:.2f} (prices as of {prices_as_of:%H:%M:%S})"
     return f"Total Portfolio Value: ${portfolio_value:.2f}"
 
 from dash.dependencies import Input, Output, State
@@ -191,36 +266,58 @@ from datetime import datetime, timedelta
      Output('plot_current_actives_table', 'children'),
      Output('plot_operation_history_table', 'children')],
     [Input('portfolio-updated', 'data'),
-     Input('date-picker', 'date')]
+     Input('date-picker', 'date')],
+    [State('session-id', 'data')]
 )
-def update_portfolio_and_plots(is_updated, selected_date):
+@timed("callback.update_portfolio_and_plots")
+def update_portfolio_and_plots(is_updated, selected_date, session_id):
 
     # Update the plots based on the selected date
     end_date = selected_date
     start_date = (datetime.strptime(selected_date, "%Y-%m-%d") - timedelta(days=30)).strftime("%Y-%m-%d")
 
-    diversification_pie = plot_diversification_pie(portfolio)
-    portfolio_profit = plot_portfolio_profit_over_time(portfolio, start_date, end_date)
-    current_actives_table_component = plot_current_actives_table(portfolio)
-    operation_history_table_component = plot_operation_history_table(portfolio)
+    with get_portfolios().session(session_id) as portfolio:
+        diversification_pie = plot_diversification_pie(portfolio)
+        portfolio_profit = plot_portfolio_profit_over_time(portfolio, start_date, end_date)
+        current_actives_table_component = plot_current_actives_table(portfolio)
+        operation_history_table_component = plot_operation_history_table(portfolio)
 
     return (diversification_pie, 
             portfolio_profit, 
             current_actives_table_component, 
             operation_history_table_component)
 
+@app.callback(
+    [Output('operation-history-table', 'data'),
+     Output('operation-history-table', 'page_count')],
+    [Input('operation-history-table', 'page_current'),
+     Input('operation-history-table', 'page_size'),
+     Input('operation-history-table', 'sort_by'),
+     Input('operation-history-table', 'filter_query')],
+    [State('session-id', 'data')]
+)
+@timed("callback.update_operation_history_page")
+def update_operation_history_page(page_current, page_size, sort_by, filter_query, session_id):
+    # Only the requested page of the history is filtered, sorted and sent to the browser
+    with get_portfolios().session(session_id) as portfolio:
+        page, total = portfolio.history.query(filter_query, sort_by, page_current or 0, page_size)
+    return page.to_dict('records'), max(1, -(-total // page_size))
+
 @app.callback(
     [Output('plot_asset_growth_over_time', 'figure'),
      Output('plot_asset_growth_over_time', 'style')],
-    [Input('stock-id', 'value')]
+    [Input('stock-id', 'value')],
+    [State('session-id', 'data')]
 )
-def update_asset_growth(stock_id):
-    end_date = portfolio.simulation_date
-    start_date = (datetime.strptime(end_date, "%Y-%m-%d") - timedelta(days=30)).strftime("%Y-%m-%d")
-    
-    if stock_id:
-        asset_growth = plot_asset_growth_over_time(portfolio, stock_id, start_date, end_date)
-        return asset_growth, {"height": "300px", "display": "block"}
+@timed("callback.update_asset_growth")
+def update_asset_growth(stock_id, session_id):
+    with get_portfolios().session(session_id) as portfolio:
+        end_date = portfolio.simulation_date
+        start_date = (datetime.strptime(end_date, "%Y-%m-%d") - timedelta(days=30)).strftime("%Y-%m-%d")
+
+        if stock_id:
+            asset_growth = plot_asset_growth_over_time(portfolio, stock_id, start_date, end_date)
+            return asset_growth, {"height": "300px", "display": "block"}
     
     # Convert start_date and end_date to datetime objects
     start_date_dt = datetime.strptime(start_date, "%Y-%m-%d")
@@ -247,15 +344,18 @@ def update_asset_growth(stock_id):
 
 @app.callback(
     Output('plot_detailed_stock_data_table', 'children'),
-    [Input('tabs', 'value')]
+    [Input('tabs', 'value')],
+    [State('session-id', 'data')]
 )
-def update_detailed_stock_data_table(tab):
+@timed("callback.update_detailed_stock_data_table")
+def update_detailed_stock_data_table(tab, session_id):
     if tab == 'investment-screen':
-        detailed_stock_data_component = plot_detailed_stock_data_table(portfolio)
+        with get_portfolios().session(session_id) as portfolio:
+            detailed_stock_data_component = plot_detailed_stock_data_table(portfolio)
         return detailed_stock_data_component
     return ""
 # New function to update the portfolio
-def update_portfolio(action, symbol, quantity, cash_amount):
+def update_portfolio(portfolio, action, symbol, quantity, cash_amount):
     if action == 'buy' and symbol and quantity:
         portfolio.buy_asset(symbol, quantity)
     elif action == 'sell' and symbol and quantity:
@@ -270,11 +370,14 @@ def update_portfolio(action, symbol, quantity, cash_amount):
     [State('portfolio-action', 'value'),
      State('asset-symbol', 'value'),
      State('asset-quantity', 'value'),
-     State('cash-amount', 'value')]
+     State('cash-amount', 'value'),
+     State('session-id', 'data')]
 )
-def update_portfolio_callback(n_clicks, action, symbol, quantity, cash_amount):
+@timed("callback.update_portfolio_callback")
+def update_portfolio_callback(n_clicks, action, symbol, quantity, cash_amount, session_id):
     if n_clicks > 0:
-        update_portfolio(action, symbol, quantity, cash_amount)
+        with get_portfolios().session(session_id) as portfolio:
+            update_portfolio(portfolio, action, symbol, quantity, cash_amount)
     return [True]
 
 @app.callback(
@@ -286,6 +389,7 @@ def update_portfolio_callback(n_clicks, action, symbol, quantity, cash_amount):
     [State('portfolio-action', 'value'),
      State('asset-symbol', 'value')]
 )
+@timed("callback.update_dashboard")
 def update_dashboard(action, portfolio_updated, current_action, symbol):
     asset_symbol_style = {'display': 'none', 'color': '#000000'}
     asset_quantity_style = {'display': 'none', 'color': '#000000'}
@@ -0,0 +1,260 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from data_fetcher import DataFetcher
+from portfolio_manager import Portfolio
+from price_matrix import PriceMatrix
+
+
+class BacktestContext:
+    """
+    The state a strategy sees on one trading day, and the orders it places.
+
+    :ivar date: Current trading day in 'YYYY-MM-DD' format
+    :ivar prices: Close prices of the day (Series indexed by symbol)
+    :ivar history: Close prices of every trading day up to and including the current one
+    :ivar portfolio: The Portfolio being simulated
+    """
+
+    def __init__(self, portfolio: Portfolio, prices: pd.DataFrame):
+        self.portfolio = portfolio
+        self._all_prices = prices
+        self.row = -1
+        self.date = None
+        self.prices = None
+        self.orders = []  # (symbol, quantity) placed during the current day
+        self.deposits = []  # Cash amounts deposited during the current day
+
+    def _advance(self, row: int):
+        """
+        Move to a trading day and drop the orders of the previous one.
+        """
+        self.row = row
+        self.date = self._all_prices.index[row]
+        self.prices = self._all_prices.iloc[row]
+        self.orders = []
+        self.deposits = []
+
+    @property
+    def history(self) -> pd.DataFrame:
+        return self._all_prices.iloc[:self.row + 1]
+
+    @property
+    def cash(self) -> float:
+        return self.portfolio.positions.cash
+
+    def quantity(self, symbol: str) -> float:
+        """
+        Return the quantity of a symbol currently held.
+        """
+        return self.portfolio.positions.quantity(symbol)
+
+    def value(self) -> float:
+        """
+        Return the portfolio value at the current day's close.
+        """
+        return self.cash + sum(self.quantity(symbol) * self.prices[symbol] for symbol in self.portfolio.positions.symbols())
+
+    def order(self, symbol: str, quantity: int):
+        """
+        Buy (positive quantity) or sell (negative quantity) a symbol at the day's close.
+        """
+        if quantity:
+            self.orders.append((symbol, int(quantity)))
+
+    def order_target_weights(self, weights: dict):
+        """
+        Place the orders that bring the holdings to target weights of the portfolio value.
+
+        Sells are placed before buys so that their proceeds fund the buys.
+
+        :param weights: Dictionary mapping each symbol to its target weight (0 to 1)
+        """
+        value = self.value() + sum(self.deposits)
+        orders = []
+        for symbol in set(weights) | set(self.portfolio.positions.symbols()):
+            price = self.prices.get(symbol, np.nan)
+            if not price > 0:
+                continue
+            target = int(value * weights.get(symbol, 0.0) // price)
+            orders.append((symbol, target - int(self.quantity(symbol))))
+        for symbol, quantity in sorted(orders, key=lambda order: order[1]):
+            self.order(symbol, quantity)
+
+    def deposit(self, amount: float):
+        """
+        Add cash to the portfolio (counted as an inflow) before the day's orders are filled.
+        """
+        if amount > 0:
+            self.deposits.append(float(amount))
+
+
+class BacktestResult:
+    """
+    The outcome of a backtest.
+
+    :ivar equity: Daily DataFrame indexed by Date with columns Cash, Holdings, Value and Inflows
+    :ivar trades: DataFrame of the filled orders with columns Date, Symbol, Quantity, Price and Amount
+    :ivar rejected: List of (date, symbol, quantity, reason) for the orders that could not be filled
+    :ivar portfolio: The Portfolio holding the resulting ledger
+    """
+
+    def __init__(self, equity: pd.DataFrame, trades: pd.DataFrame, rejected: list, portfolio: Portfolio):
+        self.equity = equity
+        self.trades = trades
+        self.rejected = rejected
+        self.portfolio = portfolio
+
+    def summary(self) -> dict:
+        """
+        Return the final value, total inflows, profit and number of trades.
+        """
+        final = self.equity.iloc[-1] if not self.equity.empty else pd.Series({'Value': 0.0, 'Inflows': 0.0})
+        return {
+            'final_value': float(final['Value']),
+            'inflows': float(final['Inflows']),
+            'profit': float(final['Value'] - final['Inflows']),
+            'trades': len(self.trades),
+            'rejected': len(self.rejected)
+        }
+
+
+def load_prices(symbols: list, start_date: str, end_date: str, data_fetcher: DataFetcher) -> pd.DataFrame:
+    """
+    Load the close prices of a backtest with one batched fetch.
+
+    :param symbols: Symbols to load
+    :param start_date: First day in 'YYYY-MM-DD' format
+    :param end_date: Last day in 'YYYY-MM-DD' format (inclusive)
+    :param data_fetcher: DataFetcher to load prices from
+    :return: Forward filled closes indexed by the 'YYYY-MM-DD' trading days, one column per symbol
+    """
+    fetch_end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    prices = data_fetcher.fetch_many(list(symbols), start_date, fetch_end).reindex(columns=list(symbols))
+    prices = prices.dropna(how='all').ffill()
+    prices.index = prices.index.strftime('%Y-%m-%d')
+    return prices
+
+
+def run_backtest(strategy, symbols: list, start_date: str, end_date: str, initial_cash: float = 10000.0,
+                 data_fetcher: DataFetcher = None, provider=None, prices: pd.DataFrame = None) -> BacktestResult:
+    """
+    Replay a strategy over every trading day of a date range.
+
+    The close prices of all symbols are loaded once with a single batched fetch. On each
+    trading day the strategy is called with a BacktestContext, and the orders it places
+    are filled at the day's close and recorded in the ledger of an in-memory Portfolio
+    (not attached to any journal). Orders that exceed the cash or the holdings are rejected.
+
+    :param strategy: Function called as strategy(context) on every trading day
+    :param symbols: Symbols the strategy may trade
+    :param start_date: First day in 'YYYY-MM-DD' format
+    :param end_date: Last day in 'YYYY-MM-DD' format (inclusive)
+    :param initial_cash: Cash deposited on the first trading day
+    :param data_fetcher: DataFetcher to load prices from, created if omitted
+    :param provider: Market data provider of the created DataFetcher
+    :param prices: Closes already loaded by load_prices, or a PriceMatrix whose rows are used in place
+    :return: A BacktestResult
+    """
+    data_fetcher = data_fetcher or DataFetcher(provider=provider)
+    if prices is None:
+        prices = load_prices(symbols, start_date, end_date, data_fetcher)
+    elif isinstance(prices, PriceMatrix):
+        prices = prices.frame(start_date, end_date)  # A view on the mapped rows; symbols outside it have no price
+    else:
+        prices = prices.loc[start_date:end_date].reindex(columns=list(symbols))
+
+    portfolio = Portfolio(simulation_date=start_date, data_fetcher=data_fetcher)
+    context = BacktestContext(portfolio, prices)
+    close = prices.to_numpy()
+    columns = {symbol: column for column, symbol in enumerate(prices.columns)}
+    equity = np.zeros((len(prices), 3))  # Cash, Holdings, Inflows
+    trades, rejected = [], []
+    inflows = 0.0
+
+    for row in range(len(prices)):
+        context._advance(row)
+        date = context.date
+        portfolio.simulation_date = date
+        if row == 0 and initial_cash > 0:
+            context.deposit(initial_cash)
+        strategy(context)
+
+        for amount in context.deposits:
+            portfolio.transaction_id += 1
+            portfolio._apply_cash(portfolio.transaction_id, amount, date, True)
+            inflows += amount
+        for symbol, quantity in context.orders:
+            price = close[row, columns[symbol]] if symbol in columns else np.nan
+            if not price > 0:
+                rejected.append((date, symbol, quantity, "no price"))
+                continue
+            amount = quantity * float(price)
+            if quantity > 0 and amount > portfolio.positions.cash:
+                rejected.append((date, symbol, quantity, "insufficient cash"))
+                continue
+            if quantity < 0 and -quantity > portfolio.positions.quantity(symbol):
+                rejected.append((date, symbol, quantity, "insufficient holdings"))
+                continue
+            portfolio.transaction_id += 1
+            portfolio._apply_cash(portfolio.transaction_id, -amount, date, False)
+            if quantity > 0:
+                portfolio.transaction_id += 1
+                portfolio._apply_buy(portfolio.transaction_id, symbol, quantity, float(price), date)
+            else:
+                portfolio.transaction_id += 1
+                portfolio._apply_sell(symbol, -quantity, float(price), date, portfolio.transaction_id)
+            trades.append((date, symbol, quantity, float(price), amount))
+
+        holdings = sum(quantity * close[row, columns[symbol]] for symbol, quantity in portfolio.positions.quantities.items())
+        equity[row] = (portfolio.positions.cash, holdings, inflows)
+
+    equity = pd.DataFrame(equity, columns=['Cash', 'Holdings', 'Inflows'], index=pd.DatetimeIndex(prices.index, name='Date'))
+    equity.insert(2, 'Value', equity['Cash'] + equity['Holdings'])
+    trades = pd.DataFrame(trades, columns=['Date', 'Symbol', 'Quantity', 'Price', 'Amount'])
+    return BacktestResult(equity, trades, rejected, portfolio)
+
+
+def periodic_rebalance(weights: dict, freq: str = 'Q'):
+    """
+    Strategy rebalancing to target weights on the first trading day of every period.
+
+    :param weights: Dictionary mapping each symbol to its target weight
+    :param freq: Pandas period frequency, e.g. 'M' (monthly), 'Q' (quarterly) or 'Y' (yearly)
+    :return: A strategy function for run_backtest
+    """
+    last_period = [None]
+
+    def strategy(context: BacktestContext):
+        period = pd.Period(context.date, freq=freq)
+        if period != last_period[0]:
+            last_period[0] = period
+            context.order_target_weights(weights)
+    return strategy
+
+
+def dollar_cost_averaging(amount: float, weights: dict, freq: str = 'M'):
+    """
+    Strategy depositing a fixed amount on the first trading day of every period and
+    investing it according to weights (the initial cash is invested the same way).
+
+    :param amount: Cash deposited every period
+    :param weights: Dictionary mapping each symbol to its share of every deposit
+    :param freq: Pandas period frequency, e.g. 'M' (monthly)
+    :return: A strategy function for run_backtest
+    """
+    last_period = [None]
+
+    def strategy(context: BacktestContext):
+        period = pd.Period(context.date, freq=freq)
+        if period == last_period[0]:
+            return
+        if last_period[0] is not None:
+            context.deposit(amount)
+        last_period[0] = period
+        budget = context.cash + sum(context.deposits)
+        for symbol, weight in weights.items():
+            price = context.prices.get(symbol, np.nan)
+            if price > 0:
+                context.order(symbol, int(budget * weight // price))
+    return strategy
@@ -0,0 +1,195 @@
+"""
+Benchmark the valuation, fetch and render hot paths on generated portfolios.
+
+All market data comes from the seeded synthetic provider, so runs are offline and
+reproducible. Results are written as JSON so that runs from different commits can be
+compared:
+
+    python benchmark.py --symbols 50 --transactions 2000 --years 5 --output before.json
+    python benchmark.py --symbols 50 --transactions 2000 --years 5 --baseline before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import numpy as np
+
+# Benchmarks never touch the network; this also applies to the dashboard module imported below
+os.environ.setdefault("MARKET_DATA_PROVIDER", "synthetic")
+
+from backtest import periodic_rebalance, run_backtest
+from data_fetcher import DataFetcher
+from market_data_providers import SyntheticProvider
+from instrumentation import registry
+from metadata_cache import TickerMetadataCache
+from portfolio_manager import Portfolio
+from portfolio_registry import PortfolioRegistry
+from price_store import PriceStore
+
+
+def generate_portfolio(n_symbols: int, n_transactions: int, years: int, seed: int = 0, end_date: str = None) -> Portfolio:
+    """
+    Generate a portfolio of random buys and sells over a period, priced by the synthetic feed.
+
+    :param n_symbols: Number of distinct symbols
+    :param n_transactions: Number of buy/sell transactions
+    :param years: Length of the period in years
+    :param seed: Seed of the synthetic feed and of the generated transactions
+    :param end_date: Last day of the period ('YYYY-MM-DD'), a week ago by default
+    :return: A Portfolio with an in-memory price store, not attached to any journal
+    """
+    end_date = end_date or (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+    start_date = (datetime.strptime(end_date, "%Y-%m-%d") - timedelta(days=365 * years)).strftime("%Y-%m-%d")
+    provider = SyntheticProvider(seed=seed)
+    data_fetcher = DataFetcher(PriceStore(":memory:"), metadata=TickerMetadataCache(":memory:"), provider=provider)
+    portfolio = Portfolio(simulation_date=end_date, data_fetcher=data_fetcher)
+
+    rng = np.random.default_rng(seed)
+    symbols = [f"SYN{i:04d}" for i in range(n_symbols)]
+    prices = portfolio.data_fetcher.fetch_many(symbols, start_date, end_date).ffill().bfill()
+    days = prices.index.strftime("%Y-%m-%d")
+
+    portfolio.transaction_id += 1
+    portfolio._apply_cash(portfolio.transaction_id, 1e12, start_date, True)
+    for row in np.sort(rng.integers(0, len(days), n_transactions)):
+        symbol = symbols[rng.integers(n_symbols)]
+        price = float(prices[symbol].iloc[row])
+        held = portfolio.positions.quantity(symbol)
+        if held > 0 and rng.random() < 0.2:
+            quantity = int(rng.integers(1, held + 1))
+            portfolio.transaction_id += 1
+            portfolio._apply_cash(portfolio.transaction_id, quantity * price, days[row], False)
+            portfolio.transaction_id += 1
+            portfolio._apply_sell(symbol, quantity, price, days[row], portfolio.transaction_id)
+        else:
+            quantity = int(rng.integers(1, 100))
+            portfolio.transaction_id += 1
+            portfolio._apply_cash(portfolio.transaction_id, -quantity * price, days[row], False)
+            portfolio.transaction_id += 1
+            portfolio._apply_buy(portfolio.transaction_id, symbol, quantity, price, days[row])
+    return portfolio
+
+
+def measure(function, repeat: int = 3) -> dict:
+    """
+    Time a function and record its peak traced memory.
+
+    :param function: Function without arguments
+    :param repeat: Number of timed runs
+    :return: Dictionary with the first (cold) run, the best and mean of all runs, and peak memory
+    """
+    timings = []
+    tracemalloc.start()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'cold_s': timings[0],
+        'best_s': min(timings),
+        'mean_s': sum(timings) / len(timings),
+        'peak_memory_mb': peak / 2 ** 20
+    }
+
+
+def run_benchmarks(n_symbols: int, n_transactions: int, years: int, seed: int = 0, repeat: int = 3) -> dict:
+    """
+    Run every hot path benchmark on one generated portfolio.
+
+    :return: Dictionary with the parameters, environment and per-benchmark results
+    """
+    started = time.perf_counter()
+    portfolio = generate_portfolio(n_symbols, n_transactions, years, seed)
+    generation_s = time.perf_counter() - started
+    end_date = portfolio.simulation_date
+    start_date = (datetime.strptime(end_date, "%Y-%m-%d") - timedelta(days=365 * years)).strftime("%Y-%m-%d")
+
+    symbols = [f"SYN{i:04d}" for i in range(n_symbols)]
+    benchmarks = {
+        'get_portfolio_value_range': lambda: portfolio.get_portfolio_value(start_date, end_date),
+        'get_portfolio_value_date': lambda: portfolio.get_portfolio_value(end_date),
+        'get_current_actives': portfolio.get_current_actives,
+        'get_detailed_stock_data': lambda: portfolio.get_detailed_stock_data(end_date),
+        'fetch_many_cold': lambda: DataFetcher(PriceStore(":memory:"), metadata=TickerMetadataCache(":memory:"),
+                                               provider=portfolio.data_fetcher.provider).fetch_many(
+                                                   list(portfolio.positions.symbols()), start_date, end_date),
+        'backtest_rebalance': lambda: run_backtest(periodic_rebalance({symbol: 1 / n_symbols for symbol in symbols}),
+                                                   symbols, start_date, end_date, 1e6, data_fetcher=portfolio.data_fetcher),
+    }
+    directory = tempfile.TemporaryDirectory()  # Portfolio directory of the dashboard, kept out of the cwd
+    try:
+        import app_construction
+        from figure_cache import figure_cache
+
+        app_construction.get_portfolios(PortfolioRegistry(directory.name, data_fetcher=portfolio.data_fetcher)).add(
+            "benchmark", portfolio)
+
+        def render():
+            figure_cache.clear()
+            app_construction.update_portfolio_and_plots(True, end_date, "benchmark")
+        benchmarks['update_portfolio_and_plots'] = render
+    except ImportError as e:
+        print(f"Skipping update_portfolio_and_plots: {e}")
+
+    results = {}
+    registry.reset()
+    for name, function in benchmarks.items():
+        results[name] = measure(function, repeat)
+        print(f"{name}: best {results[name]['best_s'] * 1000:.1f} ms, peak {results[name]['peak_memory_mb']:.1f} MB")
+    directory.cleanup()
+
+    return {
+        'parameters': {'symbols': n_symbols, 'transactions': n_transactions, 'years': years, 'seed': seed, 'repeat': repeat},
+        'environment': {'commit': _git_commit(), 'python': platform.python_version(), 'timestamp': datetime.now().isoformat()},
+        'generation_s': generation_s,
+        'results': results,
+        'spans': registry.snapshot()['spans']  # Per-span latencies accumulated over all benchmarks
+    }
+
+
+def compare(results: dict, baseline: dict):
+    """
+    Print the ratio of every benchmark's best time to the baseline.
+    """
+    for name, result in results['results'].items():
+        if name in baseline.get('results', {}):
+            ratio = result['best_s'] / baseline['results'][name]['best_s']
+            print(f"{name}: {ratio:.2f}x baseline")
+
+
+def _git_commit() -> str:
+    """
+    Return the current git commit hash, or None outside of a git checkout.
+    """
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=500)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Results file of a previous run to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.symbols, args.transactions, args.years, args.seed, args.repeat)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            compare(results, json.load(f))
@@ -1,12 +1,200 @@
-import yfinance as yf
-from datetime import datetime, timedelta
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, date as _date
+import numpy as np
 import pandas as pd
+from price_store import PriceStore, merge_intervals, missing_intervals
+from metadata_cache import TickerMetadataCache
+from market_data_providers import MarketDataProvider, create_provider
+from instrumentation import timed
+from price_matrix import PriceMatrix
+from trading_calendar import TradingCalendar
 
 class DataFetcher:
     """
-    A class to fetch stock data from Yahoo Finance using yfinance.
+    A class to fetch stock data from a market data provider (Yahoo Finance by default).
+
+    Daily bars are kept in a local PriceStore, so only date ranges that were never
+    fetched before go to the network. On top of the store, the loaded [start, end)
+    intervals of each symbol are tracked in memory and merged into one contiguous
+    series, so overlapping windows only load their uncovered parts.
+
+    A DataFetcher is shared by every portfolio of the process, so loads and merges of a
+    symbol's series run under a lock of that symbol, and batched downloads one at a time.
     """
-    
+
+    def __init__(self, store: PriceStore = None, min_fetch_days: int = 30, metadata: TickerMetadataCache = None,
+                 dividends_ttl: float = 24 * 3600, provider: MarketDataProvider = None):
+        """
+        Initialize the data fetcher.
+
+        :param provider: Source of market data. Chosen by create_provider() from the configuration if omitted.
+        :param store: PriceStore holding the daily bars. A default on-disk store is opened if omitted.
+        :param min_fetch_days: Number of days a missing window is padded by on each side, so that
+                               small neighbouring requests (e.g. date picker scrubbing) share one fetch
+        :param metadata: Cache of ticker metadata. A default on-disk cache is opened if omitted.
+        :param dividends_ttl: Seconds after which a stored dividend history is refreshed
+        """
+        self.provider = provider if provider is not None else create_provider()
+        # Data of different providers is never mixed in the same cache files
+        suffix = "" if self.provider.name == "yfinance" else f".{self.provider.name}"
+        self.store = store if store is not None else PriceStore(f"price_store{suffix}.sqlite")
+        self.metadata = metadata if metadata is not None else TickerMetadataCache(f"metadata_cache{suffix}.sqlite")
+        if self.metadata.loader is None:
+            self.metadata.loader = self.provider.metadata
+        self.dividends_ttl = dividends_ttl
+        self.min_fetch_days = min_fetch_days
+        self.upstream_calls = 0  # Number of requests sent to the provider
+        self.memory_hits = 0  # Reads served from the in-memory series
+        self.memory_misses = 0  # Reads that had to load at least one interval
+        self._loaded = {}  # symbol -> merged list of loaded (start, end) intervals
+        self._series = {}  # symbol -> contiguous DataFrame of the loaded daily bars
+        self.price_matrix = None  # Memory-mapped PriceMatrix attached by open_price_matrix
+        self.calendar = TradingCalendar()  # Sessions seen in the daily bars loaded so far
+        self._lock = threading.Lock()  # Guards the counters, the calendar and the per-symbol locks
+        self._symbol_locks = {}  # symbol -> Lock held while its in-memory series is loaded
+        self._batch_lock = threading.Lock()  # Held during a batched download
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        """
+        Return the lock guarding the in-memory series of a symbol.
+        """
+        with self._lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    @timed("data_fetcher._fetch_upstream")
+    def _fetch_upstream(self, symbol: str, start_date: str, end_date: str, interval: str = "1d") -> pd.DataFrame:
+        """
+        Fetch bars for the given period directly from the market data provider.
+
+        :param symbol: Stock symbol
+        :param start_date: Start date in 'YYYY-MM-DD' format (inclusive)
+        :param end_date: End date in 'YYYY-MM-DD' format (exclusive)
+        :param interval: Data interval
+        :return: DataFrame of bars indexed by timezone-naive dates
+        """
+        with self._lock:
+            self.upstream_calls += 1
+        return self.provider.history(symbol, start_date, end_date, interval=interval)
+
+    @timed("data_fetcher._fetch_upstream_many")
+    def _fetch_upstream_many(self, symbols: list, start_date: str, end_date: str) -> dict:
+        """
+        Fetch daily bars of several symbols from the market data provider in one batched request.
+
+        :param symbols: List of stock symbols
+        :param start_date: Start date in 'YYYY-MM-DD' format (inclusive)
+        :param end_date: End date in 'YYYY-MM-DD' format (exclusive)
+        :return: Dictionary mapping each symbol to its DataFrame of bars (empty if none were returned)
+        """
+        with self._lock:
+            self.upstream_calls += 1
+        return self.provider.history_many(symbols, start_date, end_date)
+
+    def _load_from_store(self, symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Return the daily bars of [start_date, end_date), fetching only the gaps missing from the store.
+
+        :param symbol: Stock symbol
+        :param start_date: Start date in 'YYYY-MM-DD' format (inclusive)
+        :param end_date: End date in 'YYYY-MM-DD' format (exclusive)
+        :return: DataFrame of daily bars indexed by date
+        """
+        gaps = self.store.missing_ranges(symbol, start_date, end_date)
+        self.store.record_lookup(gaps)
+        for gap_start, gap_end in gaps:
+            data = self._fetch_upstream(symbol, gap_start, gap_end)
+            self.store.write_bars(symbol, data, gap_start, gap_end)
+        return self.store.read_bars(symbol, start_date, end_date)
+
+    def _padded_window(self, start_date: str, end_date: str) -> tuple:
+        """
+        Widen a window by min_fetch_days on each side, without reaching past today.
+
+        :param start_date: Start date in 'YYYY-MM-DD' format (inclusive)
+        :param end_date: End date in 'YYYY-MM-DD' format (exclusive)
+        :return: Tuple (start, end) of the padded window
+        """
+        pad = timedelta(days=self.min_fetch_days)
+        today = _date.today().strftime("%Y-%m-%d")
+        padded_start = (datetime.strptime(start_date, "%Y-%m-%d") - pad).strftime("%Y-%m-%d")
+        padded_end = (datetime.strptime(end_date, "%Y-%m-%d") + pad).strftime("%Y-%m-%d")
+        return padded_start, max(end_date, min(padded_end, today))
+
+    def _ensure_loaded(self, symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Make sure [start_date, end_date) is in the in-memory series of a symbol, loading
+        only the sub-intervals that were not requested before.
+
+        :param symbol: Stock symbol
+        :param start_date: Start date in 'YYYY-MM-DD' format (inclusive)
+        :param end_date: End date in 'YYYY-MM-DD' format (exclusive)
+        :return: The whole in-memory series of daily bars (not a copy; do not modify it)
+        """
+        with self._symbol_lock(symbol):
+            loaded = self._loaded.get(symbol, [])
+            gaps = missing_intervals(start_date, end_date, loaded)
+            if not gaps:
+                with self._lock:
+                    self.memory_hits += 1
+                return self._series[symbol]
+
+            with self._lock:
+                self.memory_misses += 1
+            window_start, window_end = self._padded_window(gaps[0][0], gaps[-1][1])
+            frames = [self._series[symbol]] if symbol in self._series else []
+            for gap_start, gap_end in missing_intervals(window_start, window_end, loaded):
+                frames.append(self._load_from_store(symbol, gap_start, gap_end))
+            series = pd.concat(frames)
+            series = series[~series.index.duplicated(keep='last')].sort_index()
+            with self._lock:
+                self.calendar.add(series.index)
+            # Only the parts of the window the store now covers are remembered as loaded, so
+            # the current session is loaded again
+            covered = [(max(cov_start, window_start), min(cov_end, window_end))
+                       for cov_start, cov_end in self.store.covered_intervals(symbol)]
+            self._series[symbol] = series
+            self._loaded[symbol] = merge_intervals(loaded + covered)
+            return series
+
+    def _load_daily(self, symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Return the daily bars of [start_date, end_date), loading only what is not in memory yet.
+
+        :param symbol: Stock symbol
+        :param start_date: Start date in 'YYYY-MM-DD' format (inclusive)
+        :param end_date: End date in 'YYYY-MM-DD' format (exclusive)
+        :return: DataFrame of daily bars indexed by date
+        """
+        series = self._ensure_loaded(symbol, start_date, end_date)
+        return series[(series.index >= start_date) & (series.index < end_date)].copy()
+
+    def _close_at(self, symbol: str, date: str) -> float:
+        """
+        Return the close of a symbol at the last session on or before a date, at most 2 weeks back.
+
+        The trading calendar gives the session to look for, so usually only that session
+        has to be in memory; the 2-week lookback is only loaded if the symbol did not
+        trade on it. The close itself is found with a binary search on the series.
+
+        :param symbol: Stock symbol
+        :param date: Date in 'YYYY-MM-DD' format
+        :return: The close, or None if there is none within 2 weeks
+        """
+        target_date = datetime.strptime(date, "%Y-%m-%d")
+        day_after = (target_date + timedelta(days=1)).strftime("%Y-%m-%d")
+        lookback = (target_date - timedelta(days=14)).strftime("%Y-%m-%d")
+        session = self.calendar.last_session(date)
+        for start_date in dict.fromkeys([max(session or lookback, lookback), lookback]):
+            series = self._ensure_loaded(symbol, start_date, day_after)
+            row = series.index.searchsorted(pd.Timestamp(day_after), side='left') - 1
+            if row >= 0 and series.index[row] >= pd.Timestamp(start_date):
+                return float(series["Close"].iloc[row])
+        return None
+
+    @timed("data_fetcher.get_real_time_price")
     def get_real_time_price(self, symbol: str) -> float:
         """
         Fetch the real-time price for a given symbol.
@@ -15,13 +203,34 @@ class DataFetcher:
         :return: Current price as a float
         """
         try:
-            stock = yf.Ticker(symbol)
-            latest_price = stock.history(period="1d")["Close"].iloc[-1]
+            with self._lock:
+                self.upstream_calls += 1
+            latest_price = self.provider.latest_price(symbol)
             return latest_price
         except Exception as e:
             print(f"Error fetching real-time price for {symbol}: {e}")
             return 0.0
 
+    @timed("data_fetcher.get_real_time_prices")
+    def get_real_time_prices(self, symbols: list) -> dict:
+        """
+        Fetch the real-time prices of several symbols in one batched request.
+
+        :param symbols: List of stock symbols
+        :return: Dictionary mapping each symbol to its price (0.0 when it could not be fetched)
+        """
+        if not symbols:
+            return {}
+        try:
+            with self._lock:
+                self.upstream_calls += 1
+            latest_prices = self.provider.latest_prices(list(symbols))
+        except Exception as e:
+            print(f"Error fetching real-time prices for {', '.join(symbols)}: {e}")
+            latest_prices = {}
+        return {symbol: float(latest_prices.get(symbol) or 0.0) for symbol in symbols}
+
+    @timed("data_fetcher.get_price_at_date")
     def get_price_at_date(self, symbol: str, date: str) -> float:
         """
         Fetch the historical price for a given symbol at a specific date.
@@ -33,23 +242,8 @@ class DataFetcher:
         :return: Price at the given date or last available price within 2 weeks, as a float
         """
         try:
-            stock = yf.Ticker(symbol)
-            target_date = datetime.strptime(date, "%Y-%M-%d")
-            
-            # Fetch price for the given date
-            history = stock.history(start=target_date.strftime("%Y-%M-%d"), end=(target_date + timedelta(days=1)).strftime("%Y-%M-%d"))
-            
-            if not history.empty:
-                return history["Close"].iloc[-1]  # Return the price if available
-
-            # If no data is found for the exact date, look back 2 weeks
-            start_date = target_date - timedelta(days=14)
-            history = stock.history(start=start_date.strftime("%Y-%M-%d"), end=(target_date + timedelta(days=1)).strftime("%Y-%M-%d"))
-            
-            # Check if there's any available price within the 2-week range
-
-            if not history.empty:
-                last_available_price = history["Close"].iloc[-1]  # Get the last available price in the range
+            last_available_price = self._close_at(symbol, date)
+            if last_available_price is not None:
                 return last_available_price
             else:
                 print(f"No available data for {symbol} within the last 2 weeks from {date}.")
@@ -58,11 +252,13 @@ class DataFetcher:
         except Exception as e:
             print(f"Error fetching historical price for {symbol} on {date}: {e}")
             return 0.0
-        
+
     # Helper function to fetch historical stock data using yfinance
+    @timed("data_fetcher.fetch_stock_data")
     def fetch_stock_data(self, symbol: str, interval: str = "1d", start_date: str = "2020-01-01", end_date: str = "2023-01-01") -> pd.DataFrame:
         """
         Fetch historical stock data for the given symbol and time period using yfinance.
+        Daily data is served from the local price store whenever the range is already covered.
 
         Args:
         symbol (str): The stock ticker symbol.
@@ -74,8 +270,10 @@ class DataFetcher:
         pd.DataFrame: A DataFrame containing the historical stock data.
         """
         try:
-            stock = yf.Ticker(symbol)
-            data = stock.history(interval=interval, start=start_date, end=end_date)
+            if interval == "1d":
+                data = self._load_daily(symbol, start_date, end_date)
+            else:
+                data = self._fetch_upstream(symbol, start_date, end_date, interval=interval)
             if data.empty:
                 print(f"No data found for {symbol}.")
                 return None
@@ -83,3 +281,213 @@ class DataFetcher:
         except Exception as e:
             print(f"Error fetching data for {symbol}: {e}")
             return None
+
+    @timed("data_fetcher.fetch_many")
+    def fetch_many(self, symbols: list, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Fetch the daily close prices of several symbols at once.
+
+        Symbols whose range is not already available locally are downloaded together in
+        a single batched request; everything else is served from memory or the price store.
+
+        :param symbols: List of stock symbols
+        :param start_date: Start date in 'YYYY-MM-DD' format (inclusive)
+        :param end_date: End date in 'YYYY-MM-DD' format (exclusive)
+        :return: A wide DataFrame of close prices indexed by date, one column per symbol
+        """
+        symbols = list(dict.fromkeys(symbols))
+        self._prefetch_many(symbols, start_date, end_date)
+
+        closes = {}
+        for symbol in symbols:
+            try:
+                closes[symbol] = self._load_daily(symbol, start_date, end_date)["Close"]
+            except Exception as e:
+                print(f"Error fetching data for {symbol}: {e}")
+        prices = pd.DataFrame(closes, columns=symbols, dtype=float).sort_index()
+        prices.index.name = "Date"
+        return prices
+
+    def _prefetch_many(self, symbols: list, start_date: str, end_date: str):
+        """
+        Download in one batched request the bars of every symbol whose range is neither in
+        memory nor in the price store. Concurrent calls wait for each other, so a range
+        requested by several threads is only downloaded once.
+
+        :param symbols: List of stock symbols
+        :param start_date: Start date in 'YYYY-MM-DD' format (inclusive)
+        :param end_date: End date in 'YYYY-MM-DD' format (exclusive)
+        """
+        with self._batch_lock:
+            pending = {}
+            for symbol in symbols:
+                memory_gaps = missing_intervals(start_date, end_date, self._loaded.get(symbol, []))
+                if not memory_gaps:
+                    continue
+                window_start, window_end = self._padded_window(memory_gaps[0][0], memory_gaps[-1][1])
+                store_gaps = self.store.missing_ranges(symbol, window_start, window_end)
+                if store_gaps:
+                    self.store.record_lookup(store_gaps)
+                    pending[symbol] = store_gaps
+
+            if pending:
+                batch_start = min(gaps[0][0] for gaps in pending.values())
+                batch_end = max(gaps[-1][1] for gaps in pending.values())
+                try:
+                    batch = self._fetch_upstream_many(list(pending), batch_start, batch_end)
+                    for symbol in pending:
+                        bars = batch.get(symbol)
+                        # A batched download does not tell a failed symbol from one without bars: a symbol
+                        # missing from it stays uncovered and is fetched on its own (which raises on failure)
+                        if bars is not None and not bars.empty:
+                            self.store.write_bars(symbol, bars, batch_start, batch_end)
+                except Exception as e:
+                    # Symbols left uncovered are fetched one by one when they are read
+                    print(f"Error fetching batched data for {', '.join(pending)}: {e}")
+
+    @timed("data_fetcher.get_prices_at_date")
+    def get_prices_at_date(self, symbols: list, date: str) -> dict:
+        """
+        Fetch the prices of several symbols at a specific date, falling back to the last
+        available price within 2 weeks, like get_price_at_date.
+
+        :param symbols: List of stock symbols
+        :param date: Date in 'YYYY-MM-DD' format
+        :return: Dictionary mapping each symbol to its price (0.0 when no data is available)
+        """
+        target_date = datetime.strptime(date, "%Y-%m-%d")
+        start_date = (target_date - timedelta(days=14)).strftime("%Y-%m-%d")
+        end_date = (target_date + timedelta(days=1)).strftime("%Y-%m-%d")
+        self._prefetch_many(symbols, start_date, end_date)
+        prices = {}
+        for symbol in symbols:
+            try:
+                prices[symbol] = self._close_at(symbol, date) or 0.0
+            except Exception as e:
+                print(f"Error fetching historical price for {symbol} on {date}: {e}")
+                prices[symbol] = 0.0
+        return prices
+
+    @timed("data_fetcher.get_dividends")
+    def get_dividends(self, symbol: str) -> pd.Series:
+        """
+        Return the full dividend history of a symbol, refreshed from the provider at most
+        once per dividends_ttl.
+
+        :param symbol: Stock symbol
+        :return: A Series of per-share dividends indexed by ex-date
+        """
+        fetched_at = self.store.dividends_fetched_at(symbol)
+        if fetched_at is None or time.time() - fetched_at >= self.dividends_ttl:
+            try:
+                with self._lock:
+                    self.upstream_calls += 1
+                dividends = self.provider.dividends(symbol)
+                self.store.write_dividends(symbol, dividends)
+            except Exception as e:
+                print(f"Error fetching dividends for {symbol}: {e}")
+        return self.store.read_dividends(symbol)
+
+    @timed("data_fetcher.get_ticker_metadata")
+    def get_ticker_metadata(self, symbol: str, field: str):
+        """
+        Return a metadata field of a ticker ('info', 'sustainability', 'recommendations'
+        or 'major_holders') from the metadata cache.
+
+        :param symbol: Stock symbol
+        :param field: Metadata field
+        :return: The field value, in the yfinance layout
+        """
+        return self.metadata.get(symbol, field)
+
+    @timed("data_fetcher.get_ticker_metadata_many")
+    def get_ticker_metadata_many(self, symbols: list, fields: list, max_workers: int = 8, timeout: float = 10.0) -> tuple:
+        """
+        Fetch several metadata fields of several tickers concurrently.
+
+        Every (symbol, field) request runs on its own worker thread, at most max_workers at a
+        time. A request that fails or does not finish within the timeout of its start is
+        reported in the errors instead of delaying the others: it gives up its place to the
+        next request, and its answer is ignored if it ever comes.
+
+        :param symbols: List of stock symbols
+        :param fields: List of metadata fields, e.g. ['info', 'sustainability']
+        :param max_workers: Number of requests running at once
+        :param timeout: Seconds to wait for each request, counted from when it starts running
+        :return: Tuple (values, errors) of dictionaries keyed by (symbol, field)
+        """
+        values, errors = {}, {}
+        answers = queue.Queue()  # (key, value, error) of every finished request
+
+        def fetch(key):
+            try:
+                answers.put((key, self.get_ticker_metadata(*key), None))
+            except Exception as e:
+                answers.put((key, None, e))
+
+        waiting = deque((symbol, field) for symbol in symbols for field in fields)
+        running = {}  # (symbol, field) -> deadline of the request
+        while waiting or running:
+            while waiting and len(running) < max_workers:
+                key = waiting.popleft()
+                running[key] = time.monotonic() + timeout
+                threading.Thread(target=fetch, args=(key,), name="metadata-fetch", daemon=True).start()
+            try:
+                key, value, error = answers.get(timeout=max(0.0, min(running.values()) - time.monotonic()))
+                if running.pop(key, None) is not None:
+                    if error is None:
+                        values[key] = value
+                    else:
+                        errors[key] = error
+            except queue.Empty:
+                now = time.monotonic()
+                for key in [key for key, deadline in running.items() if deadline <= now]:
+                    del running[key]
+                    errors[key] = TimeoutError(f"No {key[1]} for {key[0]} within {timeout} s")
+        return values, errors
+
+    def export_price_matrix(self, path: str, symbols: list, start_date: str, end_date: str, dtype=np.float32) -> PriceMatrix:
+        """
+        Write the closes of symbols over a period to a memory-mapped price matrix and attach it.
+
+        :param path: Path of the matrix files, without extension
+        :param symbols: List of stock symbols (columns)
+        :param start_date: Start date in 'YYYY-MM-DD' format (inclusive)
+        :param end_date: End date in 'YYYY-MM-DD' format (exclusive)
+        :param dtype: np.float32 (half the size) or np.float64
+        :return: The attached PriceMatrix
+        """
+        prices = self.fetch_many(symbols, start_date, end_date).reindex(columns=list(symbols))
+        self.price_matrix = PriceMatrix.create(path, prices.dropna(how='all'), dtype=dtype)
+        return self.price_matrix
+
+    def open_price_matrix(self, path: str) -> PriceMatrix:
+        """
+        Map a price matrix written by export_price_matrix and attach it, so that range
+        valuations covered by it read the matrix instead of loading bars.
+
+        :param path: Path of the matrix files, without extension
+        :return: The attached PriceMatrix
+        """
+        self.price_matrix = PriceMatrix.open(path)
+        return self.price_matrix
+
+    def get_cache_stats(self) -> dict:
+        """
+        Return the price store hit/miss counters together with the number of upstream calls.
+
+        :return: Dictionary of counters
+        """
+        with self._lock:
+            counters = {'memory_hits': self.memory_hits, 'memory_misses': self.memory_misses,
+                        'upstream_calls': self.upstream_calls}
+        return {**self.store.stats(), **counters, 'metadata': self.metadata.stats()}
+
+    def loaded_intervals(self, symbol: str) -> list:
+        """
+        Return the [start, end) intervals of a symbol currently held in memory.
+
+        :param symbol: Stock symbol
+        :return: List of (start, end) tuples
+        """
+        return list(self._loaded.get(symbol, []))
@@ -0,0 +1,96 @@
+import pandas as pd
+from valuation import ledger_symbols
+
+
+def lots_frame(assets: dict, realized: list = ()) -> pd.DataFrame:
+    """
+    Flatten the lots of a ledger into one table of holding periods.
+
+    Open lots come from the ledger and the shares already sold from the realized gain
+    records, one holding period per lot (or part of a lot) sold, ending on its sale date.
+
+    :param assets: Ledger in the Portfolio.assets layout {symbol: {txn_id: txn}}
+    :param realized: Realized gain records of the LotEngine
+    :return: A DataFrame with columns Symbol, Quantity, Start (acquisition date) and End
+             (disposal date, NaT while the lot is still held)
+    """
+    rows = [
+        (symbol, txn['quantity'], txn['date'], None)
+        for symbol, transactions in assets.items() if symbol != 'CASH'
+        for txn in transactions.values()
+    ]
+    rows.extend((record['symbol'], record['quantity'], record['acquired'], record['date']) for record in realized)
+    lots = pd.DataFrame(rows, columns=['Symbol', 'Quantity', 'Start', 'End'])
+    lots['Start'] = pd.to_datetime(lots['Start'])
+    lots['End'] = pd.to_datetime(lots['End'])
+    return lots
+
+
+def entitled_dividends(lots: pd.DataFrame, dividends: pd.DataFrame) -> pd.DataFrame:
+    """
+    Match every dividend against the lots that were held on its ex-date, in one join.
+
+    A lot is entitled to a dividend if it was acquired before the ex-date and not
+    disposed of before the ex-date.
+
+    :param lots: Holding periods as returned by lots_frame
+    :param dividends: A DataFrame with columns Symbol, Date (ex-date) and Dividend (per share)
+    :return: A DataFrame with columns Symbol, Date and Amount, one row per paid dividend and lot
+    """
+    matched = lots.merge(dividends, on='Symbol', how='inner')
+    held = (matched['Start'] < matched['Date']) & (matched['End'].isna() | (matched['End'] >= matched['Date']))
+    matched = matched[held]
+    return pd.DataFrame({
+        'Symbol': matched['Symbol'].to_numpy(),
+        'Date': matched['Date'].to_numpy(),
+        'Amount': (matched['Quantity'] * matched['Dividend']).to_numpy(dtype=float)
+    }).sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+class DividendLedger:
+    """
+    Dividend income of a portfolio computed per lot by ex-date.
+
+    Dividend histories come from the portfolio's DataFetcher (which keeps them in its
+    local store), and the matched payments of the latest date and ledger state are
+    memoized, so the dividend chart and the income table share one computation.
+    """
+
+    def __init__(self):
+        self._payments = {}  # (date, portfolio version) -> payments DataFrame
+
+    def payments(self, portfolio, date: str) -> pd.DataFrame:
+        """
+        Return the dividends the portfolio was entitled to up to a date.
+
+        :param portfolio: The Portfolio whose lots are matched
+        :param date: Last ex-date included, in 'YYYY-MM-DD' format
+        :return: A DataFrame with columns Symbol, Date and Amount
+        """
+        key = (date, portfolio.version)
+        if key not in self._payments:
+            realized = portfolio.lot_engine.realized
+            symbols = ledger_symbols(portfolio.assets, realized)
+            frames = []
+            for symbol in symbols:
+                history = portfolio.data_fetcher.get_dividends(symbol)
+                history = history[history.index <= date]
+                frames.append(pd.DataFrame({'Symbol': symbol, 'Date': history.index, 'Dividend': history.to_numpy()}))
+            dividends = pd.concat(frames) if frames else pd.DataFrame(columns=['Symbol', 'Date', 'Dividend'])
+            dividends['Date'] = pd.to_datetime(dividends['Date'])
+            self._payments = {key: entitled_dividends(lots_frame(portfolio.assets, realized), dividends)}
+        return self._payments[key]
+
+    def income(self, portfolio, date: str, freq: str = 'ME') -> pd.DataFrame:
+        """
+        Return the dividend income per period and its running total.
+
+        :param portfolio: The Portfolio whose lots are matched
+        :param date: Last ex-date included, in 'YYYY-MM-DD' format
+        :param freq: Pandas period frequency, e.g. 'ME' for monthly or 'YE' for yearly
+        :return: A DataFrame indexed by period end with columns Amount and Cumulative
+        """
+        payments = self.payments(portfolio, date)
+        income = payments.set_index('Date')['Amount'].resample(freq).sum().to_frame()
+        income['Cumulative'] = income['Amount'].cumsum()
+        return income
@@ -0,0 +1,88 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+
+class FigureCache:
+    """
+    An LRU cache of built figures and tables.
+
+    Entries are keyed on the portfolio version, so any transaction makes the previous
+    entries unreachable and they age out through LRU eviction. Entries built without a
+    simulation date depend on live prices and expire after live_ttl seconds.
+    """
+
+    def __init__(self, maxsize: int = 128, live_ttl: float = 60.0):
+        """
+        :param maxsize: Maximum number of cached entries
+        :param live_ttl: Lifetime in seconds of entries built from live prices
+        """
+        self.maxsize = maxsize
+        self.live_ttl = live_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (built_at, live, value)
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build, live: bool = False):
+        """
+        Return the cached value of a key, building and storing it on a miss.
+
+        :param key: Hashable cache key
+        :param build: Function without arguments that builds the value
+        :param live: True if the value depends on live prices
+        :return: The cached or freshly built value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not (entry[1] and time.time() - entry[0] >= self.live_ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        value = build()
+        with self._lock:
+            self._entries[key] = (time.time(), live, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        """
+        Drop every cached entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the hit/miss counters and the current size of the cache.
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._entries)
+        }
+
+
+figure_cache = FigureCache()
+
+
+def memoize_figure(builder):
+    """
+    Memoize a visualization builder called as builder(portfolio, *args).
+
+    The cache key is the builder name, the portfolio version and simulation date, and
+    the remaining arguments (e.g. the start and end dates of a chart).
+    """
+    @functools.wraps(builder)
+    def wrapper(portfolio, *args, **kwargs):
+        key = (builder.__name__, portfolio.version, portfolio.simulation_date, args, tuple(sorted(kwargs.items())))
+        return figure_cache.get_or_build(
+            key, lambda: builder(portfolio, *args, **kwargs), live=not portfolio.simulation_date
+        )
+    return wrapper
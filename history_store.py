@@ -0,0 +1,290 @@
+import re
+import numpy as np
+import pandas as pd
+
+TYPES = ('Cash', 'Buy', 'Sell')  # Operation types, stored as their position
+COLUMNS = ['Transaction ID', 'Symbol', 'Quantity', 'Price', 'Date', 'Type']
+
+# One condition of a DataTable filter query, e.g. "{Symbol} contains AAPL" or "{Quantity} >= 10"
+_CONDITION = re.compile(r"^\s*\{(?P<column>[^}]+)\}\s*(?P<operator>>=|<=|!=|=|<|>|eq|ne|lt|le|gt|ge|contains|datestartswith)\s*(?P<value>.*?)\s*$")
+_OPERATORS = {'eq': '=', 'ne': '!=', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>='}
+
+
+def parse_filter(filter_query: str) -> list:
+    """
+    Parse a Dash DataTable filter query into conditions.
+
+    :param filter_query: Conditions joined with '&&', e.g. "{Symbol} contains AAPL && {Quantity} > 5"
+    :return: List of (column, operator, value) with the value unquoted
+    """
+    conditions = []
+    for part in (filter_query or '').split('&&'):
+        match = _CONDITION.match(part)
+        if not match:
+            continue
+        value = match.group('value')
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'`':
+            value = value[1:-1]
+        operator = _OPERATORS.get(match.group('operator'), match.group('operator'))
+        conditions.append((match.group('column'), operator, value))
+    return conditions
+
+
+def _compare(values: np.ndarray, operator: str, value) -> np.ndarray:
+    if operator == '=':
+        return values == value
+    if operator == '!=':
+        return values != value
+    if operator == '<':
+        return values < value
+    if operator == '<=':
+        return values <= value
+    if operator == '>':
+        return values > value
+    return values >= value
+
+
+class HistoryStore:
+    """
+    Columnar operation history of a portfolio: one row per cash movement, purchase and sale.
+
+    Each column is a NumPy array grown by doubling, so recording an operation is O(1),
+    and queries filter, sort and slice the arrays to build only the requested page. The
+    symbol index maps each symbol to its rows and the date index is the row order by date
+    (rebuilt on the first query after an append), so symbol and date conditions select
+    their rows without scanning the table.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._reset(capacity)
+
+    def _reset(self, capacity: int):
+        self.size = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.codes = np.zeros(capacity, dtype=np.int32)  # Position of the symbol in self.symbols
+        self.quantities = np.zeros(capacity, dtype=np.float64)
+        self.prices = np.zeros(capacity, dtype=np.float64)
+        self.dates = np.zeros(capacity, dtype='datetime64[D]')
+        self.types = np.zeros(capacity, dtype=np.int8)
+        self.symbols = []
+        self.symbol_codes = {}
+        self.symbol_rows = {}  # Symbol index: code -> list of rows
+        self._date_order = None  # Date index: rows sorted by date, None when stale
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _grow(self, capacity: int):
+        for name in ('ids', 'codes', 'quantities', 'prices', 'dates', 'types'):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def _code(self, symbol: str) -> int:
+        if symbol not in self.symbol_codes:
+            self.symbol_codes[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self.symbol_rows[self.symbol_codes[symbol]] = []
+        return self.symbol_codes[symbol]
+
+    def append(self, txn_id: int, symbol: str, quantity: float, price: float, date: str, kind: str):
+        """
+        Record an operation.
+
+        :param txn_id: Transaction ID
+        :param symbol: Stock symbol, or 'CASH'
+        :param quantity: Shares bought (negative when sold) or cash amount
+        :param price: Price per share (1 for cash)
+        :param date: Date in 'YYYY-MM-DD' format
+        :param kind: One of TYPES
+        """
+        if self.size == len(self.ids):
+            self._grow(2 * max(len(self.ids), 1))
+        row = self.size
+        code = self._code(symbol)
+        self.ids[row] = txn_id or 0
+        self.codes[row] = code
+        self.quantities[row] = quantity
+        self.prices[row] = price
+        self.dates[row] = np.datetime64(date, 'D')
+        self.types[row] = TYPES.index(kind)
+        self.symbol_rows[code].append(row)
+        self.size += 1
+        self._date_order = None
+
+    def rebuild(self, assets: dict, realized: list):
+        """
+        Rebuild the history from a ledger in the Portfolio.assets layout and its realized gains.
+
+        Purchases are listed with their original quantity: the quantity still held plus
+        the quantity sold from the lot.
+
+        :param assets: Dictionary {symbol: {txn_id: txn}}
+        :param realized: Realized gain records of the LotEngine, in sale order
+        """
+        sold = {}
+        for record in realized:
+            key = (record['symbol'], record['lot_id'])
+            sold[key] = sold.get(key, 0) + record['quantity']
+
+        operations = []
+        for symbol, transactions in assets.items():
+            for txn_id, txn in transactions.items():
+                if symbol == 'CASH':
+                    operations.append((int(txn_id), symbol, txn['quantity'], txn['price'], txn['date'], 'Cash'))
+                else:
+                    sold_quantity = sold.pop((symbol, str(txn_id)), 0)
+                    operations.append((int(txn_id), symbol, txn['quantity'] + sold_quantity, txn['price'], txn['date'], 'Buy'))
+        # Lots sold entirely are only left in the realized gains
+        lots = {}
+        for record in realized:
+            key = (record['symbol'], record['lot_id'])
+            if key in sold and key not in lots:
+                lots[key] = (int(record['lot_id']), record['symbol'], sold[key], record['cost'], record['acquired'], 'Buy')
+        operations.extend(lots.values())
+        # One sale row per sale across the lots it consumed
+        sales = {}
+        for record in realized:
+            key = (record['txn_id'], record['symbol'], record['date'])
+            quantity = sales[key][2] if key in sales else 0
+            sales[key] = (record['txn_id'] or 0, record['symbol'], quantity - record['quantity'], record['price'], record['date'], 'Sell')
+        operations.extend(sales.values())
+        operations.sort(key=lambda operation: operation[0])
+
+        self._reset(max(1024, len(operations)))
+        for operation in operations:
+            self.append(*operation)
+
+    def _symbol_lookup(self) -> np.ndarray:
+        return np.asarray(self.symbols, dtype=object)
+
+    def _date_index(self) -> tuple:
+        if self._date_order is None:
+            self._date_order = np.argsort(self.dates[:self.size], kind='stable')
+        return self._date_order, self.dates[:self.size][self._date_order]
+
+    def _date_rows(self, operator: str, value: str):
+        """
+        Return the rows matching a date condition from the date index (None if it cannot be used).
+        """
+        order, dates = self._date_index()
+        value = value.strip()
+        try:
+            if operator in ('contains', 'datestartswith'):
+                unit = {4: 'Y', 7: 'M', 10: 'D'}.get(len(value))
+                if unit is None:
+                    return None
+                start = np.datetime64(value, unit)
+                low, high = start.astype('datetime64[D]'), (start + 1).astype('datetime64[D]')
+                return order[np.searchsorted(dates, low, 'left'):np.searchsorted(dates, high, 'left')]
+            day = np.datetime64(value[:10], 'D')
+        except ValueError:
+            return np.array([], dtype=np.int64)
+        if operator == '=':
+            return order[np.searchsorted(dates, day, 'left'):np.searchsorted(dates, day, 'right')]
+        if operator == '<':
+            return order[:np.searchsorted(dates, day, 'left')]
+        if operator == '<=':
+            return order[:np.searchsorted(dates, day, 'right')]
+        if operator == '>':
+            return order[np.searchsorted(dates, day, 'right'):]
+        if operator == '>=':
+            return order[np.searchsorted(dates, day, 'left'):]
+        return None
+
+    def _mask(self, rows: np.ndarray, column: str, operator: str, value: str) -> np.ndarray:
+        """
+        Evaluate a condition on some rows.
+        """
+        if column in ('Symbol', 'Type'):
+            names = self._symbol_lookup()[self.codes[rows]] if column == 'Symbol' else np.asarray(TYPES, dtype=object)[self.types[rows]]
+            if operator in ('contains', 'datestartswith'):
+                return np.char.find(np.char.upper(names.astype(str)), value.upper()) >= 0
+            return _compare(names, operator, value.upper() if column == 'Symbol' else value.capitalize())
+        if column == 'Date':
+            day = self.dates[rows]
+            if operator in ('contains', 'datestartswith'):
+                return np.char.startswith(day.astype(str), value)
+            return _compare(day, operator, np.datetime64(value[:10], 'D'))
+        values = {'Transaction ID': self.ids, 'Quantity': self.quantities, 'Price': self.prices}[column][rows]
+        return _compare(values, '=' if operator in ('contains', 'datestartswith') else operator, float(value))
+
+    def select(self, filter_query: str = None) -> np.ndarray:
+        """
+        Return the rows matching a DataTable filter query.
+
+        Symbol equality and date conditions are answered from the indexes; the other
+        conditions are then evaluated on the remaining rows only.
+        """
+        rows = None
+        remaining = []
+        for column, operator, value in parse_filter(filter_query):
+            selected = None
+            if column == 'Symbol' and operator == '=':
+                code = self.symbol_codes.get(value.upper())
+                selected = np.asarray(self.symbol_rows[code] if code is not None else [], dtype=np.int64)
+            elif column == 'Date':
+                selected = self._date_rows(operator, value)
+            if selected is None:
+                remaining.append((column, operator, value))
+            else:
+                rows = np.sort(selected) if rows is None else np.intersect1d(rows, selected, assume_unique=True)
+        if rows is None:
+            rows = np.arange(self.size)
+        for column, operator, value in remaining:
+            if column not in COLUMNS:
+                continue
+            try:
+                rows = rows[self._mask(rows, column, operator, value)]
+            except ValueError:
+                return np.array([], dtype=np.int64)
+        return rows
+
+    def _sort(self, rows: np.ndarray, sort_by: list) -> np.ndarray:
+        """
+        Order rows by DataTable sort_by specifications ({'column_id', 'direction'}).
+        """
+        keys = []
+        for sort in reversed(sort_by or [{'column_id': 'Transaction ID', 'direction': 'desc'}]):
+            column = sort['column_id']
+            if column == 'Symbol':
+                ranks = np.argsort(np.argsort(np.asarray(self.symbols, dtype=object)))
+                key = ranks[self.codes[rows]] if len(self.symbols) else self.codes[rows]
+            elif column == 'Type':
+                key = np.argsort(np.argsort(TYPES))[self.types[rows]]
+            elif column == 'Date':
+                key = self.dates[rows].astype(np.int64)
+            elif column in ('Transaction ID', 'Quantity', 'Price'):
+                key = {'Transaction ID': self.ids, 'Quantity': self.quantities, 'Price': self.prices}[column][rows]
+            else:
+                continue
+            keys.append(-key if sort.get('direction') == 'desc' else key)
+        return rows[np.lexsort(keys)] if keys else rows
+
+    def frame(self, rows: np.ndarray = None) -> pd.DataFrame:
+        """
+        Return rows of the history as a DataFrame with the COLUMNS (every row if omitted).
+        """
+        rows = np.arange(self.size) if rows is None else rows
+        return pd.DataFrame({
+            'Transaction ID': self.ids[rows],
+            'Symbol': self._symbol_lookup()[self.codes[rows]],
+            'Quantity': self.quantities[rows].round(2),
+            'Price': self.prices[rows].round(2),
+            'Date': self.dates[rows].astype(str),
+            'Type': np.asarray(TYPES, dtype=object)[self.types[rows]]
+        }, columns=COLUMNS)
+
+    def query(self, filter_query: str = None, sort_by: list = None, page: int = 0, page_size: int = 50) -> tuple:
+        """
+        Filter, sort and page the history.
+
+        :param filter_query: Dash DataTable filter query
+        :param sort_by: Dash DataTable sort_by list (Transaction ID descending by default)
+        :param page: Page number, from 0
+        :param page_size: Number of rows per page
+        :return: Tuple (DataFrame of the page, number of matching rows)
+        """
+        rows = self._sort(self.select(filter_query), sort_by)
+        return self.frame(rows[page * page_size:(page + 1) * page_size]), len(rows)
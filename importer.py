@@ -0,0 +1,251 @@
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from instrumentation import timed
+
+# Canonical statement columns and the broker headers recognized for each (case-insensitive)
+COLUMN_ALIASES = {
+    'date': ['date', 'trade date', 'transaction date', 'run date', 'settlement date', 'dttrade', 'dtposted'],
+    'action': ['action', 'type', 'transaction type', 'activity', 'description'],
+    'symbol': ['symbol', 'ticker', 'security'],
+    'quantity': ['quantity', 'qty', 'shares', 'units'],
+    'price': ['price', 'unit price', 'price ($)', 'unitprice'],
+    'amount': ['amount', 'net amount', 'amount ($)', 'total', 'trnamt'],
+    'fees': ['fees', 'fee', 'commission', 'commissions']
+}
+
+# Operation kinds, and the action keywords classifying statement rows into them (first match wins)
+DEPOSIT, WITHDRAWAL, INCOME, BUY, SELL = range(5)
+ACTION_KEYWORDS = [
+    (BUY, r'buy|bought|reinvest'),
+    (SELL, r'sell|sold'),
+    (INCOME, r'dividend|interest|income'),
+    (WITHDRAWAL, r'withdraw|transfer out|debit'),
+    (DEPOSIT, r'deposit|contribution|transfer in|credit')
+]
+
+
+def _normalize(chunk: pd.DataFrame, column_map: dict, first_line: int) -> pd.DataFrame:
+    """
+    Convert a chunk of statement rows to the canonical columns.
+
+    :return: DataFrame with columns line, date, kind, symbol, quantity, price and cash (the
+             signed cash movement of the row); rows with an unrecognized action are dropped
+    """
+    headers = {str(column).strip().lower(): column for column in chunk.columns}
+    columns = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        source = column_map.get(name) or next((headers[alias] for alias in aliases if alias in headers), None)
+        if source is None and name in ('date', 'action'):
+            raise ValueError(f"The statement has no {name} column")
+        columns[name] = chunk[source] if source is not None else pd.Series(np.nan, index=chunk.index)
+
+    action = columns['action'].astype(str).str.lower()
+    kind = np.select([action.str.contains(pattern, regex=True).to_numpy() for _, pattern in ACTION_KEYWORDS],
+                     [kind for kind, _ in ACTION_KEYWORDS], default=-1)
+    numbers = {name: pd.to_numeric(columns[name].astype(str).str.replace(r'[$,()\s]', '', regex=True), errors='coerce')
+               for name in ('quantity', 'price', 'amount', 'fees')}
+    quantity = numbers['quantity'].abs().to_numpy()
+    price = numbers['price'].abs().to_numpy()
+    amount = numbers['amount'].abs().to_numpy()
+    fees = numbers['fees'].fillna(0).abs().to_numpy()
+
+    trade = (kind == BUY) | (kind == SELL)
+    # Trades without a price are priced from their amount
+    price = np.where(trade & np.isnan(price) & (quantity > 0), amount / quantity, price)
+    cash = np.select([kind == BUY, kind == SELL, kind == WITHDRAWAL],
+                     [-(quantity * price) - fees, quantity * price - fees, -amount], default=amount)
+
+    frame = pd.DataFrame({
+        'line': first_line + np.arange(len(chunk)),
+        'date': pd.to_datetime(columns['date'], errors='coerce').dt.strftime('%Y-%m-%d').to_numpy(),
+        'kind': kind,
+        'symbol': columns['symbol'].astype(str).str.strip().str.upper().to_numpy(),
+        'quantity': np.where(trade, quantity, 0.0),
+        'price': np.where(trade, price, 1.0),
+        'cash': cash
+    })
+    frame = frame[frame['kind'] >= 0]
+    invalid = frame['date'].isna() | frame['cash'].isna() | (
+        frame['kind'].isin([BUY, SELL]) & ~((frame['quantity'] > 0) & (frame['price'] > 0)))
+    if invalid.any():
+        raise ValueError(f"Invalid statement row at line {int(frame.loc[invalid, 'line'].iloc[0])}")
+    return frame
+
+
+def _ofx_value(block: str, tag: str):
+    match = re.search(rf'<{tag}>([^<\r\n]+)', block, re.IGNORECASE)
+    return match.group(1).strip() if match else None
+
+
+def read_ofx(path: str) -> pd.DataFrame:
+    """
+    Read the stock trades and cash transactions of an OFX investment statement.
+
+    Securities are identified by the TICKER of the statement's security list. Both the
+    SGML (unclosed tags) and the XML flavours are accepted.
+
+    :param path: Path of the .ofx/.qfx file
+    :return: DataFrame with the columns date, action, symbol, quantity, price, amount and fees
+    """
+    with open(path, 'r', errors='replace') as f:
+        text = f.read()
+    tickers = {}
+    for block in re.findall(r'<SECINFO>(.*?)</SECINFO>', text, re.IGNORECASE | re.DOTALL):
+        if _ofx_value(block, 'UNIQUEID') and _ofx_value(block, 'TICKER'):
+            tickers[_ofx_value(block, 'UNIQUEID')] = _ofx_value(block, 'TICKER')
+
+    rows = []
+    for action, tag in (('buy', 'BUYSTOCK|BUYMF|BUYOTHER'), ('sell', 'SELLSTOCK|SELLMF|SELLOTHER')):
+        for block in re.findall(rf'<(?:{tag})>(.*?)</(?:{tag})>', text, re.IGNORECASE | re.DOTALL):
+            security = _ofx_value(block, 'UNIQUEID')
+            rows.append({
+                'date': (_ofx_value(block, 'DTTRADE') or '')[:8],
+                'action': action,
+                'symbol': tickers.get(security, security),
+                'quantity': _ofx_value(block, 'UNITS'),
+                'price': _ofx_value(block, 'UNITPRICE'),
+                'amount': _ofx_value(block, 'TOTAL'),
+                'fees': _ofx_value(block, 'COMMISSION')
+            })
+    for block in re.findall(r'<INCOME>(.*?)</INCOME>', text, re.IGNORECASE | re.DOTALL):
+        rows.append({'date': (_ofx_value(block, 'DTTRADE') or '')[:8], 'action': 'dividend',
+                     'amount': _ofx_value(block, 'TOTAL')})
+    for block in re.findall(r'<STMTTRN>(.*?)</STMTTRN>', text, re.IGNORECASE | re.DOTALL):
+        amount = float(_ofx_value(block, 'TRNAMT') or 'nan')
+        rows.append({'date': (_ofx_value(block, 'DTPOSTED') or '')[:8],
+                     'action': 'deposit' if amount >= 0 else 'withdrawal', 'amount': amount})
+
+    frame = pd.DataFrame(rows, columns=['date', 'action', 'symbol', 'quantity', 'price', 'amount', 'fees'])
+    frame['date'] = pd.to_datetime(frame['date'], format='%Y%m%d', errors='coerce')
+    return frame.sort_values('date', kind='stable')
+
+
+def read_statement(path: str, column_map: dict = None, chunksize: int = 50000) -> pd.DataFrame:
+    """
+    Read a broker statement into canonical operations, sorted by date.
+
+    CSV files are parsed chunk by chunk, each chunk being reduced to a few typed columns
+    before the next one is read.
+
+    :param path: Path of a .csv or .ofx/.qfx statement
+    :param column_map: Canonical column names ('date', 'action', 'symbol', 'quantity',
+                       'price', 'amount', 'fees') mapped to the statement's headers, for
+                       headers not in COLUMN_ALIASES
+    :param chunksize: Number of CSV rows parsed at once
+    :return: DataFrame with columns line, date, kind, symbol, quantity, price and cash
+    """
+    column_map = column_map or {}
+    if path.lower().endswith(('.ofx', '.qfx')):
+        chunks = [_normalize(read_ofx(path), column_map, first_line=1)]
+    else:
+        chunks = []
+        first_line = 2  # Line numbers of the file, after the header
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str, skipinitialspace=True):
+            chunks.append(_normalize(chunk, column_map, first_line))
+            first_line += len(chunk)
+    if not chunks:
+        return _normalize(pd.DataFrame(columns=['date', 'action']), column_map, 2)
+    operations = pd.concat(chunks, ignore_index=True)
+    if operations['date'].is_monotonic_decreasing and not operations['date'].is_monotonic_increasing:
+        operations = operations.iloc[::-1]  # Newest first: same-day rows are listed in reverse too
+    return operations.sort_values('date', kind='stable', ignore_index=True)
+
+
+def validate(portfolio, operations: pd.DataFrame):
+    """
+    Check in one vectorized pass that the operations can be applied in order on top of
+    the portfolio: every cash movement must leave a balance above zero, the rule of
+    add_cash and execute_orders, and the holdings must never go negative.
+
+    :raises ValueError: Naming the first statement line that empties cash or sells
+                        more shares than held
+    """
+    cash = operations['cash'].to_numpy()
+    balance = portfolio.positions.cash + np.cumsum(cash)
+    overdrawn = np.flatnonzero((cash != 0) & (balance <= 1e-6))
+    if len(overdrawn):
+        row = operations.iloc[overdrawn[0]]
+        raise ValueError(f"Not enough cash at line {row['line']} ({row['date']}): balance {balance[overdrawn[0]]:.2f}")
+
+    trades = operations[operations['kind'].isin([BUY, SELL])]
+    signed = np.where(trades['kind'] == BUY, trades['quantity'], -trades['quantity'])
+    held = trades['symbol'].map(portfolio.positions.quantities).fillna(0).to_numpy()
+    holdings = pd.Series(signed, index=trades.index).groupby(trades['symbol'].to_numpy()).cumsum().to_numpy() + held
+    oversold = np.flatnonzero(holdings < -1e-9)
+    if len(oversold):
+        row = trades.iloc[oversold[0]]
+        raise ValueError(f"Not enough {row['symbol']} shares to sell at line {row['line']} ({row['date']})")
+
+
+@timed("importer.import_statement")
+def import_statement(portfolio, path: str, column_map: dict = None, chunksize: int = 50000,
+                     method: str = 'fifo', prefetch: bool = True) -> dict:
+    """
+    Import the trades and cash transactions of a broker statement into a portfolio.
+
+    Unlike replaying the statement through add_cash/buy_asset/sell_asset, no price is
+    fetched per line: trades are booked at the statement prices. The whole statement is
+    validated before anything is written, so a rejected statement leaves the portfolio
+    untouched. The ledger is then written in bulk, and persisted with a single snapshot
+    when the portfolio is attached to a journal. Finally, the close history of each traded
+    symbol is prefetched from its first trade date, so that later valuations hit the store.
+
+    Rows are classified by their action (see ACTION_KEYWORDS): deposits are cash inflows,
+    dividends and interest are cash income, and rows with other actions are skipped.
+
+    :param portfolio: The Portfolio to import into
+    :param path: Path of a .csv or .ofx/.qfx statement
+    :param column_map: Canonical column names mapped to the statement's headers
+    :param chunksize: Number of CSV rows parsed at once
+    :param method: Lot matching method of the sales
+    :param prefetch: False to skip prefetching the price history
+    :return: Dictionary with the number of operations, buys and sells, the inflows,
+             the symbols traded, and the first and last dates
+    """
+    operations = read_statement(path, column_map, chunksize)
+    validate(portfolio, operations)
+    if operations.empty:
+        return {'operations': 0, 'buys': 0, 'sells': 0, 'inflows': 0.0, 'symbols': [], 'start': None, 'end': None}
+
+    # Nothing after this point can be rejected: book every operation in the ledger
+    portfolio.profit_series.invalidate(operations['date'].iloc[0])
+    first_trades = {}
+    for date, kind, symbol, quantity, price, cash in zip(*(operations[column].tolist() for column in
+                                                          ('date', 'kind', 'symbol', 'quantity', 'price', 'cash'))):
+        portfolio.transaction_id += 1
+        portfolio._apply_cash(portfolio.transaction_id, cash, date, kind == DEPOSIT)
+        if kind == BUY:
+            portfolio.transaction_id += 1
+            portfolio._apply_buy(portfolio.transaction_id, symbol, quantity, price, date)
+            first_trades.setdefault(symbol, date)
+        elif kind == SELL:
+            portfolio.transaction_id += 1
+            portfolio._apply_sell(symbol, quantity, price, date, portfolio.transaction_id, method)
+    if portfolio.journal is not None:
+        portfolio.save_portfolio(portfolio.snapshot_filename)
+
+    if prefetch and first_trades:
+        # One batched fetch per year of first trades, so each symbol is fetched from its first trade only
+        end_date = portfolio.simulation_date or datetime.now().strftime("%Y-%m-%d")
+        fetch_end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        groups = defaultdict(list)
+        for symbol, date in first_trades.items():
+            groups[date[:4]].append((symbol, date))
+        for group in groups.values():
+            start_date = min(date for _, date in group)
+            if start_date < fetch_end:
+                portfolio.data_fetcher.fetch_many([symbol for symbol, _ in group], start_date, fetch_end)
+
+    kinds = operations['kind'].to_numpy()
+    return {
+        'operations': len(operations),
+        'buys': int((kinds == BUY).sum()),
+        'sells': int((kinds == SELL).sum()),
+        'inflows': float(operations.loc[kinds == DEPOSIT, 'cash'].sum()),
+        'symbols': sorted(first_trades),
+        'start': operations['date'].iloc[0],
+        'end': operations['date'].iloc[-1]
+    }
@@ -0,0 +1,179 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """
+    A cumulative latency histogram with fixed buckets.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot counts observations above every bucket
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """
+        Record one observation.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> dict:
+        """
+        Return the count, sum, mean, max and cumulative bucket counts.
+        """
+        cumulative, running = {}, 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            running += bucket_count
+            cumulative[bound] = running
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'max': self.max,
+            'buckets': cumulative
+        }
+
+
+class MetricsRegistry:
+    """
+    An in-process registry of timing spans, counters and gauges.
+
+    Spans feed a latency histogram per name (their count doubles as a call count) and an
+    error counter. Gauges are functions returning a dict of numbers, read at export time,
+    e.g. the cache statistics of a DataFetcher.
+    """
+
+    def __init__(self):
+        self._histograms = {}  # span name -> Histogram
+        self._counters = {}  # counter name -> value
+        self._gauges = {}  # gauge prefix -> function returning a (possibly nested) dict of numbers
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        """
+        Record the duration of one span.
+        """
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram()
+            self._histograms[name].observe(seconds)
+
+    def increment(self, name: str, amount: float = 1):
+        """
+        Increase a counter.
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def register_gauges(self, prefix: str, function):
+        """
+        Register a function whose returned numbers are exported as gauges named prefix_key.
+
+        :param prefix: Prefix of the gauge names
+        :param function: Function without arguments returning a (possibly nested) dict of numbers
+        """
+        with self._lock:
+            self._gauges[prefix] = function
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        Time the enclosed block as a span.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.increment(f"{name}.errors")
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name: str):
+        """
+        Decorator timing every call of a function as a span.
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> dict:
+        """
+        Return every metric as plain data.
+
+        :return: Dictionary with 'spans', 'counters' and 'gauges'
+        """
+        with self._lock:
+            spans = {name: histogram.snapshot() for name, histogram in self._histograms.items()}
+            counters = dict(self._counters)
+            gauge_functions = dict(self._gauges)
+        gauges = {}
+        for prefix, function in gauge_functions.items():
+            try:
+                gauges.update(_flatten(prefix, function()))
+            except Exception as e:
+                print(f"Error reading gauges {prefix}: {e}")
+        return {'spans': spans, 'counters': counters, 'gauges': gauges}
+
+    def render_prometheus(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = ["# TYPE span_duration_seconds histogram"]
+        for name, histogram in sorted(snapshot['spans'].items()):
+            for bound, count in histogram['buckets'].items():
+                lines.append(f'span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+            lines.append(f'span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'span_duration_seconds_sum{{span="{name}"}} {histogram["sum"]}')
+            lines.append(f'span_duration_seconds_count{{span="{name}"}} {histogram["count"]}')
+        lines.append("# TYPE events_total counter")
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f'events_total{{name="{name}"}} {value}')
+        lines.append("# TYPE cache_stat gauge")
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines.append(f'cache_stat{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """
+        Drop every recorded span and counter (registered gauges are kept).
+        """
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _flatten(prefix: str, values: dict) -> dict:
+    """
+    Flatten a nested dict of numbers into {prefix_key_subkey: value}.
+    """
+    flat = {}
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(name, value))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+registry = MetricsRegistry()
+timed = registry.timed
+span = registry.span
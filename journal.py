@@ -0,0 +1,135 @@
+import json
+import os
+
+
+def journal_path(snapshot_filename: str) -> str:
+    """
+    Return the journal file that belongs to a snapshot file.
+
+    :param snapshot_filename: Path of the portfolio snapshot, e.g. 'portfolio.json'
+    :return: Path of the journal, e.g. 'portfolio.journal.jsonl'
+    """
+    root, _ = os.path.splitext(snapshot_filename)
+    return f"{root}.journal.jsonl"
+
+
+def write_snapshot(filename: str, data: dict):
+    """
+    Atomically write a snapshot: the data goes to a temporary file first, which then
+    replaces the previous snapshot, so a crash never leaves a half-written file behind.
+
+    :param filename: Path of the snapshot file
+    :param data: JSON-serializable snapshot
+    """
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, filename)
+
+
+class TransactionJournal:
+    """
+    An append-only JSON Lines journal of portfolio transactions.
+
+    Every transaction appends one record with an increasing sequence number. Snapshots
+    store the sequence number they include, so restoring means loading the snapshot and
+    replaying only the records that follow it.
+    """
+
+    def __init__(self, path: str, start_seq: int = 0, snapshot_every: int = 1000):
+        """
+        Open (or create) the journal.
+
+        :param path: Path of the journal file
+        :param start_seq: Sequence number included in the latest snapshot
+        :param snapshot_every: Number of appended records after which a compaction is due
+        """
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self._drop_torn_tail()
+        self.seq = start_seq  # Sequence number of the last record
+        self.records_since_snapshot = 0
+        for record in self.read_tail(start_seq):
+            self.seq = max(self.seq, record['seq'])
+            self.records_since_snapshot += 1
+
+    def _drop_torn_tail(self):
+        """
+        Truncate a partial last line left by a crash during an append, so that the next
+        record does not get glued onto it.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                print(f"Dropping a torn record at the end of {self.path}")
+                f.truncate(data.rfind(b"\n") + 1)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def append(self, record: dict) -> int:
+        """
+        Durably append one record.
+
+        The record always starts on a fresh line, even if another writer crashed in the
+        middle of a line since the journal was opened.
+
+        :param record: JSON-serializable transaction record
+        :return: The sequence number assigned to the record
+        """
+        self.seq += 1
+        line = (json.dumps({'seq': self.seq, **record}) + "\n").encode()
+        with open(self.path, 'ab+') as f:
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.records_since_snapshot += 1
+        return self.seq
+
+    def read_tail(self, after_seq: int) -> list:
+        """
+        Read the records that come after a sequence number.
+
+        Lines that cannot be decoded (e.g. torn by a crash during a write) are skipped,
+        so the records written after them are still replayed.
+
+        :param after_seq: Sequence number already included in the snapshot
+        :return: List of records in journal order
+        """
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r') as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Skipping an unreadable record at line {number} of {self.path}")
+                    continue
+                if record['seq'] > after_seq:
+                    records.append(record)
+        return records
+
+    def needs_compaction(self) -> bool:
+        """
+        Return True once enough records were appended since the last snapshot.
+        """
+        return self.records_since_snapshot >= self.snapshot_every
+
+    def truncate(self):
+        """
+        Drop all records. Called after they were folded into a snapshot.
+        """
+        with open(self.path, 'w') as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self.records_since_snapshot = 0
@@ -0,0 +1,161 @@
+import heapq
+import itertools
+from collections import deque
+
+# Lot matching methods accepted by LotEngine.sell
+METHODS = ('fifo', 'lifo', 'highest_cost', 'specific')
+
+
+class LotEngine:
+    """
+    Matching order of the open lots of every symbol, and the ledger of realized gains.
+
+    The lots themselves stay in the Portfolio.assets layout ({symbol: {txn_id: lot}}); the
+    engine keeps their ids in a deque per symbol in acquisition order, plus a max-heap by
+    cost built the first time a symbol is sold highest-cost first. A sale only touches the
+    lots it consumes, whatever the method: ids of lots already closed through another order
+    are dropped lazily when they reach the end of a deque or the top of a heap.
+    """
+
+    def __init__(self):
+        self.queues = {}  # symbol -> deque of open lot ids in acquisition order
+        self.heaps = {}  # symbol -> heap of (-price, date, sequence, lot id), built on demand
+        self.realized = []  # One record per lot (or part of a lot) sold, in sale order
+        self._sequence = itertools.count()
+
+    def rebuild(self, assets: dict, realized: list = ()):
+        """
+        Rebuild the matching order from a ledger in the Portfolio.assets layout.
+
+        :param assets: Dictionary {symbol: {txn_id: lot}}, lots in acquisition order
+        :param realized: Realized gain records saved with the ledger
+        """
+        self.queues = {symbol: deque(lots) for symbol, lots in assets.items() if symbol != 'CASH' and lots}
+        self.heaps = {}
+        self.realized = list(realized)
+
+    def add_lot(self, symbol: str, txn_id, lot: dict):
+        """
+        Record a purchased lot.
+
+        :param symbol: Stock symbol
+        :param txn_id: Transaction ID of the lot in the ledger
+        :param lot: The lot ({'quantity', 'price', 'date'})
+        """
+        self.queues.setdefault(symbol, deque()).append(txn_id)
+        if symbol in self.heaps:
+            heapq.heappush(self.heaps[symbol], (-lot['price'], lot['date'], next(self._sequence), txn_id))
+
+    @staticmethod
+    def lot_key(lots: dict, lot_id):
+        """
+        Return the key of a lot in a symbol's ledger, whose ids are strings once loaded from JSON.
+
+        :return: The key, or None if there is no such lot
+        """
+        if lot_id in lots:
+            return lot_id
+        return str(lot_id) if str(lot_id) in lots else None
+
+    def specific_quantity(self, lots: dict, lot_ids: list):
+        """
+        Return the number of shares held in specific lots.
+
+        :param lots: Ledger of the symbol {txn_id: lot}
+        :param lot_ids: Transaction IDs of the lots
+        :return: Total quantity, or None if a lot is not open
+        """
+        keys = [self.lot_key(lots, lot_id) for lot_id in lot_ids]
+        if not keys or None in keys:
+            return None
+        return sum(lots[key]['quantity'] for key in set(keys))
+
+    def _heap(self, lots: dict, symbol: str) -> list:
+        if symbol not in self.heaps:
+            heap = [(-lots[lot_id]['price'], lots[lot_id]['date'], next(self._sequence), lot_id)
+                    for lot_id in self.queues.get(symbol, ()) if lot_id in lots]
+            heapq.heapify(heap)
+            self.heaps[symbol] = heap
+        return self.heaps[symbol]
+
+    def _next_lot(self, lots: dict, symbol: str, method: str):
+        """
+        Return the id of the next lot to consume, dropping the ids of closed lots on the way.
+        """
+        if method == 'highest_cost':
+            heap = self._heap(lots, symbol)
+            while heap:
+                if heap[0][3] in lots:
+                    return heap[0][3]
+                heapq.heappop(heap)
+            return None
+        queue = self.queues.get(symbol, ())
+        while queue:
+            lot_id = queue[0] if method == 'fifo' else queue[-1]
+            if lot_id in lots:
+                return lot_id
+            if method == 'fifo':
+                queue.popleft()
+            else:
+                queue.pop()
+        return None
+
+    def sell(self, lots: dict, symbol: str, quantity: float, price: float, date: str, txn_id=None,
+             method: str = 'fifo', lot_ids: list = None) -> list:
+        """
+        Consume lots of a symbol and record their realized gains.
+
+        Consumed lots are decremented or deleted in place in the ledger; callers check
+        beforehand that enough shares are held.
+
+        :param lots: Ledger of the symbol {txn_id: lot}, updated in place
+        :param symbol: Stock symbol
+        :param quantity: Number of shares sold
+        :param price: Sale price per share
+        :param date: Sale date in 'YYYY-MM-DD' format
+        :param txn_id: Transaction ID of the sale
+        :param method: One of METHODS
+        :param lot_ids: Transaction IDs of the lots to sell, in order, for the 'specific' method
+        :return: The realized gain records of the sale
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown lot matching method: {method}")
+        if method == 'specific':
+            available = self.specific_quantity(lots, lot_ids or [])
+            if available is None or available < quantity:
+                raise ValueError(f"The selected lots of {symbol} do not hold {quantity} shares")
+            specific = iter([self.lot_key(lots, lot_id) for lot_id in lot_ids])
+
+        records = []
+        remaining = quantity
+        while remaining > 1e-9:  # Tolerates the rounding of fractional shares
+            if method == 'specific':
+                lot_id = next((key for key in specific if key in lots), None)
+            else:
+                lot_id = self._next_lot(lots, symbol, method)
+            if lot_id is None:
+                raise ValueError(f"Not enough lots of {symbol} to sell {quantity} shares")
+            lot = lots[lot_id]
+            sold = min(lot['quantity'], remaining)
+            records.append({
+                'txn_id': txn_id,
+                'symbol': symbol,
+                'lot_id': str(lot_id),
+                'quantity': sold,
+                'acquired': lot['date'],
+                'cost': lot['price'],
+                'date': date,
+                'price': price,
+                'gain': sold * (price - lot['price'])
+            })
+            remaining -= sold
+            if sold == lot['quantity']:
+                del lots[lot_id]
+            else:
+                lot['quantity'] -= sold
+
+        if not lots:
+            self.queues.pop(symbol, None)
+            self.heaps.pop(symbol, None)
+        self.realized.extend(records)
+        return records
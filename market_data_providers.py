@@ -0,0 +1,308 @@
+import json
+import os
+import zlib
+from datetime import date as _date
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+METADATA_FRAMES = ("sustainability", "recommendations", "major_holders")
+
+
+class MarketDataProvider:
+    """
+    Interface of a market data source used by DataFetcher.
+
+    Bars are returned as DataFrames indexed by timezone-naive dates with the usual
+    yfinance columns (Open, High, Low, Close, Volume, Dividends, Stock Splits).
+    """
+
+    name = "base"
+
+    def history(self, symbol: str, start_date: str, end_date: str, interval: str = "1d") -> pd.DataFrame:
+        """
+        Return the bars of a symbol within [start_date, end_date).
+
+        Failures raise: an empty result means the symbol has no bars in the range, and the
+        price store never asks for that range again.
+        """
+        raise NotImplementedError
+
+    def history_many(self, symbols: list, start_date: str, end_date: str) -> dict:
+        """
+        Return the daily bars of several symbols within [start_date, end_date).
+
+        :return: Dictionary mapping each symbol to its DataFrame of bars
+        """
+        return {symbol: self.history(symbol, start_date, end_date) for symbol in symbols}
+
+    def latest_price(self, symbol: str) -> float:
+        """
+        Return the latest available price of a symbol.
+        """
+        raise NotImplementedError
+
+    def latest_prices(self, symbols: list) -> dict:
+        """
+        Return the latest available prices of several symbols.
+
+        :return: Dictionary mapping each symbol to its price
+        """
+        return {symbol: self.latest_price(symbol) for symbol in symbols}
+
+    def dividends(self, symbol: str) -> pd.Series:
+        """
+        Return the full dividend history of a symbol, indexed by ex-date.
+        """
+        raise NotImplementedError
+
+    def metadata(self, symbol: str, field: str):
+        """
+        Return a metadata field of a symbol: 'info' (dict), 'sustainability',
+        'recommendations' or 'major_holders' (DataFrames in the yfinance layout).
+        """
+        raise NotImplementedError
+
+
+def _naive(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """
+    Drop the timezone of a DatetimeIndex, keeping the local dates.
+    """
+    return index.tz_localize(None) if index.tz is not None else index
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Market data from Yahoo Finance through yfinance.
+    """
+
+    name = "yfinance"
+
+    def history(self, symbol: str, start_date: str, end_date: str, interval: str = "1d") -> pd.DataFrame:
+        # Failures raise instead of coming back as an empty frame that would look like "no trading"
+        data = yf.Ticker(symbol).history(interval=interval, start=start_date, end=end_date, raise_errors=True)
+        if not data.empty:
+            data.index = _naive(data.index)
+        return data
+
+    def history_many(self, symbols: list, start_date: str, end_date: str) -> dict:
+        data = yf.download(symbols, start=start_date, end=end_date, interval="1d", group_by="ticker",
+                           auto_adjust=True, actions=True, progress=False, threads=True)
+        if not data.empty:
+            data.index = _naive(data.index)
+        bars = {}
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol in data.columns.get_level_values(0):
+                    bars[symbol] = data[symbol].dropna(how='all')
+                else:
+                    bars[symbol] = pd.DataFrame()
+            else:
+                bars[symbol] = data.dropna(how='all')  # Single symbol downloads are not grouped
+        return bars
+
+    def latest_price(self, symbol: str) -> float:
+        return yf.Ticker(symbol).history(period="1d")["Close"].iloc[-1]
+
+    def latest_prices(self, symbols: list) -> dict:
+        data = yf.download(symbols, period="5d", interval="1d", group_by="ticker",
+                           auto_adjust=True, progress=False, threads=True)
+        prices = {}
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                closes = data[symbol]["Close"].dropna()
+            else:
+                closes = data["Close"].dropna() if "Close" in data else pd.Series(dtype=float)
+            if not closes.empty:
+                prices[symbol] = float(closes.iloc[-1])
+        return prices
+
+    def dividends(self, symbol: str) -> pd.Series:
+        dividends = yf.Ticker(symbol).dividends
+        if not dividends.empty:
+            dividends.index = _naive(dividends.index)
+        return dividends
+
+    def metadata(self, symbol: str, field: str):
+        return getattr(yf.Ticker(symbol), field)
+
+
+class LocalFileProvider(MarketDataProvider):
+    """
+    Market data read from bar dumps in a directory.
+
+    Each symbol has a '<SYMBOL>.parquet' or '<SYMBOL>.csv' file with a Date column (or
+    index) and the bar columns, and optionally a '<SYMBOL>.json' file holding its
+    metadata fields ('info' as a dict, the other fields as lists of records).
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str):
+        """
+        :param directory: Directory holding the bar dumps
+        """
+        self.directory = directory
+        self._bars = {}  # symbol -> full DataFrame of bars
+
+    def _load(self, symbol: str) -> pd.DataFrame:
+        """
+        Read (once) the full bar dump of a symbol.
+        """
+        if symbol not in self._bars:
+            parquet_path = os.path.join(self.directory, f"{symbol}.parquet")
+            csv_path = os.path.join(self.directory, f"{symbol}.csv")
+            if os.path.exists(parquet_path):
+                data = pd.read_parquet(parquet_path)
+            elif os.path.exists(csv_path):
+                data = pd.read_csv(csv_path)
+            else:
+                raise FileNotFoundError(f"No bar dump for {symbol} in {self.directory}")
+            if "Date" in data.columns:
+                data = data.set_index("Date")
+            data.index = _naive(pd.DatetimeIndex(pd.to_datetime(data.index), name="Date"))
+            for column in BAR_COLUMNS:
+                if column not in data.columns:
+                    data[column] = 0.0
+            self._bars[symbol] = data[BAR_COLUMNS].sort_index()
+        return self._bars[symbol]
+
+    def history(self, symbol: str, start_date: str, end_date: str, interval: str = "1d") -> pd.DataFrame:
+        data = self._load(symbol)
+        return data[(data.index >= start_date) & (data.index < end_date)].copy()
+
+    def latest_price(self, symbol: str) -> float:
+        return float(self._load(symbol)["Close"].iloc[-1])
+
+    def dividends(self, symbol: str) -> pd.Series:
+        dividends = self._load(symbol)["Dividends"]
+        return dividends[dividends > 0]
+
+    def metadata(self, symbol: str, field: str):
+        path = os.path.join(self.directory, f"{symbol}.json")
+        fields = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                fields = json.load(f)
+        if field in METADATA_FRAMES:
+            return pd.DataFrame(fields.get(field, []))
+        return fields.get(field, {})
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    A deterministic synthetic feed: seeded geometric random walks of daily bars, quarterly
+    dividends and generated metadata, with no network access.
+
+    The same seed and symbol always produce the same series, whatever window is requested.
+    """
+
+    name = "synthetic"
+    SECTORS = ["Technology", "Healthcare", "Financial Services", "Energy", "Consumer Cyclical", "Industrials"]
+
+    def __init__(self, seed: int = 0, start_date: str = "2000-01-03", volatility: float = 0.015, drift: float = 0.0002):
+        """
+        :param seed: Seed of the random walks
+        :param start_date: First session of every generated series
+        :param volatility: Daily standard deviation of the log returns
+        :param drift: Daily mean of the log returns
+        """
+        self.seed = seed
+        self.start_date = start_date
+        self.volatility = volatility
+        self.drift = drift
+        self._bars = {}  # symbol -> DataFrame of bars from start_date up to today
+
+    def _rng(self, symbol: str, stream: int = 0) -> np.random.Generator:
+        """
+        Return a generator seeded by the provider seed, the symbol and a stream number.
+        """
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.encode()), stream])
+
+    def _load(self, symbol: str) -> pd.DataFrame:
+        """
+        Generate (once) the full bar series of a symbol up to today.
+        """
+        if symbol not in self._bars:
+            rng = self._rng(symbol)
+            days = pd.date_range(self.start_date, _date.today(), name="Date")
+            days = days[days.dayofweek < 5]  # Business days; much faster than bdate_range
+            start_price = rng.uniform(10, 500)
+            close = start_price * np.exp(np.cumsum(rng.normal(self.drift, self.volatility, len(days))))
+            open_ = np.concatenate(([start_price], close[:-1]))
+            spread = np.abs(rng.normal(0, self.volatility / 2, len(days)))
+            # Roughly quarterly dividends for about half of the symbols
+            dividends = np.zeros(len(days))
+            if rng.random() < 0.5:
+                dividend_yield = rng.uniform(0.005, 0.03) / 4
+                dividends[63::63] = np.round(close[63::63] * dividend_yield, 4)
+            self._bars[symbol] = pd.DataFrame({
+                "Open": open_,
+                "High": np.maximum(open_, close) * (1 + spread),
+                "Low": np.minimum(open_, close) * (1 - spread),
+                "Close": close,
+                "Volume": rng.integers(100_000, 10_000_000, len(days)).astype(float),
+                "Dividends": dividends,
+                "Stock Splits": 0.0
+            }, index=days)
+        return self._bars[symbol]
+
+    def history(self, symbol: str, start_date: str, end_date: str, interval: str = "1d") -> pd.DataFrame:
+        data = self._load(symbol)
+        return data[(data.index >= start_date) & (data.index < end_date)].copy()
+
+    def latest_price(self, symbol: str) -> float:
+        return float(self._load(symbol)["Close"].iloc[-1])
+
+    def dividends(self, symbol: str) -> pd.Series:
+        dividends = self._load(symbol)["Dividends"]
+        return dividends[dividends > 0]
+
+    def metadata(self, symbol: str, field: str):
+        rng = self._rng(symbol, stream=1)
+        if field == "info":
+            return {
+                'longName': f"{symbol} Synthetic Inc.",
+                'sector': self.SECTORS[int(rng.integers(len(self.SECTORS)))],
+                'industry': "Synthetic",
+                'forwardPE': float(rng.uniform(5, 40)),
+                'priceToSalesTrailing12Months': float(rng.uniform(0.5, 15)),
+                'priceToBook': float(rng.uniform(0.5, 20)),
+                'beta': float(rng.uniform(0.3, 2.0)),
+                'trailingEps': float(rng.uniform(-2, 15)),
+                'dividendYield': float(rng.uniform(0, 0.04))
+            }
+        if field == "recommendations":
+            counts = rng.integers(0, 20, 5)
+            return pd.DataFrame([dict(zip(['strongBuy', 'buy', 'hold', 'sell', 'strongSell'], counts))])
+        if field == "major_holders":
+            return pd.DataFrame({'Value': [rng.uniform(0, 0.1), rng.uniform(0.3, 0.9), rng.uniform(0.3, 0.9), float(rng.integers(100, 5000))]},
+                                index=['insidersPercentHeld', 'institutionsPercentHeld', 'institutionsFloatPercentHeld', 'institutionsCount'])
+        return pd.DataFrame()  # No sustainability scores
+
+
+def create_provider(name: str = None, **options) -> MarketDataProvider:
+    """
+    Create the market data provider selected by name or by configuration.
+
+    Without arguments the provider is chosen by the MARKET_DATA_PROVIDER environment
+    variable ('yfinance' by default, 'local' or 'synthetic'). The local provider reads
+    MARKET_DATA_DIR and the synthetic provider MARKET_DATA_SEED.
+
+    :param name: Provider name, overriding the environment
+    :param options: Keyword arguments passed to the provider
+    :return: A MarketDataProvider instance
+    """
+    name = name or os.environ.get("MARKET_DATA_PROVIDER", "yfinance")
+    if name == "yfinance":
+        return YFinanceProvider()
+    if name == "local":
+        options.setdefault("directory", os.environ.get("MARKET_DATA_DIR", "market_data"))
+        return LocalFileProvider(**options)
+    if name == "synthetic":
+        options.setdefault("seed", int(os.environ.get("MARKET_DATA_SEED", "0")))
+        return SyntheticProvider(**options)
+    raise ValueError(f"Unknown market data provider: {name}")
@@ -0,0 +1,135 @@
+import pickle
+import sqlite3
+import threading
+import time
+
+# Time to live of each metadata field, in seconds
+DEFAULT_TTLS = {
+    'info': 24 * 3600,
+    'recommendations': 24 * 3600,
+    'sustainability': 7 * 24 * 3600,
+    'major_holders': 7 * 24 * 3600,
+}
+
+
+class TickerMetadataCache:
+    """
+    A cache of slow-changing ticker metadata (info, sustainability, recommendations,
+    major holders) with a time to live per field, persisted in SQLite so it survives restarts.
+    """
+
+    def __init__(self, path: str = "metadata_cache.sqlite", ttls: dict = None, loader=None):
+        """
+        Open (or create) the cache.
+
+        :param path: Path of the SQLite database file, or ':memory:'
+        :param ttls: Time to live per field in seconds, merged over DEFAULT_TTLS
+        :param loader: Function (symbol, field) -> value used on a cache miss, usually the
+                       metadata method of a market data provider
+        """
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.loader = loader
+        self.hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+        self._memory = {}  # (symbol, field) -> (fetched_at, value)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "symbol TEXT NOT NULL, field TEXT NOT NULL, fetched_at REAL NOT NULL, payload BLOB, "
+                "PRIMARY KEY (symbol, field))"
+            )
+
+    def _is_fresh(self, field: str, fetched_at: float) -> bool:
+        """
+        Return True if an entry of the given field fetched at fetched_at has not expired.
+        """
+        return time.time() - fetched_at < self.ttls.get(field, DEFAULT_TTLS['info'])
+
+    def _lookup(self, symbol: str, field: str):
+        """
+        Return (found, value) for a fresh entry in memory or on disk.
+        """
+        with self._lock:
+            entry = self._memory.get((symbol, field))
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT fetched_at, payload FROM metadata WHERE symbol = ? AND field = ?", (symbol, field)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], pickle.loads(row[1]))
+                    self._memory[(symbol, field)] = entry
+        if entry is not None and self._is_fresh(field, entry[0]):
+            return True, entry[1]
+        return False, None
+
+    def get(self, symbol: str, field: str):
+        """
+        Return a metadata field of a ticker, fetching it only if missing or expired.
+
+        :param symbol: Stock symbol
+        :param field: Metadata field, e.g. 'info'
+        :return: The field value
+        """
+        found, value = self._lookup(symbol, field)
+        # The counters are shared by the enrichment worker threads
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.upstream_calls += 1
+        if found:
+            return value
+        value = self.loader(symbol, field)
+        self.put(symbol, field, value)
+        return value
+
+    def put(self, symbol: str, field: str, value):
+        """
+        Store a metadata field of a ticker.
+
+        :param symbol: Stock symbol
+        :param field: Metadata field
+        :param value: Picklable value
+        """
+        fetched_at = time.time()
+        with self._lock, self._conn:
+            self._memory[(symbol, field)] = (fetched_at, value)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?)",
+                (symbol, field, fetched_at, pickle.dumps(value))
+            )
+
+    def invalidate(self, symbol: str = None):
+        """
+        Drop cached entries of a symbol, or of every symbol if none is given.
+
+        :param symbol: Stock symbol
+        """
+        with self._lock, self._conn:
+            if symbol is None:
+                self._memory.clear()
+                self._conn.execute("DELETE FROM metadata")
+            else:
+                self._memory = {key: entry for key, entry in self._memory.items() if key[0] != symbol}
+                self._conn.execute("DELETE FROM metadata WHERE symbol = ?", (symbol,))
+
+    def stats(self) -> dict:
+        """
+        Return the hit/miss counters of the cache.
+
+        :return: Dictionary with 'hits', 'misses', 'hit_rate' and 'upstream_calls'
+        """
+        with self._lock:
+            hits, misses, upstream_calls = self.hits, self.misses, self.upstream_calls
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+            'upstream_calls': upstream_calls
+        }
@@ -0,0 +1,113 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from backtest import dollar_cost_averaging, load_prices, periodic_rebalance, run_backtest
+from data_fetcher import DataFetcher
+from market_data_providers import MarketDataProvider
+from metadata_cache import TickerMetadataCache
+from price_store import PriceStore
+
+# Strategy factories a scenario can name; each scenario's other keys are passed to the factory
+STRATEGIES = {
+    'rebalance': periodic_rebalance,
+    'dca': dollar_cost_averaging
+}
+
+_worker = {}  # State of a sweep worker process, set up once by _init_worker
+
+
+def grid(**parameters) -> list:
+    """
+    Expand lists of parameter values into every combination of scenarios.
+
+    Example: grid(strategy=['rebalance'], freq=['M', 'Q'], weights=[w1, w2]) gives 4 scenarios.
+
+    :param parameters: Each parameter name mapped to the list of its values
+    :return: List of scenario dictionaries
+    """
+    names = list(parameters)
+    return [dict(zip(names, values)) for values in itertools.product(*parameters.values())]
+
+
+def _init_worker(shm_name: str, shape: tuple, dates: list, symbols: list):
+    """
+    Attach a worker process to the shared price matrix.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    close = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker['shm'] = shm  # Keep the mapping alive for the lifetime of the worker
+    _worker['prices'] = pd.DataFrame(close, index=pd.Index(dates), columns=symbols, copy=False)
+    # Prices are never fetched in workers: the base provider fails loudly if anything tries to
+    _worker['data_fetcher'] = DataFetcher(PriceStore(":memory:"), metadata=TickerMetadataCache(":memory:"),
+                                          provider=MarketDataProvider())
+
+
+def _run_scenario(task: tuple) -> dict:
+    """
+    Run the backtest of one scenario in a worker and summarize it.
+    """
+    index, scenario, start_date, end_date = task
+    parameters = dict(scenario)
+    strategy = parameters.pop('strategy')
+    initial_cash = parameters.pop('initial_cash', 10000.0)
+    factory = STRATEGIES[strategy] if isinstance(strategy, str) else strategy
+    prices = _worker['prices']
+    row = {'scenario': index}
+    row.update({key: (str(value) if isinstance(value, (dict, list)) else value) for key, value in scenario.items()})
+    try:
+        result = run_backtest(factory(**parameters), list(prices.columns), start_date, end_date, initial_cash,
+                              data_fetcher=_worker['data_fetcher'], prices=prices)
+        summary = result.summary()
+        row.update(summary)
+        row['return'] = summary['profit'] / summary['inflows'] if summary['inflows'] else 0.0
+        row['error'] = None
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+def run_sweep(scenarios: list, symbols: list, start_date: str, end_date: str, max_workers: int = None,
+              data_fetcher: DataFetcher = None, provider=None, chunksize: int = None) -> pd.DataFrame:
+    """
+    Backtest many strategy scenarios in parallel over the same prices.
+
+    The closes are loaded once and copied into a shared memory block that every worker
+    process maps, so scenarios are sent to the workers without any price data.
+
+    A scenario is a dictionary with a 'strategy' (a name from STRATEGIES, or a picklable
+    strategy factory), an optional 'initial_cash', and the keyword arguments of the
+    strategy factory, e.g. {'strategy': 'dca', 'amount': 500, 'weights': {...}, 'freq': 'M'}.
+
+    :param scenarios: List of scenario dictionaries, e.g. built with grid()
+    :param symbols: Symbols the strategies may trade
+    :param start_date: First day in 'YYYY-MM-DD' format
+    :param end_date: Last day in 'YYYY-MM-DD' format (inclusive)
+    :param max_workers: Number of worker processes (the number of CPUs by default)
+    :param data_fetcher: DataFetcher to load prices from, created if omitted
+    :param provider: Market data provider of the created DataFetcher
+    :param chunksize: Number of scenarios sent to a worker at once
+    :return: A DataFrame with one row per scenario: its parameters, summary and return
+             (the 'error' column holds the message of scenarios that failed)
+    """
+    for scenario in scenarios:
+        if isinstance(scenario.get('strategy'), str) and scenario['strategy'] not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {scenario['strategy']}")
+    prices = load_prices(symbols, start_date, end_date, data_fetcher or DataFetcher(provider=provider))
+    close = np.ascontiguousarray(prices.to_numpy(dtype=np.float64))
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = chunksize or max(1, len(scenarios) // (4 * max_workers))
+    tasks = [(index, scenario, start_date, end_date) for index, scenario in enumerate(scenarios)]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(close.nbytes, 1))
+    try:
+        np.ndarray(close.shape, dtype=np.float64, buffer=shm.buf)[:] = close
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(shm.name, close.shape, list(prices.index), list(prices.columns))) as executor:
+            rows = list(executor.map(_run_scenario, tasks, chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+    return pd.DataFrame(rows).set_index('scenario')
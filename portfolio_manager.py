@@ -6,7 +6,17 @@ import time
 from datetime import datetime, timedelta
 import pandas as pd
 import copy
+import itertools
+import os
 from data_fetcher import DataFetcher
+from valuation import ledger_symbols, matrix_value_series, portfolio_value_series
+from position_index import PositionIndex
+from lot_engine import METHODS, LotEngine
+from history_store import HistoryStore
+from dividends import DividendLedger
+from profit_series import ProfitSeries
+from journal import TransactionJournal, journal_path, write_snapshot
+from instrumentation import timed
 from collections import defaultdict
 from portrfolio_manager_functions import (
     get_market_value,
@@ -16,29 +26,45 @@ from portrfolio_manager_functions import (
     get_dividend_data,
     get_diversification_data,
     get_income_data,
+    get_dividend_income,
     analyze_sustainability_score,
     get_detailed_stock_data,
     get_operation_history,
+    get_realized_gains,
     get_current_actives
 )
 
+# Source of portfolio versions, unique across every Portfolio instance
+_versions = itertools.count(1)
+
 
 class Portfolio:
     """
     A class to manage a portfolio of stocks and cash.
     """
     
-    def __init__(self, simulation_date: str = None):
+    def __init__(self, simulation_date: str = None, provider=None, data_fetcher: DataFetcher = None):
         """
         Initialize the portfolio. Optionally set a simulation date.
         :param simulation_date: Date for the simulation in 'YYYY-MM-DD' format.
+        :param provider: Market data provider; chosen from the configuration if omitted.
+        :param data_fetcher: DataFetcher to share with other portfolios; created if omitted.
         """
         self.assets = {"CASH": {}}  # Starting with cash asset
         self.total_value = 0.0  # Total value of the portfolio
-        self.data_fetcher = DataFetcher()  # Instance of DataFetcher
+        self.data_fetcher = data_fetcher or DataFetcher(provider=provider)  # Instance of DataFetcher
         self.simulation_date = simulation_date  # Date for simulated transactions
         self.transaction_id = 0  # Unique transaction ID
         self.cash_inflows = []  # Track cash inflows with dates
+        self.positions = PositionIndex()  # Live quantities, cost basis and cash balance
+        self.lot_engine = LotEngine()  # Lot matching order and realized gains
+        self.history = HistoryStore()  # Columnar operation history
+        self.dividend_ledger = DividendLedger()  # Dividend income matched per lot
+        self.profit_series = ProfitSeries()  # Materialized daily value and profit
+        self.version = next(_versions)  # Changes on every ledger update; keys the derived caches
+        self.journal = None  # Append-only transaction journal, attached by load/save_portfolio
+        self.snapshot_filename = None  # Snapshot file the journal belongs to
+        self.price_refresher = None  # Background PriceRefresher serving live prices, if attached
     
     get_market_value = get_market_value
     get_dividend_yield = get_dividend_yield
@@ -47,11 +73,14 @@ class Portfolio:
     get_dividend_data = get_dividend_data
     get_diversification_data = get_diversification_data
     get_income_data = get_income_data
+    get_dividend_income = get_dividend_income
     analyze_sustainability_score = analyze_sustainability_score
     get_detailed_stock_data = get_detailed_stock_data
     get_operation_history = get_operation_history
+    get_realized_gains = get_realized_gains
     get_current_actives = get_current_actives
     
+    @timed("portfolio.add_cash")
     def add_cash(self, amount: float, inflow: bool = True):
         """
         Add cash to the portfolio.
@@ -59,24 +88,35 @@ class Portfolio:
         :param amount: The amount of cash to add
         :param inflow: True if the cash is from an external source, False if it is a transaction
         """
-        symbol = "CASH"
-        current_cash = sum(txn['quantity'] for txn in self.assets[symbol].values())
+        current_cash = self.positions.cash
         if current_cash + amount <= 0:
             print("Total cash balance must be greater than zero.")
             return
         
         self.transaction_id += 1
+        date = self.simulation_date or datetime.now().strftime("%Y-%m-%d")
+        self._apply_cash(self.transaction_id, amount, date, inflow)
+        self._journal_event({'op': 'add_cash', 'txn_id': self.transaction_id, 'amount': amount, 'date': date, 'inflow': inflow})
+        print(f"Added ${amount:.2f} to cash.")
+
+    def _apply_cash(self, txn_id: int, amount: float, date: str, inflow: bool):
+        """
+        Record a cash transaction in the ledger and the position index, without any checks.
+        """
         transaction = {
             'quantity': amount,
             'price': 1,
-            'date': self.simulation_date or datetime.datetime.now().strftime("%Y-%m-%d")
+            'date': date
         }
-        self.assets[symbol][self.transaction_id] = transaction
+        self.assets.setdefault("CASH", {})[txn_id] = transaction
+        self.positions.add_cash(amount)
+        self.history.append(txn_id, 'CASH', amount, 1, date, 'Cash')
+        self.profit_series.invalidate(date)
+        self.version = next(_versions)
         if inflow and amount > 0:
-            self.cash_inflows.append({'amount': amount, 'date': transaction['date']})  # Track cash inflows with dates
-        print(f"Added ${amount:.2f} to cash.")
-
+            self.cash_inflows.append({'amount': amount, 'date': date})  # Track cash inflows with dates
 
+    @timed("portfolio.buy_asset")
     def buy_asset(self, symbol: str, quantity: int):
         """
         Simulate buying assets.
@@ -93,81 +133,219 @@ class Portfolio:
         if self.simulation_date:
             price = self.data_fetcher.get_price_at_date(symbol, self.simulation_date)
         else:
-            price = self.data_fetcher.get_real_time_price(symbol)
+            price = self.get_live_price(symbol)
         
         if price <= 0:
             print(f"Failed to retrieve the price for {symbol}. Transaction aborted.")
             return
         
         cost = quantity * price
-        cash_balance = sum(txn['quantity'] for txn in self.assets['CASH'].values())
-        if cost > cash_balance:
+        cash_balance = self.positions.cash
+        if cash_balance - cost <= 0:  # Cash must stay above zero, as in add_cash
             print("Not enough cash balance to buy this asset.")
             return
 
-        # Deduct cash
-        self.add_cash(-cost, inflow=False)  # Mark as transaction
-
-        # Add the asset transaction
+        # Deduct cash and add the asset transaction, journaled as one record so that a
+        # crash cannot persist the payment without the lot
+        date = self.simulation_date or datetime.now().strftime("%Y-%m-%d")
+        self.transaction_id += 1
+        cash_record = {'op': 'add_cash', 'txn_id': self.transaction_id, 'amount': -cost, 'date': date, 'inflow': False}
+        self._apply_cash(self.transaction_id, -cost, date, False)
         self.transaction_id += 1
+        self._apply_buy(self.transaction_id, symbol, quantity, float(price), date)
+        self._journal_event({'op': 'batch', 'records': [cash_record, {
+            'op': 'buy', 'txn_id': self.transaction_id, 'symbol': symbol, 'quantity': quantity, 'price': float(price), 'date': date}]})
+
+        print(f"Bought {quantity} of {symbol} at ${price:.2f} each.")
+
+    def _apply_buy(self, txn_id: int, symbol: str, quantity: int, price: float, date: str):
+        """
+        Record a purchased lot in the ledger and the position index, without any checks.
+        """
         transaction = {
             'quantity': quantity,
             'price': price,
-            'date': self.simulation_date or datetime.datetime.now().strftime("%Y-%m-%d")
+            'date': date
         }
         if symbol not in self.assets:
             self.assets[symbol] = {}
-        self.assets[symbol][self.transaction_id] = transaction
-
-        print(f"Bought {quantity} of {symbol} at ${price:.2f} each.")
-
-    def sell_asset(self, symbol: str, quantity: int):
+        self.assets[symbol][txn_id] = transaction
+        self.lot_engine.add_lot(symbol, txn_id, transaction)
+        self.positions.add_lot(symbol, quantity, price)
+        self.history.append(txn_id, symbol, quantity, price, date, 'Buy')
+        self.profit_series.invalidate(date)
+        self.version = next(_versions)
+
+    @timed("portfolio.sell_asset")
+    def sell_asset(self, symbol: str, quantity: int, method: str = 'fifo', lot_ids: list = None):
         """
         Simulate selling assets.
 
         :param symbol: The stock symbol to sell
         :param quantity: The number of shares to sell
+        :param method: Lot matching method: 'fifo', 'lifo', 'highest_cost' or 'specific'
+        :param lot_ids: Transaction IDs of the lots to sell, in order, for the 'specific' method
         """
         symbol = symbol.upper()
         if symbol not in self.assets or not self.assets[symbol]:
             print(f"{symbol} is not in the portfolio.")
             return
 
-        total_quantity = sum(txn['quantity'] for txn in self.assets[symbol].values())
+        total_quantity = self.positions.quantity(symbol)
         if quantity <= 0 or quantity > total_quantity:
             print("Invalid quantity for selling.")
             return
 
+        if method not in METHODS:
+            print(f"Unknown lot matching method: {method}")
+            return
+        if method == 'specific':
+            available = self.lot_engine.specific_quantity(self.assets[symbol], lot_ids or [])
+            if available is None or available < quantity:
+                print(f"The selected lots of {symbol} do not hold {quantity} shares.")
+                return
+
         # Fetch price for the asset based on simulation date or real-time
         if self.simulation_date:
             price = self.data_fetcher.get_price_at_date(symbol, self.simulation_date)
         else:
-            price = self.data_fetcher.get_real_time_price(symbol)
+            price = self.get_live_price(symbol)
         
         if price <= 0:
             print(f"Failed to retrieve the price for {symbol}. Transaction aborted.")
             return
 
-        # Calculate the sale value
+        # Add cash from the sale and update the asset quantity, journaled as one record so
+        # that a crash cannot persist the sale without its proceeds
         sale_value = quantity * price
-        # Add cash from sale
-        self.add_cash(sale_value, inflow=False)  # Mark as transaction
-
-        # Update the asset quantity
-        remaining_quantity = quantity
-        for txn_id, txn in list(self.assets[symbol].items()):
-            if remaining_quantity <= 0:
-                break
-            if txn['quantity'] <= remaining_quantity:
-                remaining_quantity -= txn['quantity']
-                del self.assets[symbol][txn_id]
-            else:
-                self.assets[symbol][txn_id]['quantity'] -= remaining_quantity
-                remaining_quantity = 0
-        self.assets = {key: value for key, value in self.assets.items() if value}   
-        # print(self.assets)
+        date = self.simulation_date or datetime.now().strftime("%Y-%m-%d")
+        self.transaction_id += 1
+        cash_record = {'op': 'add_cash', 'txn_id': self.transaction_id, 'amount': sale_value, 'date': date, 'inflow': False}
+        self._apply_cash(self.transaction_id, sale_value, date, False)
+        self.transaction_id += 1
+        self._apply_sell(symbol, quantity, float(price), date, self.transaction_id, method, lot_ids)
+        record = {'op': 'sell', 'txn_id': self.transaction_id, 'symbol': symbol, 'quantity': quantity,
+                  'price': float(price), 'date': date, 'method': method}
+        if lot_ids:
+            record['lot_ids'] = list(lot_ids)
+        self._journal_event({'op': 'batch', 'records': [cash_record, record]})
         print(f"Sold {quantity} of {symbol} at ${price:.2f} each.")
 
+    def _apply_sell(self, symbol: str, quantity: int, price: float, date: str, txn_id: int = None,
+                    method: str = 'fifo', lot_ids: list = None):
+        """
+        Consume lots in the ledger and the position index and record their realized gains,
+        without any checks.
+        """
+        lots = self.assets[symbol]
+        sold = self.lot_engine.sell(lots, symbol, quantity, price, date, txn_id, method, lot_ids)
+        self.positions.remove_lots(symbol, quantity, sum(record['quantity'] * record['cost'] for record in sold),
+                                   closed=not lots)
+        self.history.append(txn_id, symbol, -quantity, price, date, 'Sell')
+        if not lots:
+            del self.assets[symbol]
+        # Sold lots keep their holding periods, so only the values from the sale on change
+        self.profit_series.invalidate(date)
+        self.version = next(_versions)
+
+    @timed("portfolio.execute_orders")
+    def execute_orders(self, orders: list, method: str = 'fifo') -> bool:
+        """
+        Execute a batch of orders at one price snapshot, all or nothing.
+
+        The prices of every symbol are fetched together, and sells are executed before
+        buys so that their proceeds fund the buys. The whole batch is checked against the
+        holdings and the cash balance before anything is recorded: if any order is invalid,
+        none is executed. The transactions are then journaled as a single record, so a
+        crash cannot persist half of the batch either.
+
+        :param orders: List of (symbol, quantity) pairs, with a negative quantity to sell
+        :param method: Lot matching method of the sales
+        :return: True if the batch was executed
+        """
+        orders = [(symbol.upper(), quantity) for symbol, quantity in orders]
+        if not orders or any(not quantity for _, quantity in orders):
+            print("Every order must have a non-zero quantity.")
+            return False
+        if method not in METHODS:
+            print(f"Unknown lot matching method: {method}")
+            return False
+
+        symbols = list(dict.fromkeys(symbol for symbol, _ in orders))
+        if self.simulation_date:
+            prices = self.data_fetcher.get_prices_at_date(symbols, self.simulation_date)
+        else:
+            prices = self.get_live_prices(symbols)
+        missing = [symbol for symbol in symbols if not prices.get(symbol, 0) > 0]
+        if missing:
+            print(f"Failed to retrieve the price for {', '.join(missing)}. Orders aborted.")
+            return False
+
+        # Check the whole batch: sells first, then buys against the resulting cash, which
+        # must stay above zero like in add_cash (and thus buy_asset)
+        orders = sorted(orders, key=lambda order: order[1] > 0)
+        cash = self.positions.cash
+        held = {}
+        for symbol, quantity in orders:
+            held.setdefault(symbol, self.positions.quantity(symbol))
+            if quantity < 0 and -quantity > held[symbol]:
+                print(f"Invalid quantity for selling {symbol}. Orders aborted.")
+                return False
+            held[symbol] += quantity
+            cash -= quantity * prices[symbol]
+            if cash <= 0:
+                print(f"Not enough cash balance to buy {symbol}. Orders aborted.")
+                return False
+
+        date = self.simulation_date or datetime.now().strftime("%Y-%m-%d")
+        records = []
+        for symbol, quantity in orders:
+            price = float(prices[symbol])
+            self.transaction_id += 1
+            self._apply_cash(self.transaction_id, -quantity * price, date, False)
+            records.append({'op': 'add_cash', 'txn_id': self.transaction_id, 'amount': -quantity * price, 'date': date, 'inflow': False})
+            self.transaction_id += 1
+            if quantity > 0:
+                self._apply_buy(self.transaction_id, symbol, quantity, price, date)
+                records.append({'op': 'buy', 'txn_id': self.transaction_id, 'symbol': symbol, 'quantity': quantity, 'price': price, 'date': date})
+            else:
+                self._apply_sell(symbol, -quantity, price, date, self.transaction_id, method)
+                records.append({'op': 'sell', 'txn_id': self.transaction_id, 'symbol': symbol, 'quantity': -quantity,
+                                'price': price, 'date': date, 'method': method})
+        self._journal_event({'op': 'batch', 'records': records})
+        print(f"Executed {len(orders)} orders.")
+        return True
+
+    def _apply_event(self, record: dict):
+        """
+        Replay one journal record.
+
+        :param record: Record written by _journal_event
+        """
+        if record['op'] == 'batch':
+            for batched_record in record['records']:
+                self._apply_event(batched_record)
+        elif record['op'] == 'add_cash':
+            self._apply_cash(record['txn_id'], record['amount'], record['date'], record['inflow'])
+        elif record['op'] == 'buy':
+            self._apply_buy(record['txn_id'], record['symbol'], record['quantity'], record['price'], record['date'])
+        elif record['op'] == 'sell':
+            self._apply_sell(record['symbol'], record['quantity'], record['price'], record['date'],
+                             record.get('txn_id'), record.get('method', 'fifo'), record.get('lot_ids'))
+        self.transaction_id = max(self.transaction_id, record.get('txn_id', 0))
+
+    def _journal_event(self, record: dict):
+        """
+        Append a transaction record to the journal, compacting it into a snapshot when due.
+
+        :param record: JSON-serializable transaction record
+        """
+        if self.journal is None:
+            return
+        self.journal.append(record)
+        if self.journal.needs_compaction():
+            self.save_portfolio(self.snapshot_filename)
+
     def show_portfolio(self):
         """
         Display the assets in the user's portfolio along with their details.
@@ -179,47 +357,73 @@ class Portfolio:
         print("\nCurrent Portfolio:")
         for symbol, transactions in self.assets.items():
             if symbol == 'CASH':
-                total_cash = sum(txn['quantity'] for txn in transactions.values())
+                total_cash = self.positions.cash
                 print(f"{symbol}: ${total_cash:.2f} cash")
                 continue
-            total_quantity = sum(txn['quantity'] for txn in transactions.values())
-            avg_purchase_price = sum(txn['quantity'] * txn['price'] for txn in transactions.values()) / total_quantity
+            total_quantity = self.positions.quantity(symbol)
+            avg_purchase_price = self.positions.cost_basis(symbol) / total_quantity
             if self.simulation_date:
                 current_price = self.data_fetcher.get_price_at_date(symbol, self.simulation_date)
             else:
-                current_price = self.data_fetcher.get_real_time_price(symbol)
+                current_price = self.get_live_price(symbol)
             print(f"{symbol}: {total_quantity} shares @ ${current_price:.2f} each (Avg. Purchase Price: ${avg_purchase_price:.2f})")
         
         print(f"\nTotal Portfolio Value: ${self.get_portfolio_value():.2f}")
 
+    @timed("portfolio.save_portfolio")
     def save_portfolio(self, filename='portfolio.json'):
         """
-        Save the current portfolio to a JSON file.
+        Save a compacted snapshot of the portfolio to a JSON file.
+
+        Transactions are already appended to the journal as they happen; the snapshot
+        folds them in so that the journal can be truncated and loading stays fast.
 
         :param filename: The name of the file to save the portfolio
         """
-        with open(filename, 'w') as f:
-            json.dump({
-                'assets': self.assets,
-                'simulation_date': self.simulation_date,
-                'cash_inflows': self.cash_inflows
-            }, f)
+        if self.journal is None or self.snapshot_filename != filename:
+            self.journal = TransactionJournal(journal_path(filename))
+            self.snapshot_filename = filename
+        write_snapshot(filename, {
+            'assets': self.assets,
+            'simulation_date': self.simulation_date,
+            'cash_inflows': self.cash_inflows,
+            'realized_gains': self.lot_engine.realized,
+            'transaction_id': self.transaction_id,
+            'journal_seq': self.journal.seq
+        })
+        self.journal.truncate()
         print(f"Portfolio saved to {filename}")
 
+    @timed("portfolio.load_portfolio")
     def load_portfolio(self, filename='portfolio.json'):
         """
-        Load the portfolio from a JSON file.
+        Load the portfolio from its latest snapshot plus the journal records written after it.
 
         :param filename: The name of the file to load the portfolio
         """
         try:
-            with open(filename, 'r') as f:
-                data = json.load(f)
-                self.assets = data['assets']
-                self.simulation_date = data.get('simulation_date', None)
-                self.cash_inflows = data['cash_inflows']
-                self.transaction_id =  max(int(identifier) for asset_data in data['assets'].values() for identifier in asset_data.keys() if identifier.isdigit())
-            print(f"Portfolio loaded from {filename}")
+            data = {}
+            if os.path.exists(filename):
+                with open(filename, 'r') as f:
+                    data = json.load(f)
+            self.assets = data.get('assets', {"CASH": {}})
+            self.simulation_date = data.get('simulation_date', self.simulation_date)
+            self.cash_inflows = data.get('cash_inflows', [])
+            self.transaction_id = data.get('transaction_id') or max((int(identifier) for asset_data in self.assets.values() for identifier in asset_data.keys() if str(identifier).isdigit()), default=0)
+            self.positions.rebuild(self.assets)
+            self.lot_engine.rebuild(self.assets, data.get('realized_gains', []))
+            self.history.rebuild(self.assets, self.lot_engine.realized)
+            self.profit_series.invalidate()
+            self.version = next(_versions)
+
+            # Replay the journal tail on top of the snapshot
+            snapshot_seq = data.get('journal_seq', 0)
+            self.journal = TransactionJournal(journal_path(filename), start_seq=snapshot_seq)
+            self.snapshot_filename = filename
+            tail = self.journal.read_tail(snapshot_seq)
+            for record in tail:
+                self._apply_event(record)
+            print(f"Portfolio loaded from {filename} (+{len(tail)} journal records)")
         except Exception as e:
             print(f"Error loading portfolio: {e}")
 
@@ -229,8 +433,16 @@ class Portfolio:
 
         :return: A deep copy of the current portfolio instance.
         """
-        return copy.deepcopy(self)
+        # The data fetcher (and its price store) is shared rather than copied, and the
+        # copy is detached from the journal so its transactions are not persisted
+        memo = {id(self.data_fetcher): self.data_fetcher, id(self.journal): None}
+        if self.price_refresher is not None:
+            memo[id(self.price_refresher)] = self.price_refresher
+        portfolio_copy = copy.deepcopy(self, memo)
+        portfolio_copy.journal = None
+        return portfolio_copy
     
+    @timed("portfolio.get_portfolio_value")
     def get_portfolio_value(self, date: str = "Not set", end_date = None) -> float:
         """
         Calculate the current total value of the portfolio based on the latest prices.
@@ -241,51 +453,72 @@ class Portfolio:
             date = self.simulation_date
 
         if not end_date:
-            total_value = sum(txn['quantity'] for txn in self.assets['CASH'].values())  # Start with cash
-            for symbol, transactions in self.assets.items():
-                if symbol == 'CASH':
-                    continue  # Skip cash since it's already counted
+            total_value = self.positions.cash  # Start with cash
+            live_prices = {} if self.simulation_date else self.get_live_prices(list(self.positions.symbols()))
+            for symbol in self.positions.symbols():
                 if self.simulation_date:
                     price_at_date = self.data_fetcher.get_price_at_date(symbol, date)
                 else:
-                    price_at_date = self.data_fetcher.get_real_time_price(symbol)
-                total_quantity = sum(txn['quantity'] for txn in transactions.values())
+                    price_at_date = live_prices[symbol]
+                total_quantity = self.positions.quantity(symbol)
                 total_value += price_at_date * total_quantity
             return total_value
         else:
             date_range = pd.date_range(start=date, end=end_date)
             date_range = date_range.strftime('%Y-%m-%d')
-            combined_prices = pd.DataFrame(index=date_range)
-            for symbol, transactions in self.assets.items():
-                if symbol == 'CASH':
-                    continue  # Skip cash since it's already counted
-                prices = self.data_fetcher.fetch_stock_data(symbol, start_date=date, end_date=end_date)
-                if prices is not None and not prices.empty:
-                    # Rename 'Close' to symbol name for clarity
-                    prices.rename(columns={'Close': symbol}, inplace=True)
-                    prices.index = prices.index.strftime('%Y-%m-%d')
-                    combined_prices = combined_prices.join(prices[[symbol]], how='outer')
-            # Forward fill missing prices
-            combined_prices.ffill(inplace=True)
-            
-            # Calculate portfolio values
-            total_values = []
-            for single_date in date_range:
-                # Calculate cash balance up to the current date
-                total_cash = sum(txn['quantity'] for txn in self.assets['CASH'].values() if txn['date'] <= single_date)
-                total_value = total_cash  # Start with cash
-
-                for symbol, transactions in self.assets.items():
-                    if symbol == 'CASH':
-                        continue
-                    # Get the price for the specific date using the symbol directly
-                    price_at_date = combined_prices.loc[single_date, symbol] if single_date in combined_prices.index else 0
-                    total_quantity = sum(txn['quantity'] for txn in transactions.values() if txn['date'] <= single_date)
-                    total_value += price_at_date * total_quantity
-
-                total_values.append(total_value)
-            return total_values
+            # Sold lots are valued over their holding periods, so past values do not change
+            realized = self.lot_engine.realized
+            symbols = ledger_symbols(self.assets, realized)
+            matrix = self.data_fetcher.price_matrix
+            if matrix is not None and symbols and matrix.covers(symbols, date, end_date):
+                return matrix_value_series(self.assets, matrix, date_range, realized).tolist()
+            prices = pd.DataFrame()
+            if symbols:
+                # One batched request for every symbol, starting 2 weeks early so the first
+                # days of the range can be forward filled; the end date is included
+                fetch_start = (datetime.strptime(date, "%Y-%m-%d") - timedelta(days=14)).strftime("%Y-%m-%d")
+                fetch_end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+                prices = self.data_fetcher.fetch_many(symbols, fetch_start, fetch_end)
+                prices.index = prices.index.strftime('%Y-%m-%d')
+
+            # Value every date at once from the cumulative position matrix
+            return portfolio_value_series(self.assets, prices, date_range, realized).tolist()
+
+
+    def get_live_price(self, symbol: str) -> float:
+        """
+        Return the latest price of a symbol, read from the background refresher's snapshot
+        when one is attached, or fetched from the data fetcher otherwise.
+
+        :param symbol: Stock symbol
+        :return: Latest price
+        """
+        if self.price_refresher is not None:
+            return self.price_refresher.get_price(symbol)
+        return self.data_fetcher.get_real_time_price(symbol)
+
+    def get_live_prices(self, symbols: list) -> dict:
+        """
+        Return the latest prices of several symbols, fetched in one batched request when
+        the refresher's snapshot does not hold them.
+
+        :param symbols: Stock symbols
+        :return: Dictionary mapping each symbol to its latest price
+        """
+        if self.price_refresher is not None:
+            return self.price_refresher.get_prices(symbols)
+        return self.data_fetcher.get_real_time_prices(symbols)
 
+    def get_live_prices_as_of(self):
+        """
+        Return the publication time of the live prices in use (None if they are fetched on demand).
+
+        :return: datetime of the latest refresher snapshot, or None
+        """
+        if self.price_refresher is None:
+            return None
+        published_at = self.price_refresher.snapshot().published_at
+        return datetime.fromtimestamp(published_at) if published_at is not None else None
 
     def get_cash(self):
         """
@@ -293,9 +526,7 @@ class Portfolio:
 
         :return: Current cash balance.
         """
-        if 'CASH' not in self.assets or not self.assets['CASH']:
-            return 0
-        return sum(txn['quantity'] for txn in self.assets['CASH'].values())
+        return self.positions.cash
 
     def set_total_value(self):
         self.total_value = self.get_portfolio_value()
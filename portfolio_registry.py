@@ -0,0 +1,202 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from data_fetcher import DataFetcher
+from journal import journal_path
+from portfolio_manager import Portfolio
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows: locking is then limited to the current process
+    fcntl = None
+
+PORTFOLIO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class _Entry:
+    """
+    A loaded portfolio with its lock and the state of its files when it was last in sync.
+    """
+
+    def __init__(self, portfolio: Portfolio, signature: tuple):
+        self.portfolio = portfolio
+        self.signature = signature
+        self.lock = threading.RLock()
+
+
+class PortfolioRegistry:
+    """
+    Portfolios keyed by user/portfolio ID, loaded lazily and evicted when idle.
+
+    Each portfolio lives in the shared directory as a snapshot '<id>.json' and its
+    transaction journal, so every worker process serving the dashboard sees the same
+    data. Access goes through session(), which holds a per-portfolio lock (a thread
+    lock plus a file lock shared with the other processes) and reloads the portfolio
+    first if another process wrote to its files since it was loaded here.
+
+    All portfolios share one DataFetcher, and thus one price store and metadata cache.
+    """
+
+    def __init__(self, directory: str = "portfolios", maxsize: int = 32, simulation_date: str = None,
+                 data_fetcher: DataFetcher = None, provider=None, price_refresher=None):
+        """
+        :param directory: Shared directory holding the portfolio snapshots and journals
+        :param maxsize: Maximum number of portfolios kept in memory
+        :param simulation_date: Simulation date of portfolios created from scratch
+        :param data_fetcher: DataFetcher shared by all portfolios, created if omitted
+        :param provider: Market data provider of the created DataFetcher
+        :param price_refresher: PriceRefresher attached to every loaded portfolio
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.maxsize = maxsize
+        self.simulation_date = simulation_date
+        self.data_fetcher = data_fetcher or DataFetcher(provider=provider)
+        self.price_refresher = price_refresher
+        self.loads = 0  # Portfolios loaded from the shared directory, including reloads
+        self.evictions = 0
+        self._entries = OrderedDict()  # portfolio ID -> _Entry, least recently used first
+        self._lock = threading.Lock()
+
+    def path(self, portfolio_id: str) -> str:
+        """
+        Return the snapshot file of a portfolio.
+
+        :param portfolio_id: Portfolio ID made of letters, digits, '-' and '_'
+        :return: Path of the snapshot file
+        """
+        if not PORTFOLIO_ID_PATTERN.match(portfolio_id or ""):
+            raise ValueError(f"Invalid portfolio ID: {portfolio_id!r}")
+        return os.path.join(self.directory, f"{portfolio_id}.json")
+
+    def _signature(self, portfolio_id: str) -> tuple:
+        """
+        Return the modification time and size of the snapshot and journal files of a portfolio.
+        """
+        signature = []
+        snapshot_filename = self.path(portfolio_id)
+        for filename in (snapshot_filename, journal_path(snapshot_filename)):
+            try:
+                stat = os.stat(filename)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _load(self, portfolio_id: str) -> Portfolio:
+        """
+        Load a portfolio from the shared directory (an empty one if it does not exist yet).
+        """
+        portfolio = Portfolio(self.simulation_date, data_fetcher=self.data_fetcher)
+        portfolio.load_portfolio(self.path(portfolio_id))
+        portfolio.price_refresher = self.price_refresher
+        self.loads += 1
+        return portfolio
+
+    def _entry(self, portfolio_id: str) -> _Entry:
+        """
+        Return the entry of a portfolio, loading it on first use and evicting idle ones.
+        """
+        with self._lock:
+            entry = self._entries.get(portfolio_id)
+            if entry is not None:
+                self._entries.move_to_end(portfolio_id)
+                return entry
+        # Load outside of the registry lock so that other portfolios stay available
+        with self._file_lock(portfolio_id):
+            signature = self._signature(portfolio_id)
+            loaded = _Entry(self._load(portfolio_id), signature)
+        with self._lock:
+            entry = self._entries.setdefault(portfolio_id, loaded)
+            self._entries.move_to_end(portfolio_id)
+            self._evict()
+            return entry
+
+    def _evict(self):
+        """
+        Drop the least recently used portfolios beyond maxsize that are not in use.
+
+        Every transaction is already in the journal, so evicting needs no write.
+        """
+        for portfolio_id in list(self._entries):
+            if len(self._entries) <= self.maxsize:
+                break
+            entry = self._entries[portfolio_id]
+            if entry.lock.acquire(blocking=False):
+                try:
+                    del self._entries[portfolio_id]
+                    self.evictions += 1
+                finally:
+                    entry.lock.release()
+
+    @contextmanager
+    def _file_lock(self, portfolio_id: str):
+        """
+        Hold the inter-process lock of a portfolio.
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path(portfolio_id)}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def session(self, portfolio_id: str):
+        """
+        Lock a portfolio and yield it, up to date with the shared directory.
+
+        Transactions made within the session are journaled to the shared directory
+        before the lock is released.
+
+        :param portfolio_id: Portfolio ID
+        :return: Context manager yielding the Portfolio
+        """
+        entry = self._entry(portfolio_id)
+        with entry.lock, self._file_lock(portfolio_id):
+            if self._signature(portfolio_id) != entry.signature:
+                # Another process wrote to this portfolio since it was loaded here
+                entry.portfolio = self._load(portfolio_id)
+            try:
+                yield entry.portfolio
+            finally:
+                entry.signature = self._signature(portfolio_id)
+
+    def add(self, portfolio_id: str, portfolio: Portfolio):
+        """
+        Register an already built portfolio under an ID, replacing any loaded one.
+
+        :param portfolio_id: Portfolio ID
+        :param portfolio: Portfolio to serve under this ID
+        """
+        entry = _Entry(portfolio, self._signature(portfolio_id))
+        with self._lock:
+            self._entries[portfolio_id] = entry
+            self._entries.move_to_end(portfolio_id)
+            self._evict()
+
+    def evict(self, portfolio_id: str):
+        """
+        Drop a portfolio from memory; it is reloaded on its next use.
+        """
+        with self._lock:
+            self._entries.pop(portfolio_id, None)
+
+    def held_symbols(self) -> list:
+        """
+        Return the symbols held by any loaded portfolio.
+        """
+        with self._lock:
+            portfolios = [entry.portfolio for entry in self._entries.values()]
+        return sorted({symbol for portfolio in portfolios for symbol in portfolio.positions.symbols()})
+
+    def stats(self) -> dict:
+        """
+        Return the number of loaded portfolios and the load and eviction counters.
+        """
+        return {'loaded': len(self._entries), 'loads': self.loads, 'evictions': self.evictions}
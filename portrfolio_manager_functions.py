@@ -4,24 +4,29 @@ from collections import defaultdict
 from datetime import datetime
 import time
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 import copy
 from data_fetcher import DataFetcher
+from analytics import daily_returns
+from instrumentation import timed
 from collections import defaultdict
 
 
 
 
 
+@timed("portfolio.get_market_value")
 def get_market_value(self):
     """
     Calculate the total market value of the portfolio excluding cash.
 
     :return: Total market value of the portfolio.
     """
-    return self.get_portfolio_value() - sum(txn['quantity'] for txn in self.assets['CASH'].values())
+    return self.get_portfolio_value() - self.positions.cash
 
 
+@timed("portfolio.get_dividend_yield")
 def get_dividend_yield(self, date: str):
     """
     Calculate the overall dividend yield of the portfolio as of a specific date.
@@ -35,12 +40,11 @@ def get_dividend_yield(self, date: str):
         if symbol == 'CASH':
             continue
 
-        stock = yf.Ticker(symbol)
-        dividend_yield = stock.info.get('dividendYield', 0.0)
+        dividend_yield = self.data_fetcher.get_ticker_metadata(symbol, 'info').get('dividendYield', 0.0)
 
         # Fetch the stock price as of the specific date
         price_at_date = self.data_fetcher.get_price_at_date(symbol, date)
-        total_quantity = sum(txn['quantity'] for txn in transactions.values())
+        total_quantity = self.positions.quantity(symbol)
         market_value = price_at_date * total_quantity
 
         total_dividends += market_value * dividend_yield
@@ -50,6 +54,7 @@ def get_dividend_yield(self, date: str):
         return 0.0
     return (total_dividends / total_market_value) * 100
 
+@timed("portfolio.get_yield_on_cost")
 def get_yield_on_cost(self, date: str):
     """
     Calculate the yield on cost of the portfolio as of a specific date.
@@ -63,11 +68,10 @@ def get_yield_on_cost(self, date: str):
         if symbol == 'CASH':
             continue
 
-        stock = yf.Ticker(symbol)
-        dividend_yield = stock.info.get('dividendYield', 0.0)
+        dividend_yield = self.data_fetcher.get_ticker_metadata(symbol, 'info').get('dividendYield', 0.0)
 
         # Total cost based on original purchase price
-        total_cost += sum(txn['quantity'] * txn['price'] for txn in transactions.values())
+        total_cost += self.positions.cost_basis(symbol)
         
         # Calculate dividends up to the specific date
         total_dividends += dividend_yield * total_cost
@@ -76,6 +80,7 @@ def get_yield_on_cost(self, date: str):
         return 0.0
     return (total_dividends / total_cost) * 100
 
+@timed("portfolio.get_last_change_percent")
 def get_last_change_percent(self):
     """
     Calculate the percentage change in portfolio value over the last period.
@@ -84,42 +89,29 @@ def get_last_change_percent(self):
     """
     if not self.simulation_date:
         return 0.0
-    previous_date = (datetime.strptime(self.simulation_date, "%Y-%m-%d")- timedelta(days=1)).strftime("%Y-%M-%d")
-    current_value = self.get_portfolio_value(date=self.simulation_date)
-    previous_value = self.get_portfolio_value(date=previous_date)
-    if previous_value == 0:
-        return 0.0
-    return ((current_value - previous_value) / previous_value) * 100
+    previous_date = (datetime.strptime(self.simulation_date, "%Y-%m-%d")- timedelta(days=1)).strftime("%Y-%m-%d")
+    # Both days come from the materialized value series; the day's inflows are not counted as a gain
+    series = self.profit_series.window(self, previous_date, self.simulation_date)
+    flows = np.diff(series['Inflows'].to_numpy(), prepend=0.0)
+    return float(daily_returns(series['Value'].to_numpy(), flows)[0]) * 100
 
+@timed("portfolio.get_dividend_data")
 def get_dividend_data(self, date: str):
     """
-    Get cumulative dividend data for the portfolio from Yahoo Finance up to a specific date.
+    Get cumulative dividend data for the portfolio up to a specific date.
+    Dividends are counted per lot for the ex-dates on which the lot was held.
     :param date: The date for which to fetch cumulative dividend data.
     :return: A DataFrame containing the cumulative dividend data up to the specified date.
     """
-    dividend_data = {}
-    
-    for symbol, transactions in self.assets.items():
-        if symbol == 'CASH':
-            continue
-        
-        stock = yf.Ticker(symbol)
-        dividends = stock.dividends  # Get full dividend history
-        
-        # Filter dividends up to the specified date
-        dividends = dividends[dividends.index <= date]
+    payments = self.dividend_ledger.payments(self, date)
+    totals = payments.groupby('Symbol')['Amount'].sum()
+    dividend_data = {symbol: float(totals.get(symbol, 0.0)) for symbol in self.assets if symbol != 'CASH'}
 
-        if not dividends.empty:
-            cumulative_dividends = dividends.sum()  # Sum up dividends
-            total_quantity = sum(txn['quantity'] for txn in transactions.values())
-            dividend_data[symbol] = cumulative_dividends * total_quantity
-        else:
-            dividend_data[symbol] = 0.0
-    
     # Convert to DataFrame
     dividend_df = pd.DataFrame(dividend_data.items(), columns=["Symbol", "Cumulative Dividend"])
     return dividend_df
 
+@timed("portfolio.get_diversification_data")
 def get_diversification_data(self, date: str):
     """
     Get diversification data for the portfolio by sector on a specific date.
@@ -128,52 +120,51 @@ def get_diversification_data(self, date: str):
     """
     diversification_data = defaultdict(float)
 
+    # Fetch the stock prices as of the specific date in one batch
+    symbols = [symbol for symbol in self.assets if symbol != 'CASH']
+    prices_at_date = self.data_fetcher.get_prices_at_date(symbols, date) if symbols else {}
+
     for symbol, transactions in self.assets.items():
         if symbol == 'CASH':
             continue
 
-        stock = yf.Ticker(symbol)
-        info = stock.info
+        info = self.data_fetcher.get_ticker_metadata(symbol, 'info')
         sector = info.get('sector', 'Unknown')
 
-        # Fetch the stock price as of the specific date
-        price_at_date = self.data_fetcher.get_price_at_date(symbol, date)
-        total_quantity = sum(txn['quantity'] for txn in transactions.values())
+        price_at_date = prices_at_date[symbol]
+        total_quantity = self.positions.quantity(symbol)
         diversification_data[sector] += price_at_date * total_quantity
 
     # Convert to DataFrame
     diversification_df = pd.DataFrame(list(diversification_data.items()), columns=['Sector', 'Value'])
     return diversification_df
 
+@timed("portfolio.get_income_data")
 def get_income_data(self, date: str):
     """
     Get monthly income data (dividends) for the portfolio as of a specific date.
     :param date: The date for which to fetch income data.
     :return: A DataFrame containing the monthly income data up to the specified date.
     """
-    income_data = defaultdict(float)
-
-    for symbol, transactions in self.assets.items():
-        if symbol == 'CASH':
-            continue
-
-        stock = yf.Ticker(symbol)
-        dividends = stock.dividends
-
-        # Filter dividends up to the specified date
-        dividends = dividends[dividends.index <= date]
-
-        if not dividends.empty:
-            # Group dividends by month and sum them using 'ME'
-            monthly_income = dividends.resample('ME').sum()  # Changed 'M' to 'ME'
-            total_quantity = sum(txn['quantity'] for txn in transactions.values())
-            for div_date, amount in monthly_income.items():
-                income_data[div_date.strftime('%B %Y')] += amount * total_quantity
+    monthly_income = self.dividend_ledger.income(self, date, freq='ME')
 
     # Convert to DataFrame
-    income_df = pd.DataFrame(income_data.items(), columns=['Month', 'Amount'])
+    income_df = pd.DataFrame({
+        'Month': monthly_income.index.strftime('%B %Y'),
+        'Amount': monthly_income['Amount'].to_numpy()
+    })
     return income_df
 
+@timed("portfolio.get_dividend_income")
+def get_dividend_income(self, date: str, freq: str = 'ME'):
+    """
+    Get the dividend income series of the portfolio as of a specific date.
+    :param date: The date for which to fetch the income series.
+    :param freq: 'ME' for monthly, 'YE' for yearly income.
+    :return: A DataFrame with columns Date, Amount and Cumulative.
+    """
+    return self.dividend_ledger.income(self, date, freq=freq).reset_index()
+
 def analyze_sustainability_score(self,esg_data):
     """
     Analyze the sustainability score by comparing totalEsg, environmentScore, socialScore, and governanceScore to peer ones
@@ -224,141 +215,173 @@ def analyze_sustainability_score(self,esg_data):
         'has_problems': has_problems
     }
 
-def get_detailed_stock_data(self, date: str):
+@timed("portfolio.get_detailed_stock_data")
+def get_detailed_stock_data(self, date: str, max_workers: int = 8, timeout: float = 10.0):
     """
     Get detailed stock data including price and performance as of a specific date.
+    The metadata requests of all symbols are fanned out concurrently; a symbol whose
+    requests fail or time out gets a degraded row instead of breaking the whole table.
     :param date: The date for which to fetch detailed stock data.
+    :param max_workers: Number of concurrent metadata requests.
+    :param timeout: Seconds to wait for each metadata request once it has started.
     :return: A DataFrame containing the detailed stock data as of the specified date.
     """
     detailed_data = []
 
+    symbols = [symbol for symbol in self.assets if symbol != 'CASH']
+    metadata, errors = self.data_fetcher.get_ticker_metadata_many(
+        symbols, ['info', 'sustainability', 'recommendations', 'major_holders'], max_workers=max_workers, timeout=timeout
+    )
+    # Fetch current prices as of the specified date in one batch
+    current_prices = self.data_fetcher.get_prices_at_date(symbols, date) if symbols else {}
+
     for symbol, transactions in self.assets.items():
         if symbol == 'CASH':
             continue
-
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        # Fetch current price as of the specified date
-        current_price = self.data_fetcher.get_price_at_date(symbol, date)
-
-        # Analyze sustainability score
-            # Analyze sustainability score
-        esg_scores = stock.sustainability
-        sustainability_analysis = self.analyze_sustainability_score(esg_scores) if not esg_scores.empty else {'ratings': {}, 'has_problems': False}# Calculate cost basis, market value, and , gains/losses
-        
-        
-        total_quantity = sum(txn['quantity'] for txn in transactions.values())
-        total_cost_basis = sum(txn['quantity'] * txn['price'] for txn in transactions.values())
-        market_value = current_price * total_quantity
-        gain_loss = market_value - total_cost_basis
-        gain_loss_pct = (gain_loss / total_cost_basis) * 100 if total_cost_basis != 0 else 0.0
-        
-        # Get analyst recommendations summary
-        recommendations_summary = stock.recommendations
-        recommendations_data = {
-            'Strong Buy': recommendations_summary.get('strongBuy', [0])[0],
-            'Buy': recommendations_summary.get('buy', [0])[0],
-            'Hold': recommendations_summary.get('hold', [0])[0],
-            'Sell': recommendations_summary.get('sell', [0])[0],
-            'Strong Sell': recommendations_summary.get('strongSell', [0])[0]
-        }
-        advice = max(recommendations_data, key=recommendations_data.get)
-        # Get institutional holders summary
-        institutional_holders_summary = stock.major_holders
-        holders_data = {
-            'Insiders Percent Held':  round(institutional_holders_summary.iloc[0]["Value"],3) ,
-            # 'Institutions Percent Held': institutional_holders_summary.iloc[1]["Value"] ,
-            'Institutions Float Percent Held': round(institutional_holders_summary.iloc[2]["Value"],2) ,
-            'Institutions Count': institutional_holders_summary.iloc[3]["Value"] 
-        }
-
-        detailed_data.append({
-            'Symbol': symbol,
-            'Name': info.get('longName', 'Unknown'),
-            'Sector': info.get('sector', 'Unknown'),
-            'Industry': info.get('industry', 'Unknown'),
-            'Forward P/E': round(info.get('forwardPE', 0),2),
-            'Price/Sales': round(info.get('priceToSalesTrailing12Months', 0),2),
-            'Price/Book': round(info.get('priceToBook', 0),2),
-            'Beta': round(info.get('beta', 0),2),
-            'EPS (TTM)': info.get('trailingEps', 0),
-            **sustainability_analysis['ratings'],
-            'Has Problems': sustainability_analysis['has_problems'],
-            **holders_data,
-            'Advice': advice
-        })
-        # detailed_data.append({
-        #     'Symbol': symbol,
-        #     'Name': info.get('longName', 'Unknown'),
-        #     'Sector': info.get('sector', 'Unknown'),
-        #     'Industry': info.get('industry', 'Unknown'),
-        #     'Country': info.get('country', 'Unknown'),
-        #     'Market Cap': info.get('marketCap', 0),
-        #     'Enterprise Value': info.get('enterpriseValue', 0),
-        #     'Trailing P/E': info.get('trailingPE', 0),
-        #     'Forward P/E': info.get('forwardPE', 0),
-        #     'PEG Ratio': info.get('pegRatio', 0),
-        #     'Price/Sales': info.get('priceToSalesTrailing12Months', 0),
-        #     'Price/Book': info.get('priceToBook', 0),
-        #     'Previous Close': info.get('previousClose', 0),
-        #     'Open': info.get('open', 0),
-        #     'Beta': info.get('beta', 0),
-        #     'Dividend Rate': info.get('dividendRate', 0),
-        #     'Dividend Yield': info.get('dividendYield', 0),
-        #     'Ex-Dividend Date': info.get('exDividendDate', 'N/A'),
-        #     'Payout Ratio': info.get('payoutRatio', 0),
-        #     'Earnings Date': info.get('earningsDate', 'N/A'),
-        #     'EPS (TTM)': info.get('trailingEps', 0),
-        #     'EPS (Forward)': info.get('forwardEps', 0),
-        #     'Revenue (TTM)': info.get('totalRevenue', 0),
-        #     'Major Holders': info.get('majorHoldersBreakdown', 'N/A'),
-        #     'Institutional Holders': info.get('institutionalHolders', 'N/A'),
-        #     'Mutual Fund Holders': info.get('fundHolders', 'N/A'),
-        #     'Insider Transactions': info.get('insiderTransactions', 'N/A'),
-        #     'Analyst Price Targets': info.get('targetMeanPrice', 0),
-        #     'Earnings Estimate': info.get('earningsEstimate', 'N/A'),
-        #     'Revenue Estimate': info.get('revenueEstimate', 'N/A'),
-        #     'EPS Trend': info.get('epsTrend', 'N/A'),
-        #     'EPS Revisions': info.get('epsRevisions', 'N/A'),
-        #     'Growth Estimates': info.get('growthEstimates', 'N/A'),
-        #     'Sustainability Scores': info.get('sustainability', 'N/A'),
-        #     'Options Expirations': info.get('optionExpirationDates', 'N/A'),
-        #     'Quantity': total_quantity,
-        #     'Cost Basis': total_cost_basis,
-        #     'Market Value': market_value,
-        #     'Gain/Loss $': gain_loss,
-        #     'Gain/Loss %': gain_loss_pct
-        # })
+        try:
+            detailed_data.append(_detailed_stock_row(self, symbol, metadata, current_prices[symbol]))
+        except Exception as e:
+            reasons = '; '.join(f"{field}: {error!r}" for (error_symbol, field), error in errors.items() if error_symbol == symbol)
+            print(f"Error fetching detailed data for {symbol}: {reasons or e}")
+            detailed_data.append({'Symbol': symbol, 'Name': 'Unavailable'})
 
     # Convert to DataFrame
     detailed_df = pd.DataFrame(detailed_data)
     return detailed_df
 
+def _detailed_stock_row(self, symbol: str, metadata: dict, current_price: float):
+    """
+    Build the detailed stock data row of one symbol.
+    :param symbol: The stock symbol.
+    :param metadata: Metadata fields keyed by (symbol, field); a missing field raises KeyError.
+    :param current_price: Price of the symbol as of the table date.
+    :return: A dictionary with the row values.
+    """
+    info = metadata[(symbol, 'info')]
+
+    # Analyze sustainability score
+    esg_scores = metadata[(symbol, 'sustainability')]
+    sustainability_analysis = self.analyze_sustainability_score(esg_scores) if not esg_scores.empty else {'ratings': {}, 'has_problems': False}# Calculate cost basis, market value, and , gains/losses
+    
+    
+    total_quantity = self.positions.quantity(symbol)
+    total_cost_basis = self.positions.cost_basis(symbol)
+    market_value = current_price * total_quantity
+    gain_loss = market_value - total_cost_basis
+    gain_loss_pct = (gain_loss / total_cost_basis) * 100 if total_cost_basis != 0 else 0.0
+    
+    # Get analyst recommendations summary
+    recommendations_summary = metadata[(symbol, 'recommendations')]
+    recommendations_data = {
+        'Strong Buy': recommendations_summary.get('strongBuy', [0])[0],
+        'Buy': recommendations_summary.get('buy', [0])[0],
+        'Hold': recommendations_summary.get('hold', [0])[0],
+        'Sell': recommendations_summary.get('sell', [0])[0],
+        'Strong Sell': recommendations_summary.get('strongSell', [0])[0]
+    }
+    advice = max(recommendations_data, key=recommendations_data.get)
+    # Get institutional holders summary
+    institutional_holders_summary = metadata[(symbol, 'major_holders')]
+    holders_data = {
+        'Insiders Percent Held':  round(institutional_holders_summary.iloc[0]["Value"],3) ,
+        # 'Institutions Percent Held': institutional_holders_summary.iloc[1]["Value"] ,
+        'Institutions Float Percent Held': round(institutional_holders_summary.iloc[2]["Value"],2) ,
+        'Institutions Count': institutional_holders_summary.iloc[3]["Value"] 
+    }
+
+    return {
+        'Symbol': symbol,
+        'Name': info.get('longName', 'Unknown'),
+        'Sector': info.get('sector', 'Unknown'),
+        'Industry': info.get('industry', 'Unknown'),
+        'Forward P/E': round(info.get('forwardPE', 0),2),
+        'Price/Sales': round(info.get('priceToSalesTrailing12Months', 0),2),
+        'Price/Book': round(info.get('priceToBook', 0),2),
+        'Beta': round(info.get('beta', 0),2),
+        'EPS (TTM)': info.get('trailingEps', 0),
+        **sustainability_analysis['ratings'],
+        'Has Problems': sustainability_analysis['has_problems'],
+        **holders_data,
+        'Advice': advice
+    }
+    # detailed_data.append({
+    #     'Symbol': symbol,
+    #     'Name': info.get('longName', 'Unknown'),
+    #     'Sector': info.get('sector', 'Unknown'),
+    #     'Industry': info.get('industry', 'Unknown'),
+    #     'Country': info.get('country', 'Unknown'),
+    #     'Market Cap': info.get('marketCap', 0),
+    #     'Enterprise Value': info.get('enterpriseValue', 0),
+    #     'Trailing P/E': info.get('trailingPE', 0),
+    #     'Forward P/E': info.get('forwardPE', 0),
+    #     'PEG Ratio': info.get('pegRatio', 0),
+    #     'Price/Sales': info.get('priceToSalesTrailing12Months', 0),
+    #     'Price/Book': info.get('priceToBook', 0),
+    #     'Previous Close': info.get('previousClose', 0),
+    #     'Open': info.get('open', 0),
+    #     'Beta': info.get('beta', 0),
+    #     'Dividend Rate': info.get('dividendRate', 0),
+    #     'Dividend Yield': info.get('dividendYield', 0),
+    #     'Ex-Dividend Date': info.get('exDividendDate', 'N/A'),
+    #     'Payout Ratio': info.get('payoutRatio', 0),
+    #     'Earnings Date': info.get('earningsDate', 'N/A'),
+    #     'EPS (TTM)': info.get('trailingEps', 0),
+    #     'EPS (Forward)': info.get('forwardEps', 0),
+    #     'Revenue (TTM)': info.get('totalRevenue', 0),
+    #     'Major Holders': info.get('majorHoldersBreakdown', 'N/A'),
+    #     'Institutional Holders': info.get('institutionalHolders', 'N/A'),
+    #     'Mutual Fund Holders': info.get('fundHolders', 'N/A'),
+    #     'Insider Transactions': info.get('insiderTransactions', 'N/A'),
+    #     'Analyst Price Targets': info.get('targetMeanPrice', 0),
+    #     'Earnings Estimate': info.get('earningsEstimate', 'N/A'),
+    #     'Revenue Estimate': info.get('revenueEstimate', 'N/A'),
+    #     'EPS Trend': info.get('epsTrend', 'N/A'),
+    #     'EPS Revisions': info.get('epsRevisions', 'N/A'),
+    #     'Growth Estimates': info.get('growthEstimates', 'N/A'),
+    #     'Sustainability Scores': info.get('sustainability', 'N/A'),
+    #     'Options Expirations': info.get('optionExpirationDates', 'N/A'),
+    #     'Quantity': total_quantity,
+    #     'Cost Basis': total_cost_basis,
+    #     'Market Value': market_value,
+    #     'Gain/Loss $': gain_loss,
+    #     'Gain/Loss %': gain_loss_pct
+    # })
+
+@timed("portfolio.get_operation_history")
 def get_operation_history(self):
         """
         Get the operation history of the portfolio.
 
         Returns:
-        pd.DataFrame: A DataFrame containing the operation history.
+        pd.DataFrame: A DataFrame containing the operation history, read from the columnar
+        history store (use self.history.query to filter, sort and page it instead).
         """
-        history = []
-
-        for symbol, transactions in self.assets.items():
-            for txn_id, txn in transactions.items():
-                operation = {
-                    'Transaction ID': int(txn_id),
-                    'Symbol': symbol,
-                    'Quantity': round(txn['quantity'],2),
-                    'Price': round(txn['price'],2),
-                    'Date': txn['date'],
-                    'Type': 'Cash' if symbol == 'CASH' else ('Buy' if txn['quantity'] > 0 else 'Sell')
-                }
-                history.append(operation)
-
-        # Convert to DataFrame
-        history_df = pd.DataFrame(history)
-        return history_df
+        return self.history.frame()
 
+@timed("portfolio.get_realized_gains")
+def get_realized_gains(self, start_date: str = None, end_date: str = None):
+    """
+    Get the realized gains of the lots sold, e.g. for a tax report.
+
+    :param start_date: First sale date in 'YYYY-MM-DD' format (all sales if omitted)
+    :param end_date: Last sale date in 'YYYY-MM-DD' format (inclusive)
+    :return: DataFrame with one row per lot sold: Transaction ID, Symbol, Lot ID, Quantity,
+             Acquired, Cost, Date, Price, Proceeds, Gain, Holding Days and Term ('Short'
+             for lots held one year or less, 'Long' otherwise)
+    """
+    columns = ['Transaction ID', 'Symbol', 'Lot ID', 'Quantity', 'Acquired', 'Cost', 'Date', 'Price', 'Gain']
+    realized = pd.DataFrame([
+        (record['txn_id'], record['symbol'], record['lot_id'], record['quantity'], record['acquired'],
+         record['cost'], record['date'], record['price'], record['gain'])
+        for record in self.lot_engine.realized
+        if (start_date is None or record['date'] >= start_date) and (end_date is None or record['date'] <= end_date)
+    ], columns=columns)
+    realized.insert(8, 'Proceeds', realized['Quantity'] * realized['Price'])
+    realized['Holding Days'] = (pd.to_datetime(realized['Date']) - pd.to_datetime(realized['Acquired'])).dt.days
+    realized['Term'] = np.where(realized['Holding Days'] > 365, 'Long', 'Short')
+    return realized
+
+@timed("portfolio.get_current_actives")
 def get_current_actives(self):
     """
     Get the current actives of the portfolio.
@@ -368,22 +391,28 @@ def get_current_actives(self):
     """
     actives = []
 
+    symbols = [symbol for symbol in self.assets if symbol != 'CASH']
+    if not symbols:
+        return pd.DataFrame(actives)
+
+    # Fetch the prices of all symbols for each reference date, and the current ones, in one batch
+    reference_date = datetime.strptime(self.simulation_date, "%Y-%m-%d") if self.simulation_date else datetime.now()
+    one_month_ago = (reference_date - timedelta(days=30)).strftime("%Y-%m-%d")
+    one_year_ago = (reference_date - timedelta(days=365)).strftime("%Y-%m-%d")
+    prices_one_month_ago = self.data_fetcher.get_prices_at_date(symbols, one_month_ago)
+    prices_one_year_ago = self.data_fetcher.get_prices_at_date(symbols, one_year_ago)
+    if self.simulation_date:
+        current_prices = self.data_fetcher.get_prices_at_date(symbols, self.simulation_date)
+    else:
+        current_prices = self.get_live_prices(symbols)
+
     for symbol, transactions in self.assets.items():
         if symbol == 'CASH':
             continue  # Skip cash transactions
-        total_quantity = sum(txn['quantity'] for txn in transactions.values())
-        if self.simulation_date:
-            current_price = self.data_fetcher.get_price_at_date(symbol, self.simulation_date)
-            one_month_ago = (datetime.strptime(self.simulation_date, "%Y-%m-%d") - timedelta(days=30)).strftime("%Y-%m-%d")
-            one_year_ago = (datetime.strptime(self.simulation_date, "%Y-%m-%d") - timedelta(days=365)).strftime("%Y-%m-%d")
-            price_one_month_ago = self.data_fetcher.get_price_at_date(symbol, one_month_ago)
-            price_one_year_ago = self.data_fetcher.get_price_at_date(symbol, one_year_ago)
-        else:
-            current_price = self.data_fetcher.get_real_time_price(symbol)
-            one_month_ago = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
-            one_year_ago = (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
-            price_one_month_ago = self.data_fetcher.get_price_at_date(symbol, one_month_ago)
-            price_one_year_ago = self.data_fetcher.get_price_at_date(symbol, one_year_ago)
+        total_quantity = self.positions.quantity(symbol)
+        current_price = current_prices[symbol]
+        price_one_month_ago = prices_one_month_ago[symbol]
+        price_one_year_ago = prices_one_year_ago[symbol]
 
         current_value = total_quantity * current_price
         change_over_month = ((current_price - price_one_month_ago) / price_one_month_ago) * 100 if price_one_month_ago else 0
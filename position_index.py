@@ -0,0 +1,80 @@
+class PositionIndex:
+    """
+    Live per-symbol quantities, cost basis and cash balance of a portfolio ledger.
+
+    The index is rebuilt once from the ledger and then kept up to date in O(1) by every
+    transaction, so readers never have to rescan the lots.
+    """
+
+    def __init__(self):
+        self.cash = 0.0  # Cash balance
+        self.quantities = {}  # symbol -> total quantity held
+        self.costs = {}  # symbol -> total cost basis of the lots held
+
+    def rebuild(self, assets: dict):
+        """
+        Rebuild the index from a ledger in the Portfolio.assets layout.
+
+        :param assets: Dictionary {symbol: {txn_id: txn}}
+        """
+        self.cash = sum(txn['quantity'] for txn in assets.get('CASH', {}).values())
+        self.quantities = {}
+        self.costs = {}
+        for symbol, transactions in assets.items():
+            if symbol == 'CASH' or not transactions:
+                continue
+            self.quantities[symbol] = sum(txn['quantity'] for txn in transactions.values())
+            self.costs[symbol] = sum(txn['quantity'] * txn['price'] for txn in transactions.values())
+
+    def add_cash(self, amount: float):
+        """
+        Record a cash movement.
+
+        :param amount: Amount added (negative for withdrawals)
+        """
+        self.cash += amount
+
+    def add_lot(self, symbol: str, quantity: float, price: float):
+        """
+        Record a purchased lot.
+
+        :param symbol: Stock symbol
+        :param quantity: Number of shares bought
+        :param price: Price per share
+        """
+        self.quantities[symbol] = self.quantities.get(symbol, 0) + quantity
+        self.costs[symbol] = self.costs.get(symbol, 0.0) + quantity * price
+
+    def remove_lots(self, symbol: str, quantity: float, cost: float, closed: bool = False):
+        """
+        Record shares leaving the portfolio.
+
+        :param symbol: Stock symbol
+        :param quantity: Number of shares removed
+        :param cost: Cost basis of the removed shares
+        :param closed: True if no lots of the symbol remain
+        """
+        if closed:
+            self.quantities.pop(symbol, None)
+            self.costs.pop(symbol, None)
+            return
+        self.quantities[symbol] -= quantity
+        self.costs[symbol] -= cost
+
+    def quantity(self, symbol: str) -> float:
+        """
+        Return the quantity held of a symbol (0 if not held).
+        """
+        return self.quantities.get(symbol, 0)
+
+    def cost_basis(self, symbol: str) -> float:
+        """
+        Return the total cost basis of a symbol (0.0 if not held).
+        """
+        return self.costs.get(symbol, 0.0)
+
+    def symbols(self) -> list:
+        """
+        Return the symbols currently held, excluding cash.
+        """
+        return list(self.quantities)
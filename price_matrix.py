@@ -0,0 +1,127 @@
+import json
+import numpy as np
+import pandas as pd
+from trading_calendar import TradingCalendar
+
+
+class PriceMatrix:
+    """
+    A dense date x symbol matrix of forward filled closes, memory-mapped from disk.
+
+    The matrix is stored as '<path>.npy' next to a '<path>.json' index holding the
+    trading calendar (one row per session) and the symbols (one column each). Opening
+    it maps the file without reading it, and row slices are views on the mapping, so
+    a universe of thousands of symbols over decades costs only the pages touched.
+    Days before a symbol's first close are NaN.
+    """
+
+    def __init__(self, values: np.ndarray, dates: np.ndarray, symbols: list):
+        """
+        :param values: Array of shape (len(dates), len(symbols)), usually a memory map
+        :param dates: Sorted trading calendar as a datetime64[D] array
+        :param symbols: Symbols of the columns
+        """
+        self.values = values
+        self.dates = dates
+        self.calendar = TradingCalendar(dates)
+        self.symbols = list(symbols)
+        self.symbol_index = {symbol: column for column, symbol in enumerate(self.symbols)}
+
+    @staticmethod
+    def _paths(path: str) -> tuple:
+        return f"{path}.npy", f"{path}.json"
+
+    @classmethod
+    def create(cls, path: str, prices: pd.DataFrame, dtype=np.float32) -> "PriceMatrix":
+        """
+        Write a matrix from a DataFrame of closes and open it.
+
+        :param path: Path of the matrix files, without extension
+        :param prices: Closes indexed by date, one column per symbol (forward filled here)
+        :param dtype: np.float32 (half the size) or np.float64
+        :return: The PriceMatrix mapped read-only from the written file
+        """
+        prices = prices.sort_index().ffill()
+        values_path, index_path = cls._paths(path)
+        values = np.lib.format.open_memmap(values_path, mode='w+', dtype=dtype, shape=prices.shape)
+        values[:] = prices.to_numpy(dtype=dtype)
+        values.flush()
+        del values
+        with open(index_path, 'w') as f:
+            json.dump({
+                'dates': pd.DatetimeIndex(prices.index).strftime('%Y-%m-%d').tolist(),
+                'symbols': [str(symbol) for symbol in prices.columns]
+            }, f)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: str, mode: str = 'r') -> "PriceMatrix":
+        """
+        Map an existing matrix.
+
+        :param path: Path of the matrix files, without extension
+        :param mode: 'r' (read-only) or 'r+' (writable mapping)
+        :return: The PriceMatrix
+        """
+        values_path, index_path = cls._paths(path)
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+        values = np.load(values_path, mmap_mode=mode)
+        return cls(values, np.asarray(index['dates'], dtype='datetime64[D]'), index['symbols'])
+
+    def row_at(self, dates) -> np.ndarray:
+        """
+        Return the row of the last session on or before each date (-1 before the first session).
+
+        :param dates: 'YYYY-MM-DD' date or sequence of dates
+        :return: Row number(s)
+        """
+        return self.calendar.session_index(dates)
+
+    def columns(self, symbols: list) -> np.ndarray:
+        """
+        Return the columns of symbols (-1 for symbols not in the matrix).
+        """
+        return np.asarray([self.symbol_index.get(symbol, -1) for symbol in symbols], dtype=int)
+
+    def covers(self, symbols: list, start_date: str, end_date: str) -> bool:
+        """
+        Return True if the matrix holds every symbol over the whole period.
+        """
+        return (len(self.dates) > 0 and all(symbol in self.symbol_index for symbol in symbols)
+                and self.dates[0] <= np.datetime64(start_date, 'D') and np.datetime64(end_date, 'D') <= self.dates[-1])
+
+    def window(self, start_date: str, end_date: str) -> tuple:
+        """
+        Return the rows of the sessions within [start_date, end_date], as a view.
+
+        :return: Tuple (values view, datetime64[D] dates of the rows)
+        """
+        start = np.searchsorted(self.dates, np.datetime64(start_date, 'D'), side='left')
+        end = np.searchsorted(self.dates, np.datetime64(end_date, 'D'), side='right')
+        return self.values[start:end], self.dates[start:end]
+
+    def frame(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Return the sessions within [start_date, end_date] as a DataFrame over the mapped
+        rows (no copy), indexed by 'YYYY-MM-DD' dates with one column per symbol.
+        """
+        values, dates = self.window(start_date, end_date)
+        return pd.DataFrame(values, index=pd.Index(dates.astype(str)), columns=self.symbols, copy=False)
+
+    def prices_at(self, symbols: list, dates) -> np.ndarray:
+        """
+        Gather the last closes on or before each date for some symbols.
+
+        Only the requested cells are read from the mapping.
+
+        :param symbols: Symbols (columns of the result)
+        :param dates: Sequence of 'YYYY-MM-DD' dates (rows of the result)
+        :return: Array of shape (len(dates), len(symbols)), NaN where there is no price
+        """
+        rows = self.row_at(dates)
+        columns = self.columns(symbols)
+        prices = self.values[np.clip(rows, 0, None)[:, None], np.clip(columns, 0, None)[None, :]].astype(np.float64)
+        prices[rows < 0, :] = np.nan
+        prices[:, columns < 0] = np.nan
+        return prices
@@ -0,0 +1,181 @@
+import threading
+import time
+from instrumentation import registry
+
+
+class PriceSnapshot:
+    """
+    An immutable set of latest prices, each with the time it was fetched.
+    """
+
+    def __init__(self, prices: dict = None, fetched_at: dict = None, published_at: float = None):
+        """
+        :param prices: Dictionary mapping each symbol to its latest price
+        :param fetched_at: Dictionary mapping each symbol to the epoch time its price was fetched
+        :param published_at: Epoch time the snapshot was published
+        """
+        self.prices = dict(prices or {})
+        self.fetched_at = dict(fetched_at or {})
+        self.published_at = published_at
+
+    def staleness(self, symbol: str) -> float:
+        """
+        Return the age in seconds of the price of a symbol (None if it has no price).
+        """
+        fetched_at = self.fetched_at.get(symbol)
+        return time.time() - fetched_at if fetched_at is not None else None
+
+
+class PriceRefresher:
+    """
+    A background thread polling the latest prices of held and watched symbols.
+
+    Every interval seconds the refresher fetches the price of each held symbol (given by
+    symbols_source) and each watched symbol, and publishes a new PriceSnapshot. Request
+    paths read the published snapshot instead of waiting on the market data provider;
+    a symbol missing from the snapshot, or older than max_staleness, is fetched
+    synchronously once and watched from then on.
+    """
+
+    def __init__(self, data_fetcher, symbols_source=None, interval: float = 60.0, max_staleness: float = None):
+        """
+        :param data_fetcher: DataFetcher used to get the latest prices
+        :param symbols_source: Function without arguments returning the held symbols
+        :param interval: Seconds between two refreshes
+        :param max_staleness: Age in seconds beyond which a price is fetched synchronously
+                              (3 intervals by default)
+        """
+        self.data_fetcher = data_fetcher
+        self.symbols_source = symbols_source or (lambda: [])
+        self.interval = interval
+        self.max_staleness = max_staleness if max_staleness is not None else 3 * interval
+        self.refreshes = 0  # Completed background refreshes
+        self.sync_fetches = 0  # Prices fetched on the request path
+        self._watched = set()
+        self._snapshot = PriceSnapshot()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, symbols: list):
+        """
+        Add symbols to refresh in addition to the held ones.
+        """
+        with self._lock:
+            self._watched.update(symbol.upper() for symbol in symbols)
+
+    def snapshot(self) -> PriceSnapshot:
+        """
+        Return the latest published snapshot.
+        """
+        return self._snapshot
+
+    def get_price(self, symbol: str) -> float:
+        """
+        Return the latest price of a symbol from the snapshot.
+
+        :param symbol: Stock symbol
+        :return: The latest price, fetched synchronously if the snapshot has none or it is too stale
+        """
+        snapshot = self._snapshot
+        staleness = snapshot.staleness(symbol)
+        if staleness is not None and staleness <= self.max_staleness:
+            return snapshot.prices[symbol]
+        self.watch([symbol])
+        self.sync_fetches += 1
+        price = self.data_fetcher.get_real_time_price(symbol)
+        if price:
+            self._publish({symbol: price}, time.time())
+        return price
+
+    def get_prices(self, symbols: list) -> dict:
+        """
+        Return the latest prices of several symbols from the snapshot.
+
+        :param symbols: Stock symbols
+        :return: Dictionary mapping each symbol to its price; the symbols missing from the
+                 snapshot or too stale are fetched together in one batched request
+        """
+        snapshot = self._snapshot
+        prices, stale = {}, []
+        for symbol in symbols:
+            staleness = snapshot.staleness(symbol)
+            if staleness is not None and staleness <= self.max_staleness:
+                prices[symbol] = snapshot.prices[symbol]
+            else:
+                stale.append(symbol)
+        if stale:
+            self.watch(stale)
+            self.sync_fetches += 1
+            fetched = self.data_fetcher.get_real_time_prices(stale)
+            self._publish({symbol: price for symbol, price in fetched.items() if price}, time.time())
+            prices.update(fetched)
+        return prices
+
+    def refresh(self):
+        """
+        Fetch the prices of every held and watched symbol and publish a new snapshot.
+        """
+        with registry.span("price_refresher.refresh"):
+            try:
+                held = list(self.symbols_source())
+            except RuntimeError:
+                held = []  # The holdings changed while being listed; they are picked up on the next refresh
+            with self._lock:
+                symbols = sorted(set(held) | self._watched)
+            prices = self.data_fetcher.get_real_time_prices(symbols) if symbols else {}
+            self._publish({symbol: price for symbol, price in prices.items() if price}, time.time())
+            self.refreshes += 1
+
+    def _publish(self, prices: dict, fetched_at: float):
+        """
+        Publish a new snapshot with the given prices replacing the previous ones.
+        """
+        with self._lock:
+            merged_prices = {**self._snapshot.prices, **prices}
+            merged_fetched_at = {**self._snapshot.fetched_at, **{symbol: fetched_at for symbol in prices}}
+            self._snapshot = PriceSnapshot(merged_prices, merged_fetched_at, fetched_at)
+
+    def _run(self):
+        """
+        Refresh until stopped.
+        """
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing prices: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """
+        Start the background refresh thread (does nothing if it is already running).
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="price-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """
+        Stop the background refresh thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        """
+        Return the refresh counters and the age of the oldest and newest prices.
+        """
+        snapshot = self._snapshot
+        ages = [time.time() - fetched_at for fetched_at in snapshot.fetched_at.values()]
+        return {
+            'symbols': len(snapshot.prices),
+            'refreshes': self.refreshes,
+            'sync_fetches': self.sync_fetches,
+            'max_staleness_s': max(ages) if ages else 0.0,
+            'min_staleness_s': min(ages) if ages else 0.0
+        }
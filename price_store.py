@@ -0,0 +1,248 @@
+import sqlite3
+import threading
+import time
+from datetime import date as _date
+import pandas as pd
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+
+
+def merge_intervals(intervals):
+    """
+    Merge overlapping or touching [start, end) intervals.
+
+    :param intervals: Iterable of (start, end) tuples of 'YYYY-MM-DD' strings
+    :return: Sorted list of disjoint (start, end) tuples
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_intervals(start: str, end: str, covered) -> list:
+    """
+    Return the parts of [start, end) that are not covered by any of the given intervals.
+
+    :param start: Start date in 'YYYY-MM-DD' format (inclusive)
+    :param end: End date in 'YYYY-MM-DD' format (exclusive)
+    :param covered: Iterable of (start, end) tuples already available
+    :return: List of (start, end) tuples still to be loaded
+    """
+    gaps = []
+    cursor = start
+    for cov_start, cov_end in merge_intervals(covered):
+        if cov_end <= cursor:
+            continue
+        if cov_start >= end:
+            break
+        if cov_start > cursor:
+            gaps.append((cursor, cov_start))
+        cursor = max(cursor, cov_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class PriceStore:
+    """
+    A persistent on-disk store of daily OHLCV bars backed by SQLite.
+
+    Every bar fetched from upstream is kept together with the date intervals that
+    were requested, so later reads inside a covered interval never go to the network
+    (weekends and holidays included).
+    """
+
+    def __init__(self, path: str = "price_store.sqlite"):
+        """
+        Open (or create) the store.
+
+        :param path: Path of the SQLite database file, or ':memory:'
+        """
+        self.path = path
+        self.hits = 0  # Reads fully served from the store
+        self.misses = 0  # Reads that needed at least one upstream fetch
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bars ("
+                "symbol TEXT NOT NULL, date TEXT NOT NULL, "
+                "open REAL, high REAL, low REAL, close REAL, volume REAL, "
+                "dividends REAL, stock_splits REAL, "
+                "PRIMARY KEY (symbol, date))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS coverage ("
+                "symbol TEXT NOT NULL, start TEXT NOT NULL, end TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS coverage_symbol ON coverage (symbol)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dividends ("
+                "symbol TEXT NOT NULL, date TEXT NOT NULL, amount REAL, PRIMARY KEY (symbol, date))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dividend_sync (symbol TEXT PRIMARY KEY, fetched_at REAL NOT NULL)"
+            )
+
+    def covered_intervals(self, symbol: str) -> list:
+        """
+        Return the merged [start, end) intervals already stored for a symbol.
+
+        :param symbol: Stock symbol
+        :return: List of (start, end) tuples
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT start, end FROM coverage WHERE symbol = ?", (symbol,)
+            ).fetchall()
+        return merge_intervals(rows)
+
+    def missing_ranges(self, symbol: str, start: str, end: str) -> list:
+        """
+        Return the sub-intervals of [start, end) that are not yet stored.
+
+        :param symbol: Stock symbol
+        :param start: Start date in 'YYYY-MM-DD' format (inclusive)
+        :param end: End date in 'YYYY-MM-DD' format (exclusive)
+        :return: List of (start, end) tuples to fetch upstream
+        """
+        return missing_intervals(start, end, self.covered_intervals(symbol))
+
+    def record_lookup(self, gaps: list):
+        """
+        Update the hit/miss counters for one read.
+
+        :param gaps: The gaps that had to be fetched for the read
+        """
+        with self._lock:
+            if gaps:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def read_bars(self, symbol: str, start: str, end: str) -> pd.DataFrame:
+        """
+        Read the stored bars of a symbol within [start, end).
+
+        :param symbol: Stock symbol
+        :param start: Start date in 'YYYY-MM-DD' format (inclusive)
+        :param end: End date in 'YYYY-MM-DD' format (exclusive)
+        :return: A DataFrame indexed by date with the usual yfinance bar columns
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, open, high, low, close, volume, dividends, stock_splits "
+                "FROM bars WHERE symbol = ? AND date >= ? AND date < ? ORDER BY date",
+                (symbol, start, end),
+            ).fetchall()
+        data = pd.DataFrame(rows, columns=["Date"] + BAR_COLUMNS)
+        data.index = pd.DatetimeIndex(pd.to_datetime(data.pop("Date")), name="Date")
+        return data
+
+    def write_bars(self, symbol: str, data: pd.DataFrame, start: str, end: str):
+        """
+        Store fetched bars and mark [start, end) as covered.
+
+        Only successful fetches are written: providers raise on failures, so an empty or
+        short answer means there were no more sessions, and the whole interval (weekends
+        and holidays included) is covered. Only days strictly before today are marked as
+        covered, because the bar of the current session can still change.
+
+        :param symbol: Stock symbol
+        :param data: DataFrame of bars indexed by date (may be empty or None)
+        :param start: Start date of the fetched interval (inclusive)
+        :param end: End date of the fetched interval (exclusive)
+        """
+        rows = []
+        if data is not None and not data.empty:
+            values = data.reindex(columns=BAR_COLUMNS).astype(float).fillna(0.0).to_numpy().tolist()
+            days = pd.DatetimeIndex(data.index).strftime("%Y-%m-%d").tolist()
+            rows = [(symbol, day, *bar) for day, bar in zip(days, values)]
+        covered_end = min(end, _date.today().strftime("%Y-%m-%d"))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            if start < covered_end:
+                # Keep the coverage table compact: one row per disjoint interval
+                covered = self._conn.execute(
+                    "SELECT start, end FROM coverage WHERE symbol = ?", (symbol,)
+                ).fetchall()
+                merged = merge_intervals(covered + [(start, covered_end)])
+                self._conn.execute("DELETE FROM coverage WHERE symbol = ?", (symbol,))
+                self._conn.executemany(
+                    "INSERT INTO coverage VALUES (?, ?, ?)",
+                    [(symbol, cov_start, cov_end) for cov_start, cov_end in merged]
+                )
+
+    def dividends_fetched_at(self, symbol: str) -> float:
+        """
+        Return when the dividend history of a symbol was last stored.
+
+        :param symbol: Stock symbol
+        :return: Unix timestamp, or None if it was never stored
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at FROM dividend_sync WHERE symbol = ?", (symbol,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def read_dividends(self, symbol: str) -> pd.Series:
+        """
+        Read the stored dividend history of a symbol.
+
+        :param symbol: Stock symbol
+        :return: A Series of per-share dividends indexed by ex-date
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, amount FROM dividends WHERE symbol = ? ORDER BY date", (symbol,)
+            ).fetchall()
+        return pd.Series(
+            [amount for _, amount in rows],
+            index=pd.DatetimeIndex(pd.to_datetime([day for day, _ in rows]), name="Date"),
+            name="Dividends",
+            dtype=float
+        )
+
+    def write_dividends(self, symbol: str, dividends: pd.Series):
+        """
+        Replace the stored dividend history of a symbol.
+
+        :param symbol: Stock symbol
+        :param dividends: Series of per-share dividends indexed by ex-date
+        """
+        rows = [(symbol, pd.Timestamp(day).strftime("%Y-%m-%d"), float(amount)) for day, amount in dividends.items()]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM dividends WHERE symbol = ?", (symbol,))
+            self._conn.executemany("INSERT OR REPLACE INTO dividends VALUES (?, ?, ?)", rows)
+            self._conn.execute("INSERT OR REPLACE INTO dividend_sync VALUES (?, ?)", (symbol, time.time()))
+
+    def stats(self) -> dict:
+        """
+        Return the hit/miss counters of the store.
+
+        :return: Dictionary with 'hits', 'misses' and 'hit_rate'
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def reset_stats(self):
+        """
+        Reset the hit/miss counters.
+        """
+        self.hits = 0
+        self.misses = 0
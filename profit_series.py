@@ -0,0 +1,87 @@
+from datetime import date as _date
+import numpy as np
+import pandas as pd
+
+SERIES_COLUMNS = ['Value', 'Inflows', 'Profit']
+
+
+def cumulative_inflows(cash_inflows: list, dates) -> np.ndarray:
+    """
+    Return the total cash inflow up to and including each date.
+
+    :param cash_inflows: Inflows in the Portfolio.cash_inflows layout [{'amount', 'date'}]
+    :param dates: Sequence of 'YYYY-MM-DD' dates
+    :return: NumPy array with the cumulative inflow at each date
+    """
+    dates = np.asarray(dates, dtype=str)
+    if not cash_inflows:
+        return np.zeros(len(dates))
+    inflow_dates = np.asarray([inflow['date'] for inflow in cash_inflows], dtype=str)
+    amounts = np.asarray([inflow['amount'] for inflow in cash_inflows], dtype=float)
+    order = np.argsort(inflow_dates, kind='stable')
+    totals = np.concatenate(([0.0], np.cumsum(amounts[order])))
+    return totals[np.searchsorted(inflow_dates[order], dates, side='right')]
+
+
+def _runs(dates: pd.Index) -> list:
+    """
+    Split sorted 'YYYY-MM-DD' dates into runs of consecutive days.
+    """
+    if len(dates) == 0:
+        return []
+    days = pd.to_datetime(dates).to_numpy().astype('datetime64[D]').astype(np.int64)
+    breaks = np.flatnonzero(np.diff(days) != 1) + 1
+    return np.split(np.asarray(dates), breaks)
+
+
+class ProfitSeries:
+    """
+    A materialized daily series of a portfolio's value, cumulative inflows and profit.
+
+    Windows are served from the days already computed, and only the missing days are
+    valued, so sliding a chart window by one day values a single day. A transaction
+    invalidates the series from its date onwards. Days from today on are never kept,
+    as their closing prices are not final yet.
+    """
+
+    def __init__(self):
+        self.days_computed = 0  # Number of days valued since creation
+        self._series = pd.DataFrame(columns=SERIES_COLUMNS, index=pd.Index([], dtype=object), dtype=float)  # Indexed by 'YYYY-MM-DD'
+
+    def invalidate(self, from_date: str = None):
+        """
+        Drop the days from a date onwards (every day if no date is given).
+
+        :param from_date: First invalidated date in 'YYYY-MM-DD' format
+        """
+        if self._series.empty:
+            return
+        if from_date is None:
+            self._series = self._series.iloc[0:0]
+        else:
+            self._series = self._series[self._series.index < from_date]
+
+    def window(self, portfolio, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Return the daily value, cumulative inflows and profit of a portfolio over a range of dates.
+
+        :param portfolio: The Portfolio the series belongs to
+        :param start_date: First date in 'YYYY-MM-DD' format
+        :param end_date: Last date in 'YYYY-MM-DD' format (inclusive)
+        :return: A DataFrame indexed by Date with columns Value, Inflows and Profit
+        """
+        dates = pd.date_range(start=start_date, end=end_date).strftime('%Y-%m-%d')
+        series = self._series
+        frames = []
+        for run in _runs(dates.difference(series.index)):
+            values = np.asarray(portfolio.get_portfolio_value(date=run[0], end_date=run[-1]), dtype=float)
+            inflows = cumulative_inflows(portfolio.cash_inflows, run)
+            frames.append(pd.DataFrame({'Value': values, 'Inflows': inflows, 'Profit': values - inflows}, index=run))
+            self.days_computed += len(run)
+        if frames:
+            series = pd.concat(([series] if len(series) else []) + frames).sort_index()
+            today = _date.today().isoformat()
+            self._series = series[series.index < today]
+        result = series.loc[dates]
+        result.index = pd.DatetimeIndex(result.index, name='Date')
+        return result
@@ -0,0 +1,40 @@
+from analytics import performance_summary
+from data_fetcher import DataFetcher
+from market_data_providers import SyntheticProvider
+from metadata_cache import TickerMetadataCache
+from portfolio_manager import Portfolio
+from price_store import PriceStore
+
+
+class HolidayProvider(SyntheticProvider):
+    """
+    Synthetic feed in which AAA does not trade on 2023-01-16, while other symbols do.
+    """
+
+    def history(self, symbol, start_date, end_date, interval="1d"):
+        bars = super().history(symbol, start_date, end_date, interval)
+        return bars[bars.index != '2023-01-16'] if symbol == 'AAA' else bars
+
+    def history_many(self, symbols, start_date, end_date):
+        return {symbol: self.history(symbol, start_date, end_date) for symbol in symbols}
+
+
+def make_portfolio():
+    data_fetcher = DataFetcher(PriceStore(":memory:"), metadata=TickerMetadataCache(":memory:"),
+                               provider=HolidayProvider())
+    portfolio = Portfolio(simulation_date="2023-01-03", data_fetcher=data_fetcher)
+    portfolio.add_cash(100000)
+    portfolio.buy_asset('AAA', 10)
+    return portfolio
+
+
+def test_summary_only_uses_the_sessions_of_the_portfolio_symbols():
+    alone = performance_summary(make_portfolio(), "2023-01-03", "2023-03-31")
+
+    shared = make_portfolio()
+    # Another portfolio of the shared fetcher trades a symbol open on AAA's holiday
+    shared.data_fetcher.fetch_many(['BBB'], "2023-01-03", "2023-04-01")
+    summary = performance_summary(shared, "2023-01-03", "2023-03-31")
+
+    assert summary['volatility'] == alone['volatility']
+    assert len(summary['rolling_volatility']) == len(alone['rolling_volatility'])
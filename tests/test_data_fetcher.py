@@ -0,0 +1,129 @@
+import random
+import threading
+import time
+
+import pandas as pd
+
+from data_fetcher import DataFetcher
+from market_data_providers import SyntheticProvider
+from metadata_cache import TickerMetadataCache
+from price_store import PriceStore
+
+
+class SlowProvider(SyntheticProvider):
+    """
+    Synthetic feed answering after a short delay, so concurrent loads overlap.
+    """
+
+    def history(self, *args, **kwargs):
+        time.sleep(0.002)
+        return super().history(*args, **kwargs)
+
+    def history_many(self, *args, **kwargs):
+        time.sleep(0.005)
+        return super().history_many(*args, **kwargs)
+
+
+def make_fetcher():
+    return DataFetcher(PriceStore(":memory:"), metadata=TickerMetadataCache(":memory:"),
+                       provider=SlowProvider(), min_fetch_days=5)
+
+
+def test_shared_fetcher_returns_the_same_prices_from_8_threads():
+    symbols = ['AAA', 'BBB', 'CCC']
+    days = pd.bdate_range('2021-01-04', '2022-12-30').strftime('%Y-%m-%d').tolist()
+    rng = random.Random(1)
+    queries = [(rng.choice(symbols), rng.choice(days)) for _ in range(1600)]
+    reference = make_fetcher()
+    expected = {query: reference.get_price_at_date(*query) for query in set(queries)}
+
+    fetcher = make_fetcher()
+    wrong = []
+
+    def work(thread):
+        for i, (symbol, date) in enumerate(queries[thread::8]):
+            if i % 25 == 0:
+                fetcher.fetch_many(symbols, date, date[:4] + '-12-31')
+            price = fetcher.get_price_at_date(symbol, date)
+            if price != expected[(symbol, date)]:
+                wrong.append((symbol, date, price))
+
+    threads = [threading.Thread(target=work, args=(thread,)) for thread in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert wrong == []
+    stats = fetcher.get_cache_stats()
+    assert stats['memory_hits'] + stats['memory_misses'] >= len(queries)
+
+
+class FailingProvider(SyntheticProvider):
+    """
+    Synthetic feed whose requests fail while it is down.
+    """
+
+    down = True
+
+    def history(self, *args, **kwargs):
+        if self.down:
+            raise ConnectionError("provider is down")
+        return super().history(*args, **kwargs)
+
+
+def test_warm_reload_makes_no_upstream_call(tmp_path):
+    path = str(tmp_path / "prices.sqlite")
+    cold = DataFetcher(PriceStore(path), metadata=TickerMetadataCache(":memory:"), provider=SyntheticProvider())
+    # The padded window ends on a Monday, after a weekend without bars
+    first = cold.fetch_stock_data('AAA', start_date='2021-01-01', end_date='2022-03-05')
+    cold.get_price_at_date('AAA', '2022-01-15')
+    assert cold.upstream_calls > 0
+
+    for _ in range(2):
+        warm = DataFetcher(PriceStore(path), metadata=TickerMetadataCache(":memory:"), provider=SyntheticProvider())
+        data = warm.fetch_stock_data('AAA', start_date='2021-01-01', end_date='2022-03-05')
+        warm.get_price_at_date('AAA', '2022-01-15')
+        assert warm.upstream_calls == 0
+        pd.testing.assert_frame_equal(data, first, check_freq=False)
+
+
+def test_failed_fetch_is_retried():
+    provider = FailingProvider()
+    fetcher = DataFetcher(PriceStore(":memory:"), metadata=TickerMetadataCache(":memory:"), provider=provider)
+    assert fetcher.get_price_at_date('AAA', '2022-01-14') == 0.0
+    assert fetcher.store.covered_intervals('AAA') == []
+
+    provider.down = False
+    assert fetcher.get_price_at_date('AAA', '2022-01-14') > 0
+
+
+class StallingProvider(SyntheticProvider):
+    """
+    Synthetic feed whose metadata requests for symbols starting with 'STALL' hang until released.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def metadata(self, symbol, field):
+        if symbol.startswith('STALL'):
+            self.release.wait()
+        else:
+            time.sleep(0.05)
+        return super().metadata(symbol, field)
+
+
+def test_metadata_timeout_applies_to_each_request():
+    provider = StallingProvider()
+    fetcher = DataFetcher(PriceStore(":memory:"), metadata=TickerMetadataCache(":memory:"), provider=provider)
+    symbols = ['STALL1', 'STALL2'] + [f'FAST{i}' for i in range(8)]
+    try:
+        values, errors = fetcher.get_ticker_metadata_many(symbols, ['info'], max_workers=2, timeout=0.3)
+    finally:
+        provider.release.set()
+
+    assert set(errors) == {('STALL1', 'info'), ('STALL2', 'info')}
+    assert all(isinstance(error, TimeoutError) for error in errors.values())
+    assert set(values) == {(symbol, 'info') for symbol in symbols[2:]}
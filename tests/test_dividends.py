@@ -0,0 +1,36 @@
+import pandas as pd
+
+from dividends import entitled_dividends, lots_frame
+from lot_engine import LotEngine
+
+
+def ledger():
+    assets = {'AAA': {1: {'quantity': 100, 'price': 10.0, 'date': '2023-01-03'}}}
+    engine = LotEngine()
+    engine.rebuild(assets)
+    return assets, engine
+
+
+def dividends():
+    return pd.DataFrame({'Symbol': ['AAA', 'AAA'],
+                         'Date': pd.to_datetime(['2023-03-01', '2023-09-01']),
+                         'Dividend': [0.5, 0.5]})
+
+
+def test_dividends_before_a_partial_sale_survive_it():
+    assets, engine = ledger()
+    engine.sell(assets['AAA'], 'AAA', 50, 12.0, '2023-06-01', txn_id=2)
+
+    paid = entitled_dividends(lots_frame(assets, engine.realized), dividends())
+    assert paid.groupby('Date')['Amount'].sum().to_dict() == {
+        pd.Timestamp('2023-03-01'): 50.0, pd.Timestamp('2023-09-01'): 25.0}
+
+
+def test_dividends_before_selling_everything_survive_it():
+    assets, engine = ledger()
+    engine.sell(assets['AAA'], 'AAA', 100, 12.0, '2023-06-01', txn_id=2)
+    del assets['AAA']
+
+    paid = entitled_dividends(lots_frame(assets, engine.realized), dividends())
+    assert paid['Date'].tolist() == [pd.Timestamp('2023-03-01')]
+    assert paid['Amount'].tolist() == [50.0]
@@ -0,0 +1,37 @@
+import pytest
+
+from data_fetcher import DataFetcher
+from importer import import_statement
+from market_data_providers import SyntheticProvider
+from metadata_cache import TickerMetadataCache
+from portfolio_manager import Portfolio
+from price_store import PriceStore
+
+
+def make_portfolio():
+    return Portfolio(simulation_date="2023-01-03",
+                     data_fetcher=DataFetcher(PriceStore(":memory:"), metadata=TickerMetadataCache(":memory:"),
+                                              provider=SyntheticProvider()))
+
+
+def write_statement(tmp_path, buy_price):
+    path = tmp_path / "statement.csv"
+    path.write_text("Date,Action,Symbol,Quantity,Price,Amount\n"
+                    "2022-01-03,Deposit,,,,1000\n"
+                    f"2022-01-04,Buy,AAA,10,{buy_price},\n")
+    return str(path)
+
+
+def test_statement_spending_all_cash_is_rejected(tmp_path):
+    portfolio = make_portfolio()
+    with pytest.raises(ValueError, match="line 3"):
+        import_statement(portfolio, write_statement(tmp_path, 100), prefetch=False)
+    assert portfolio.positions.cash == 0
+
+
+def test_statement_keeping_cash_is_imported(tmp_path):
+    portfolio = make_portfolio()
+    summary = import_statement(portfolio, write_statement(tmp_path, 99), prefetch=False)
+    assert summary['buys'] == 1
+    assert portfolio.positions.cash == pytest.approx(10)
+    assert portfolio.positions.quantity('AAA') == 10
@@ -0,0 +1,90 @@
+from data_fetcher import DataFetcher
+from journal import TransactionJournal, journal_path
+from market_data_providers import SyntheticProvider
+from metadata_cache import TickerMetadataCache
+from portfolio_manager import Portfolio
+from price_store import PriceStore
+
+
+def make_portfolio():
+    return Portfolio(simulation_date="2023-01-03",
+                     data_fetcher=DataFetcher(PriceStore(":memory:"), metadata=TickerMetadataCache(":memory:"),
+                                              provider=SyntheticProvider()))
+
+
+def tear(path):
+    with open(path, 'a') as f:
+        f.write('{"seq": 3, "op": "add_ca')
+
+
+def test_torn_tail_is_dropped_when_the_journal_is_opened(tmp_path):
+    path = str(tmp_path / "p.journal.jsonl")
+    journal = TransactionJournal(path)
+    journal.append({'op': 'a'})
+    journal.append({'op': 'b'})
+    tear(path)
+
+    journal = TransactionJournal(path)
+    assert journal.seq == 2
+    journal.append({'op': 'c'})
+    assert [record['op'] for record in TransactionJournal(path).read_tail(0)] == ['a', 'b', 'c']
+
+
+def test_append_after_a_torn_line_starts_a_fresh_line(tmp_path):
+    path = str(tmp_path / "p.journal.jsonl")
+    journal = TransactionJournal(path)
+    journal.append({'op': 'a'})
+    tear(path)  # Another writer crashed after this journal was opened
+    journal.append({'op': 'b'})
+    journal.append({'op': 'c'})
+    assert [record['op'] for record in journal.read_tail(0)] == ['a', 'b', 'c']
+
+
+def test_portfolio_replays_records_written_after_a_torn_line(tmp_path):
+    filename = str(tmp_path / "p.json")
+    portfolio = make_portfolio()
+    portfolio.save_portfolio(filename)
+    portfolio.add_cash(1000)
+    portfolio.add_cash(500)
+    tear(journal_path(filename))
+
+    reloaded = make_portfolio()
+    reloaded.load_portfolio(filename)
+    reloaded.add_cash(500)
+
+    replayed = make_portfolio()
+    replayed.load_portfolio(filename)
+    assert replayed.get_cash() == 2000
+
+
+def test_trades_replay_to_the_same_ledger(tmp_path):
+    filename = str(tmp_path / "p.json")
+    portfolio = make_portfolio()
+    portfolio.save_portfolio(filename)
+    portfolio.add_cash(100000)
+    portfolio.buy_asset('AAA', 10)
+    portfolio.sell_asset('AAA', 4)
+    assert len(TransactionJournal(journal_path(filename)).read_tail(0)) == 3
+
+    replayed = make_portfolio()
+    replayed.load_portfolio(filename)
+    assert replayed.get_cash() == portfolio.get_cash()
+    assert replayed.positions.quantity('AAA') == 6
+    assert replayed.transaction_id == portfolio.transaction_id
+
+
+def test_torn_trade_record_loses_both_legs(tmp_path):
+    filename = str(tmp_path / "p.json")
+    portfolio = make_portfolio()
+    portfolio.save_portfolio(filename)
+    portfolio.add_cash(100000)
+    portfolio.buy_asset('AAA', 10)
+    # Crash while the trade record was being written
+    path = journal_path(filename)
+    with open(path, 'rb+') as f:
+        f.truncate(len(f.read()) - 20)
+
+    replayed = make_portfolio()
+    replayed.load_portfolio(filename)
+    assert replayed.get_cash() == 100000
+    assert replayed.positions.quantity('AAA') == 0
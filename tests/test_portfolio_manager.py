@@ -0,0 +1,79 @@
+import pytest
+
+from data_fetcher import DataFetcher
+from market_data_providers import SyntheticProvider
+from metadata_cache import TickerMetadataCache
+from portfolio_manager import Portfolio
+from price_store import PriceStore
+
+
+def make_portfolio():
+    return Portfolio(simulation_date="2023-01-03",
+                     data_fetcher=DataFetcher(PriceStore(":memory:"), metadata=TickerMetadataCache(":memory:"),
+                                              provider=SyntheticProvider()))
+
+
+def test_orders_cannot_spend_the_whole_cash_balance():
+    portfolio = make_portfolio()
+    price = portfolio.data_fetcher.get_price_at_date('AAA', portfolio.simulation_date)
+    portfolio.add_cash(10 * price)
+
+    assert not portfolio.execute_orders([('AAA', 10)])
+    assert portfolio.positions.cash == 10 * price
+    assert portfolio.execute_orders([('AAA', 9)])
+    assert portfolio.positions.quantity('AAA') == 9
+
+
+def test_sale_does_not_change_past_values():
+    portfolio = make_portfolio()
+    portfolio.add_cash(100000)
+    portfolio.buy_asset('AAA', 10)
+    portfolio.buy_asset('BBB', 5)
+    before = portfolio.get_portfolio_value("2023-01-03", "2023-03-31")
+    portfolio.profit_series.window(portfolio, "2023-01-03", "2023-03-31")
+
+    portfolio.simulation_date = "2023-02-01"
+    portfolio.sell_asset('AAA', 10)
+    portfolio.sell_asset('BBB', 2)
+    after = portfolio.get_portfolio_value("2023-01-03", "2023-03-31")
+
+    sale = 29  # Position of 2023-02-01 in the range
+    assert after[:sale] == before[:sale]
+    assert after[sale] == pytest.approx(portfolio.get_portfolio_value("2023-02-01"))
+    # Only the values from the sale on are computed again
+    computed = portfolio.profit_series.days_computed
+    portfolio.profit_series.window(portfolio, "2023-01-03", "2023-03-31")
+    assert portfolio.profit_series.days_computed - computed == len(before) - sale
+
+
+
+class CountingProvider(SyntheticProvider):
+    """
+    Synthetic feed counting its live price requests.
+    """
+
+    live_requests = 0
+
+    def latest_price(self, symbol):
+        self.live_requests += 1
+        return super().latest_price(symbol)
+
+    def latest_prices(self, symbols):
+        self.live_requests += 1
+        return {symbol: SyntheticProvider.latest_price(self, symbol) for symbol in symbols}
+
+
+def test_holdings_table_fetches_live_prices_in_one_request():
+    provider = CountingProvider()
+    portfolio = Portfolio(simulation_date="2023-01-03",
+                          data_fetcher=DataFetcher(PriceStore(":memory:"), metadata=TickerMetadataCache(":memory:"),
+                                                   provider=provider))
+    portfolio.add_cash(1000000)
+    for symbol in ('AAA', 'BBB', 'CCC'):
+        portfolio.buy_asset(symbol, 1)
+    portfolio.simulation_date = None
+
+    actives = portfolio.get_current_actives()
+    assert provider.live_requests == 1
+    expected = SyntheticProvider().latest_prices(['AAA', 'BBB', 'CCC'])
+    assert actives['Current Price'].tolist() == [round(expected[symbol], 2) for symbol in ('AAA', 'BBB', 'CCC')]
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+def _to_days(dates) -> np.ndarray:
+    """
+    Convert 'YYYY-MM-DD' strings, datetimes or a DatetimeIndex to a datetime64[D] array.
+    """
+    if isinstance(dates, pd.DatetimeIndex):
+        return dates.to_numpy().astype('datetime64[D]')
+    return np.asarray(dates, dtype='datetime64[D]')
+
+
+class TradingCalendar:
+    """
+    A sorted array of trading sessions.
+
+    Any date is mapped to the last session on or before it with a binary search, so
+    "price as of date" is an index lookup instead of a calendar-day scan or a lookback
+    window.
+    """
+
+    def __init__(self, sessions=()):
+        """
+        :param sessions: Session dates ('YYYY-MM-DD' strings, datetimes or a DatetimeIndex)
+        """
+        self.sessions = np.unique(_to_days(sessions))
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def add(self, sessions):
+        """
+        Merge more sessions into the calendar.
+        """
+        self.sessions = np.union1d(self.sessions, _to_days(sessions))
+
+    def session_index(self, dates) -> np.ndarray:
+        """
+        Return the position of the last session on or before each date (-1 before the first session).
+
+        :param dates: Date or sequence of dates
+        :return: Position(s) in the session array
+        """
+        return np.searchsorted(self.sessions, _to_days(dates), side='right') - 1
+
+    def last_session(self, date: str) -> str:
+        """
+        Return the last session on or before a date.
+
+        :param date: Date in 'YYYY-MM-DD' format
+        :return: Session date in 'YYYY-MM-DD' format, or None if the date precedes every session
+        """
+        position = int(self.session_index(date))
+        return str(self.sessions[position]) if position >= 0 else None
+
+    def sessions_between(self, start_date: str, end_date: str) -> np.ndarray:
+        """
+        Return the sessions within [start_date, end_date] as a datetime64[D] array.
+        """
+        start = np.searchsorted(self.sessions, np.datetime64(start_date, 'D'), side='left')
+        end = np.searchsorted(self.sessions, np.datetime64(end_date, 'D'), side='right')
+        return self.sessions[start:end]
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from price_matrix import PriceMatrix
+from trading_calendar import TradingCalendar
+
+
+def ledger_symbols(assets: dict, realized: list = ()) -> list:
+    """
+    Return the symbols of a ledger: those held, then those only found in sold lots.
+
+    :param assets: Ledger in the Portfolio.assets layout {symbol: {txn_id: txn}}
+    :param realized: Realized gain records of the LotEngine
+    :return: List of symbols, without 'CASH'
+    """
+    symbols = [symbol for symbol in assets if symbol != 'CASH']
+    return symbols + sorted({record['symbol'] for record in realized} - set(symbols))
+
+
+def position_matrix(assets: dict, dates, symbols: list, realized: list = ()) -> np.ndarray:
+    """
+    Build the cumulative position matrix (date x symbol) of a transaction ledger.
+
+    A transaction counts from its own date onwards, i.e. for every date >= txn['date'].
+    A sold lot (or part of a lot) counts from its acquisition date until the day before
+    its sale date.
+
+    :param assets: Ledger in the Portfolio.assets layout {symbol: {txn_id: txn}}
+    :param dates: Sorted sequence of 'YYYY-MM-DD' dates (rows of the matrix)
+    :param symbols: Symbols (columns of the matrix)
+    :param realized: Realized gain records of the LotEngine
+    :return: NumPy array of shape (len(dates), len(symbols)) with the quantity held at each date
+    """
+    dates = np.asarray(dates, dtype=str)
+    columns, txn_dates, quantities = [], [], []
+    for column, symbol in enumerate(symbols):
+        for txn in assets.get(symbol, {}).values():
+            columns.append(column)
+            txn_dates.append(txn['date'])
+            quantities.append(txn['quantity'])
+    positions = {symbol: column for column, symbol in enumerate(symbols)}
+    for record in realized:
+        if record['symbol'] in positions:
+            columns += [positions[record['symbol']]] * 2
+            txn_dates += [record['acquired'], record['date']]
+            quantities += [record['quantity'], -record['quantity']]
+
+    # Row of the first date on which each transaction is visible; len(dates) means never
+    rows = np.searchsorted(dates, np.asarray(txn_dates, dtype=str), side='left')
+    deltas = np.zeros((len(dates) + 1, len(symbols)))
+    np.add.at(deltas, (rows, np.asarray(columns, dtype=int)), np.asarray(quantities, dtype=float))
+    return np.cumsum(deltas[:-1], axis=0)
+
+
+def portfolio_value_series(assets: dict, prices: pd.DataFrame, dates, realized: list = ()) -> np.ndarray:
+    """
+    Value a ledger over a range of dates in a single vectorized pass.
+
+    :param assets: Ledger in the Portfolio.assets layout, including the 'CASH' asset
+    :param prices: Close prices indexed by 'YYYY-MM-DD' dates, one column per symbol.
+                   Rows before the first date are used to forward fill the start of the range.
+    :param dates: Sorted sequence of 'YYYY-MM-DD' dates to value
+    :param realized: Realized gain records of the LotEngine, so sold lots are valued until their sale
+    :return: NumPy array with the total value (cash + assets) for each date
+    """
+    symbols = ledger_symbols(assets, realized)
+    cash = position_matrix(assets, dates, ['CASH'])[:, 0]
+    if not symbols:
+        return cash
+
+    # Value every date at the last session on or before it, carrying the last known close forward
+    sessions = prices.reindex(columns=symbols).sort_index().ffill()
+    if sessions.empty:
+        return cash
+    rows = TradingCalendar(sessions.index).session_index(dates)
+    price_matrix = np.nan_to_num(sessions.to_numpy(dtype=float)[np.clip(rows, 0, None)])
+    price_matrix[rows < 0] = 0.0
+
+    quantities = position_matrix(assets, dates, symbols, realized)
+    return cash + (quantities * price_matrix).sum(axis=1)
+
+
+def matrix_value_series(assets: dict, matrix: PriceMatrix, dates, realized: list = ()) -> np.ndarray:
+    """
+    Value a ledger over a range of dates from a memory-mapped price matrix.
+
+    Only the closes of the ledger's symbols on the requested dates are read from the matrix.
+
+    :param assets: Ledger in the Portfolio.assets layout, including the 'CASH' asset
+    :param matrix: PriceMatrix holding every symbol of the ledger
+    :param dates: Sorted sequence of 'YYYY-MM-DD' dates to value
+    :param realized: Realized gain records of the LotEngine, so sold lots are valued until their sale
+    :return: NumPy array with the total value (cash + assets) for each date
+    """
+    symbols = ledger_symbols(assets, realized)
+    cash = position_matrix(assets, dates, ['CASH'])[:, 0]
+    if not symbols:
+        return cash
+    prices = np.nan_to_num(matrix.prices_at(symbols, dates))
+    quantities = position_matrix(assets, dates, symbols, realized)
+    return cash + (quantities * prices).sum(axis=1)
@@ -3,12 +3,15 @@ import plotly.graph_objs as go
 import pandas as pd
 from portfolio_manager import Portfolio  # Assuming Portfolio class exists
 from color_palette import GENERAL_COLORS, GRAPH_COLORS, PIE_CHART_COLORS, TABLE_COLORS
+from figure_cache import memoize_figure
+from instrumentation import timed
 from dash import dash_table
 import html
 import dash
 from dash import dcc, html
 import dash_bootstrap_components as dbc
 ROUNDDIGIT = 3
+HISTORY_PAGE_SIZE = 25  # Rows of the operation history sent to the browser at once
 
 def plot_just_figure(start_date: str, end_date: str):
     """
@@ -51,15 +54,16 @@ def plot_allocation_breakdown(portfolio: Portfolio):
     labels = []
     sizes = []
     
-    # Calculate the total value of each asset
+    # Calculate the total value of each asset, at live prices fetched in one batch
+    live_prices = portfolio.get_live_prices([symbol for symbol in portfolio.assets if symbol != 'CASH'])
     for symbol, transactions in portfolio.assets.items():
         if symbol == 'CASH':
-            total_quantity = sum(txn['quantity'] for txn in transactions.values())
+            total_quantity = portfolio.positions.cash
             labels.append(symbol)
             sizes.append(round(total_quantity, ROUNDDIGIT))
         else:
-            total_quantity = sum(txn['quantity'] for txn in transactions.values())
-            current_price = portfolio.data_fetcher.get_real_time_price(symbol)
+            total_quantity = portfolio.positions.quantity(symbol)
+            current_price = live_prices[symbol]
             asset_value = total_quantity * current_price
             labels.append(symbol)
             sizes.append(round(asset_value, ROUNDDIGIT))
@@ -111,6 +115,7 @@ def plot_portfolio_growth_over_time(portfolio: Portfolio, start_date: str, end_d
     )
     return fig
 
+@timed("figure.plot_asset_growth_over_time")
 def plot_asset_growth_over_time(portfolio: Portfolio, symbol: str, start_date: str, end_date: str):
     """
     Plot the price of a single asset in the portfolio over a range of dates.
@@ -168,6 +173,8 @@ def plot_asset_growth_over_time(portfolio: Portfolio, symbol: str, start_date: s
     )
     return fig
 
+@memoize_figure
+@timed("figure.plot_portfolio_profit_over_time")
 def plot_portfolio_profit_over_time(portfolio: Portfolio, start_date: str, end_date: str):
     """
     Plot the portfolio's profit over a range of dates, using historical data.
@@ -180,28 +187,9 @@ def plot_portfolio_profit_over_time(portfolio: Portfolio, start_date: str, end_d
     Returns:
     A Plotly figure object showing the portfolio's profit.
     """
-    # Fetch the portfolio's value over the date range
-    date_range = pd.date_range(start=start_date, end=end_date)
-    portfolio_values = portfolio.get_portfolio_value(date=start_date, end_date=end_date)
-
-    # Initialize cumulative inflows
-    cumulative_inflows = pd.Series(0.0, index=date_range)
-    
-    # Calculate cumulative cash inflows using boolean indexing
-    for inflow in portfolio.cash_inflows:
-        inflow_date = pd.to_datetime(inflow['date'])
-        inflow_amount = inflow['amount']
-        cumulative_inflows[date_range >= inflow_date] += inflow_amount
-
-    # Calculate profit by subtracting cumulative cash inflows from portfolio values
-    profit_values = [round(value - inflow, ROUNDDIGIT) for value, inflow in zip(portfolio_values, cumulative_inflows)]
-
-    # Create a DataFrame for plotting
-    simulation_data = pd.DataFrame({
-        'Date': date_range,
-        'Profit': profit_values
-    })
-    simulation_data.set_index('Date', inplace=True)
+    # Profit (value minus cumulative cash inflows) from the portfolio's materialized daily
+    # series; only the days it does not hold yet are valued
+    simulation_data = portfolio.profit_series.window(portfolio, start_date, end_date)[['Profit']].round(ROUNDDIGIT)
 
     # Extract buy transactions for plotting
     buy_transactions = []
@@ -256,18 +244,12 @@ def plot_dividend_cumulative(portfolio: Portfolio):
     Returns:
     A Plotly figure object showing the cumulative dividends.
     """
-    dividend_data = portfolio.get_dividend_data(portfolio.simulation_date)
+    dividend_income = portfolio.get_dividend_income(portfolio.simulation_date, freq='YE')
 
-    # Ensure that the DataFrame contains 'Cumulative Dividend' and a time index
-    if 'Cumulative Dividend' in dividend_data.columns:
-        # Create a 'Year' column from the index or a specific date column if necessary
-        if 'Date' in dividend_data.columns:
-            dividend_data['Year'] = pd.to_datetime(dividend_data['Date']).dt.year  # Convert 'Date' column to datetime
-        else:
-            # If no date column exists, create a placeholder for 'Year' (or handle accordingly)
-            dividend_data['Year'] = range(len(dividend_data))
-
-        fig = px.bar(dividend_data, x='Year', y='Cumulative Dividend', title='Cumulative Dividends Over Time')
+    if not dividend_income.empty:
+        dividend_income['Year'] = dividend_income['Date'].dt.year
+        dividend_income['Cumulative Dividend'] = dividend_income['Cumulative'].round(ROUNDDIGIT)
+        fig = px.bar(dividend_income, x='Year', y='Cumulative Dividend', title='Cumulative Dividends Over Time')
         fig.update_layout(xaxis_title="Year", yaxis_title="Cumulative Dividend ($)")
     else:
         fig = go.Figure()
@@ -277,6 +259,8 @@ def plot_dividend_cumulative(portfolio: Portfolio):
     return fig
 
 # Function to plot diversification pie chart
+@memoize_figure
+@timed("figure.plot_diversification_pie")
 def plot_diversification_pie(portfolio: Portfolio):
     """
     Plot the diversification of the portfolio.
@@ -383,20 +367,82 @@ def create_clickable_table(dataframe, table_id, sort_by=None, drop_column=None,
     return table
 
 
+def create_paged_table(first_page, total_rows, table_id, page_size, sort_by=None):
+    """
+    Create a Dash DataTable paged, sorted and filtered on the server.
+
+    Only the current page is sent to the browser; a callback on the table's page_current,
+    page_size, sort_by and filter_query properties has to provide the following pages.
+
+    Args:
+    first_page (pd.DataFrame): The rows of the first page.
+    total_rows (int): The number of rows of the whole table.
+    table_id (str): The ID for the table.
+    page_size (int): The number of rows per page.
+    sort_by (list, optional): The initial DataTable sort_by specification. Defaults to None.
+
+    Returns:
+    A Dash DataTable component.
+    """
+    numeric = first_page.select_dtypes('number').columns
+    columns = [{'name': col, 'id': col, 'type': 'numeric' if col in numeric else 'text'} for col in first_page.columns]
+    return dash_table.DataTable(
+        id=table_id,
+        columns=columns,
+        data=first_page.to_dict('records'),
+        page_action='custom',
+        page_current=0,
+        page_size=page_size,
+        page_count=max(1, -(-total_rows // page_size)),
+        sort_action='custom',
+        sort_mode='multi',
+        sort_by=sort_by or [],
+        filter_action='custom',
+        filter_query='',
+        style_table={'height': '600px', 'overflowY': 'auto'},
+        style_header={
+            'backgroundColor': TABLE_COLORS['header_background'],
+            'color': TABLE_COLORS['header_text'],
+            'fontWeight': 'bold'
+        },
+        style_filter={
+            'backgroundColor': GENERAL_COLORS['panel_background'],
+            'color': GENERAL_COLORS['text_primary']
+        },
+        style_cell={
+            'backgroundColor': GENERAL_COLORS['panel_background'],
+            'color': GENERAL_COLORS['text_primary'],
+            'textAlign': 'left'
+        },
+        style_data_conditional=[
+            {
+                'if': {'row_index': 'odd'},
+                'backgroundColor': TABLE_COLORS['row_background']
+            }
+        ]
+    )
 
 
 def plot_income_table(portfolio):
     income_data = portfolio.get_income_data(portfolio.simulation_date)
     return create_clickable_table(income_data, 'income-table')
 
+@timed("figure.plot_detailed_stock_data_table")
 def plot_detailed_stock_data_table(portfolio):
     detailed_stock_data = portfolio.get_detailed_stock_data(portfolio.simulation_date)
     return create_clickable_table(detailed_stock_data, 'detailed-stock-data-table', highlight_columns=['Change'])
 
+@memoize_figure
+@timed("figure.plot_operation_history_table")
 def plot_operation_history_table(portfolio):
-    operation_history = portfolio.get_operation_history()
-    return create_clickable_table(operation_history, 'operation-history-table', sort_by='Transaction ID')
-
+    if not len(portfolio.history):
+        return html.Div("No Data Available", style={'color': GENERAL_COLORS['text_primary']})
+    first_page, total = portfolio.history.query(page_size=HISTORY_PAGE_SIZE)
+    return create_paged_table(first_page, total, 'operation-history-table', HISTORY_PAGE_SIZE,
+                              sort_by=[{'column_id': 'Transaction ID', 'direction': 'desc'}])
+
+@memoize_figure
+@timed("figure.plot_current_actives_table")
 def plot_current_actives_table(portfolio):
     current_actives = portfolio.get_current_actives()
     return create_clickable_table(current_actives, 'current-actives-table', sort_by='Current Value', drop_column='Current Value', highlight_columns=['Change Over Month (%)','Change Over Year (%)'])